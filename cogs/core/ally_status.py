@@ -1,9 +1,8 @@
 import math
-import json
 import discord
 from discord.ext import commands
-from utils.db import fetchall, fetchone, execute
-from services import status_service, effect_service
+from utils.db import execute, run, afetchone, afetchall, aexecute, ensure_once
+from services import status_service, effect_service, encounter_service
 
 # ===== Utility =====
 
@@ -70,7 +69,7 @@ def make_embed(allies: list, title="🤝 Ally Status", mode="player"):
         return embed
 
     for a in allies:
-        effects = json.loads(a.get("effects") or "[]")
+        effects = a.get("effects") or []
 
         buffs = [eff for eff in effects if eff.get("type", "").lower() == "buff"]
         debuffs = [eff for eff in effects if eff.get("type", "").lower() == "debuff"]
@@ -113,6 +112,9 @@ class AllyStatus(commands.Cog):
         self.bot = bot
 
     def _ensure_table(self, guild_id: int):
+        ensure_once(guild_id, "allies", self._create_table)
+
+    def _create_table(self, guild_id: int):
         execute(
             guild_id,
             """
@@ -145,36 +147,41 @@ class AllyStatus(commands.Cog):
     @ally.command(name="add")
     async def ally_add(self, ctx, name: str, hp: int, energy: int, stamina: int):
         guild_id = ctx.guild.id
-        self._ensure_table(guild_id)
-        exists = fetchone(guild_id, "SELECT id FROM allies WHERE name=?", (name,))
+        await run(guild_id, self._ensure_table, guild_id)
+        exists = await afetchone(guild_id, "SELECT id FROM allies WHERE name=?", (name,))
         if exists:
-            execute(guild_id, """
+            await run(guild_id, encounter_service.drop, guild_id, "allies", name)
+            await aexecute(guild_id, """
                 UPDATE allies
                 SET hp=?, hp_max=?, energy=?, energy_max=?, stamina=?, stamina_max=?, ac=10, updated_at=CURRENT_TIMESTAMP
                 WHERE id=?
             """, (hp, hp, energy, energy, stamina, stamina, exists["id"]))
+            await run(guild_id, encounter_service.track, guild_id, "allies", name)
             await ctx.send(f"♻️ Ally **{name}** diperbarui.")
         else:
-            execute(guild_id, """
+            await aexecute(guild_id, """
                 INSERT INTO allies (name, hp, hp_max, energy, energy_max, stamina, stamina_max, ac)
                 VALUES (?,?,?,?,?,?,?,10)
             """, (name, hp, hp, energy, energy, stamina, stamina))
+            await run(guild_id, encounter_service.track, guild_id, "allies", name)
             await ctx.send(f"🤝 Ally **{name}** ditambahkan.")
 
     # === Show (Player) ===
     @ally.command(name="show")
     async def ally_show(self, ctx, *, name: str = None):
         guild_id = ctx.guild.id
-        self._ensure_table(guild_id)
+        await run(guild_id, self._ensure_table, guild_id)
         if name:
-            row = fetchone(guild_id, "SELECT * FROM allies WHERE name=?", (name,))
+            row = await afetchone(guild_id, "SELECT * FROM allies WHERE name=?", (name,))
             if not row:
                 return await ctx.send("❌ Ally tidak ditemukan.")
             rows = [row]
             title = f"🤝 Ally Status: {name}"
         else:
-            rows = fetchall(guild_id, "SELECT * FROM allies")
+            rows = await afetchall(guild_id, "SELECT * FROM allies")
             title = "🤝 Ally Status (All)"
+        encounter_service.overlay(guild_id, "allies", rows)
+        await run(guild_id, effect_service.attach_effects, guild_id, "allies", rows)
         embed = make_embed(rows, title=title, mode="player")
         await ctx.send(embed=embed)
 
@@ -182,16 +189,18 @@ class AllyStatus(commands.Cog):
     @ally.command(name="gmshow")
     async def ally_gmshow(self, ctx, *, name: str = None):
         guild_id = ctx.guild.id
-        self._ensure_table(guild_id)
+        await run(guild_id, self._ensure_table, guild_id)
         if name:
-            row = fetchone(guild_id, "SELECT * FROM allies WHERE name=?", (name,))
+            row = await afetchone(guild_id, "SELECT * FROM allies WHERE name=?", (name,))
             if not row:
                 return await ctx.send("❌ Ally tidak ditemukan.")
             rows = [row]
             title = f"🎭 GM Ally Status: {name}"
         else:
-            rows = fetchall(guild_id, "SELECT * FROM allies")
+            rows = await afetchall(guild_id, "SELECT * FROM allies")
             title = "🎭 GM Ally Status (All)"
+        encounter_service.overlay(guild_id, "allies", rows)
+        await run(guild_id, effect_service.attach_effects, guild_id, "allies", rows)
         embed = make_embed(rows, title=title, mode="gm")
         await ctx.send(embed=embed)
 
@@ -245,18 +254,20 @@ class AllyStatus(commands.Cog):
     @ally.command(name="remove")
     async def ally_remove(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        self._ensure_table(guild_id)
-        row = fetchone(guild_id, "SELECT id FROM allies WHERE name=?", (name,))
+        await run(guild_id, self._ensure_table, guild_id)
+        row = await afetchone(guild_id, "SELECT id FROM allies WHERE name=?", (name,))
         if not row:
             return await ctx.send(f"❌ Ally **{name}** tidak ditemukan.")
-        execute(guild_id, "DELETE FROM allies WHERE name=?", (name,))
+        await run(guild_id, encounter_service.drop, guild_id, "allies", name)
+        await aexecute(guild_id, "DELETE FROM allies WHERE name=?", (name,))
         await ctx.send(f"🗑️ Ally **{name}** dihapus.")
 
     @ally.command(name="clear")
     async def ally_clear(self, ctx):
         guild_id = ctx.guild.id
-        self._ensure_table(guild_id)
-        execute(guild_id, "DELETE FROM allies")
+        await run(guild_id, self._ensure_table, guild_id)
+        await run(guild_id, encounter_service.drop, guild_id, "allies")
+        await aexecute(guild_id, "DELETE FROM allies")
         await ctx.send("🧹 Semua ally dihapus.")
 
     # === Alias Cepat ===
@@ -0,0 +1,97 @@
+# cogs/core/aoe.py
+import discord
+from discord.ext import commands
+from utils.db import run
+from services import status_service
+
+
+class AoECog(commands.Cog):
+    """💥 Damage/heal/resource massal dengan selector target."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    # =========================
+    # AoE COMMANDS
+    # =========================
+    @commands.group(name="aoe", invoke_without_command=True)
+    async def aoe_group(self, ctx):
+        embed = discord.Embed(
+            title="💥 AoE Commands",
+            description=(
+                "`!aoe dmg <selector> <jumlah>`\n"
+                "`!aoe heal <selector> <jumlah>`\n"
+                "`!aoe stm- / stm+ / ene- / ene+ <selector> <jumlah>`\n\n"
+                "**Selector** (gabung pakai koma, tanpa spasi):\n"
+                "• `enemies:*`, `allies:*`, `chars:*` — semua di tabel itu (`enemies:gob*` pakai pola)\n"
+                "• `party` — semua karakter + ally, `all` — semuanya\n"
+                "• `tag:undead` — entity dengan tag (lihat `!tag`)\n"
+                "• `Goblin1,Goblin2,Alice` — daftar nama"
+            ),
+            color=discord.Color.orange()
+        )
+        await ctx.send(embed=embed)
+
+    async def _bulk(self, ctx, selector: str, op: str, amount: int, field: str = "hp"):
+        guild_id = ctx.guild.id
+        data = await status_service.apply_bulk(guild_id, selector, op, amount, field)
+        if not data["results"]:
+            return await ctx.send(f"❌ Tidak ada target untuk `{selector}`.")
+        await ctx.send(embed=status_service.build_bulk_embed(discord, data))
+
+    @aoe_group.command(name="dmg")
+    async def aoe_dmg(self, ctx, selector: str, amount: int):
+        await self._bulk(ctx, selector, "dmg", amount)
+
+    @aoe_group.command(name="heal")
+    async def aoe_heal(self, ctx, selector: str, amount: int):
+        await self._bulk(ctx, selector, "heal", amount)
+
+    @aoe_group.command(name="stm-")
+    async def aoe_stm_use(self, ctx, selector: str, amount: int):
+        await self._bulk(ctx, selector, "use", amount, "stamina")
+
+    @aoe_group.command(name="stm+")
+    async def aoe_stm_regen(self, ctx, selector: str, amount: int):
+        await self._bulk(ctx, selector, "regen", amount, "stamina")
+
+    @aoe_group.command(name="ene-")
+    async def aoe_ene_use(self, ctx, selector: str, amount: int):
+        await self._bulk(ctx, selector, "use", amount, "energy")
+
+    @aoe_group.command(name="ene+")
+    async def aoe_ene_regen(self, ctx, selector: str, amount: int):
+        await self._bulk(ctx, selector, "regen", amount, "energy")
+
+    # =========================
+    # TAG COMMANDS
+    # =========================
+    @commands.group(name="tag", invoke_without_command=True)
+    async def tag_group(self, ctx):
+        await ctx.send("Gunakan: `!tag add <nama> <tag...>`, `!tag remove <nama> <tag...>`, `!tag list <tag>`")
+
+    @tag_group.command(name="add")
+    async def tag_add(self, ctx, name: str, *tags: str):
+        cur = await status_service.set_tags(ctx.guild.id, name, list(tags))
+        if cur is None:
+            return await ctx.send(f"❌ {name} tidak ditemukan.")
+        await ctx.send(f"🏷️ Tag **{name}**: {', '.join(cur) or '-'}")
+
+    @tag_group.command(name="remove")
+    async def tag_remove(self, ctx, name: str, *tags: str):
+        cur = await status_service.set_tags(ctx.guild.id, name, list(tags), remove=True)
+        if cur is None:
+            return await ctx.send(f"❌ {name} tidak ditemukan.")
+        await ctx.send(f"🏷️ Tag **{name}**: {', '.join(cur) or '-'}")
+
+    @tag_group.command(name="list")
+    async def tag_list(self, ctx, tag: str):
+        guild_id = ctx.guild.id
+        targets, _ = await run(guild_id, status_service.resolve_targets, guild_id, f"tag:{tag}")
+        if not targets:
+            return await ctx.send(f"ℹ️ Tidak ada entity dengan tag `{tag}`.")
+        await ctx.send(f"🏷️ `{tag}`: " + ", ".join(name for _, name in targets))
+
+
+async def setup(bot):
+    await bot.add_cog(AoECog(bot))
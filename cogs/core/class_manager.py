@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 from cogs.world.encyclopedia import CLASSES
-from utils.db import get_recent, save_memory   # ✅ ganti dari memory ke utils.db
+from utils.db import get_recent, save_memory, run   # ✅ ganti dari memory ke utils.db
 import json
 
 # ===== Helper =====
@@ -31,7 +31,7 @@ class ClassManager(commands.Cog):
         if not cls:
             return await ctx.send("❌ Class tidak ditemukan di encyclopedia.")
 
-        c = load_char(str(ctx.guild.id), str(ctx.channel.id), char_name)
+        c = await run(str(ctx.guild.id), load_char, str(ctx.guild.id), str(ctx.channel.id), char_name)
         if not c:
             return await ctx.send("❌ Karakter tidak ditemukan.")
 
@@ -47,7 +47,7 @@ class ClassManager(commands.Cog):
         # Proficiency
         c["proficiency"] = cls.get("proficiency", {})
 
-        save_char(str(ctx.guild.id), str(ctx.channel.id), ctx.author.id, char_name, c)
+        await run(str(ctx.guild.id), save_char, str(ctx.guild.id), str(ctx.channel.id), ctx.author.id, char_name, c)
         await ctx.send(f"✅ {char_name} sekarang adalah {class_name}. Bonus & skills diterapkan.")
 
 async def setup(bot):
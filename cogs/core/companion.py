@@ -1,7 +1,7 @@
 import json
 import discord
 from discord.ext import commands
-from utils.db import fetchone, execute
+from utils.db import fetchone, execute, run
 from services import effect_service, item_service
 
 # ===============================
@@ -65,6 +65,7 @@ def make_comp_embed(guild_id: int, char_name: str, comps: list):
         embed.add_field(name="(kosong)", value="Belum ada companion aktif.", inline=False)
         return embed
 
+    live_effects = effect_service.companion_effects(guild_id, char_name)
     for c in comps:
         name = c.get("name", "???")
         hp, hp_max = c.get("hp", 0), c.get("hp_max", 0)
@@ -72,12 +73,9 @@ def make_comp_embed(guild_id: int, char_name: str, comps: list):
         stamina, stamina_max = c.get("stamina", 0), c.get("stamina_max", 0)
         ac = c.get("ac", 10)
         level, xp, xp_next = c.get("level", 1), c.get("xp", 0), c.get("xp_next", 100)
-        effects = c.get("effects", [])
+        effects = live_effects.get(name.lower(), [])
         modules = c.get("modules", [])
 
-        if isinstance(effects, str):
-            try: effects = json.loads(effects)
-            except: effects = []
         if isinstance(modules, str):
             try: modules = json.loads(modules)
             except: modules = []
@@ -137,14 +135,15 @@ class Companion(commands.Cog):
     @comp_group.command(name="show")
     async def comp_show(self, ctx, char_name: str):
         guild_id = ctx.guild.id
-        try: comps = _get_companions(guild_id, char_name)
+        try: comps = await run(guild_id, _get_companions, guild_id, char_name)
         except ValueError as e: return await ctx.send(f"❌ {e}")
-        await ctx.send(embed=make_comp_embed(guild_id, char_name, comps))
+        embed = await run(guild_id, make_comp_embed, guild_id, char_name, comps)
+        await ctx.send(embed=embed)
 
     @comp_group.command(name="add")
     async def comp_add(self, ctx, char_name: str, comp_name: str):
         guild_id = ctx.guild.id
-        try: comps = _get_companions(guild_id, char_name)
+        try: comps = await run(guild_id, _get_companions, guild_id, char_name)
         except ValueError as e: return await ctx.send(f"❌ {e}")
 
         if any(c.get("name", "").lower() == comp_name.lower() for c in comps):
@@ -162,38 +161,38 @@ class Companion(commands.Cog):
             "effects": [], "modules": []
         }
         comps.append(new_comp)
-        _save_companions(guild_id, char_name, comps)
+        await run(guild_id, _save_companions, guild_id, char_name, comps)
         await ctx.send(f"✅ Companion **{comp_name}** ditambahkan ke {char_name} (Lv 1).")
 
     @comp_group.command(name="edit")
     async def comp_edit(self, ctx, char_name: str, comp_name: str, field: str, *, value: str):
         guild_id = ctx.guild.id
-        try: comps = _get_companions(guild_id, char_name)
+        try: comps = await run(guild_id, _get_companions, guild_id, char_name)
         except ValueError as e: return await ctx.send(f"❌ {e}")
         for c in comps:
             if c.get("name", "").lower() == comp_name.lower():
                 if field not in c: return await ctx.send(f"❌ Field '{field}' tidak ditemukan.")
                 if value.isdigit(): value = int(value)
                 c[field] = value
-                _save_companions(guild_id, char_name, comps)
+                await run(guild_id, _save_companions, guild_id, char_name, comps)
                 return await ctx.send(f"🛠️ Field **{field}** companion **{comp_name}** diubah menjadi **{value}**.")
         await ctx.send(f"❌ Companion {comp_name} tidak ditemukan.")
 
     @comp_group.command(name="remove")
     async def comp_remove(self, ctx, char_name: str, comp_name: str):
         guild_id = ctx.guild.id
-        try: comps = _get_companions(guild_id, char_name)
+        try: comps = await run(guild_id, _get_companions, guild_id, char_name)
         except ValueError as e: return await ctx.send(f"❌ {e}")
         comps = [c for c in comps if c.get("name", "").lower() != comp_name.lower()]
-        _save_companions(guild_id, char_name, comps)
+        await run(guild_id, _save_companions, guild_id, char_name, comps)
         await ctx.send(f"🗑️ Companion **{comp_name}** dihapus dari {char_name}.")
 
     @comp_group.command(name="clear")
     async def comp_clear(self, ctx, char_name: str):
         guild_id = ctx.guild.id
-        try: _ensure_char(guild_id, char_name)
+        try: await run(guild_id, _ensure_char, guild_id, char_name)
         except ValueError as e: return await ctx.send(f"❌ {e}")
-        _save_companions(guild_id, char_name, [])
+        await run(guild_id, _save_companions, guild_id, char_name, [])
         await ctx.send(f"🧹 Semua companion **{char_name}** telah dihapus.")
 
     # ===============================
@@ -209,36 +208,36 @@ class Companion(commands.Cog):
     @comp_group.command(name="set")
     async def comp_set(self, ctx, char_name: str, comp_name: str, hp: int, energy: int, stamina: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp: return await ctx.send("❌ Companion tidak ditemukan.")
         comp["hp"] = hp
         comp["energy"] = energy
         comp["stamina"] = stamina
-        _save_companions(guild_id, char_name, comps)
+        await run(guild_id, _save_companions, guild_id, char_name, comps)
         await ctx.send(f"🛠️ {comp_name}: HP={hp}, Energy={energy}, Stamina={stamina}")
 
     @comp_group.command(name="setac")
     async def comp_set_ac(self, ctx, char_name: str, comp_name: str, ac: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp: return await ctx.send("❌ Companion tidak ditemukan.")
         comp["ac"] = ac
-        _save_companions(guild_id, char_name, comps)
+        await run(guild_id, _save_companions, guild_id, char_name, comps)
         await ctx.send(f"🛡️ AC {comp_name} diubah jadi {ac}")
 
     @comp_group.command(name="setlv")
     async def comp_set_lv(self, ctx, char_name: str, comp_name: str, level: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp: return await ctx.send("❌ Companion tidak ditemukan.")
         comp["level"] = level
-        _save_companions(guild_id, char_name, comps)
+        await run(guild_id, _save_companions, guild_id, char_name, comps)
         await ctx.send(f"🏅 Level {comp_name} diubah ke Lv {level}")
 
     @comp_group.command(name="addxp")
     async def comp_add_xp(self, ctx, char_name: str, comp_name: str, amount: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp:
             return await ctx.send("❌ Companion tidak ditemukan.")
     
@@ -255,7 +254,7 @@ class Companion(commands.Cog):
             comp["xp_next"] = int(100 * (1.5 ** (comp["level"] - 1)))
             leveled_up = True
     
-        _save_companions(guild_id, char_name, comps)
+        await run(guild_id, _save_companions, guild_id, char_name, comps)
     
         if leveled_up:
             await ctx.send(
@@ -271,7 +270,7 @@ class Companion(commands.Cog):
     @comp_group.command(name="subxp")
     async def comp_sub_xp(self, ctx, char_name: str, comp_name: str, amount: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp:
             return await ctx.send("❌ Companion tidak ditemukan.")
     
@@ -291,7 +290,7 @@ class Companion(commands.Cog):
         if comp["level"] == 1 and comp["xp"] < 0:
             comp["xp"] = 0
     
-        _save_companions(guild_id, char_name, comps)
+        await run(guild_id, _save_companions, guild_id, char_name, comps)
     
         if leveled_down:
             await ctx.send(
@@ -307,7 +306,7 @@ class Companion(commands.Cog):
     # RESOURCE MANAGEMENT (HP/STM/ENE)
     # ===============================
     async def _save_and_reply(self, ctx, guild_id, char_name, comps, comp, field, old, new):
-        _save_companions(guild_id, char_name, comps)
+        await run(guild_id, _save_companions, guild_id, char_name, comps)
         bar = lambda a, b: "█" * int(12 * (a / max(b, 1))) + "░" * int(12 - 12 * (a / max(b, 1)))
         symbol = "❤️" if "hp" in field else "🔋" if "energy" in field else "⚡"
         await ctx.send(f"{symbol} {comp['name']} → {field.upper()} {old} → {new} [{bar(new, comp.get(field.replace('_max',''), new))}]")
@@ -315,7 +314,7 @@ class Companion(commands.Cog):
     @commands.command(name="cdmg")
     async def comp_damage(self, ctx, char_name: str, comp_name: str, amount: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp: return await ctx.send("❌ Companion tidak ditemukan.")
         old, new = comp.get("hp", 0), max(0, comp.get("hp", 0) - amount)
         comp["hp"] = new
@@ -324,7 +323,7 @@ class Companion(commands.Cog):
     @commands.command(name="cheal")
     async def comp_heal(self, ctx, char_name: str, comp_name: str, amount: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp: return await ctx.send("❌ Companion tidak ditemukan.")
         old, mx = comp.get("hp", 0), comp.get("hp_max", 0)
         new = min(mx, old + amount)
@@ -334,7 +333,7 @@ class Companion(commands.Cog):
     @commands.command(name="cusestm")
     async def comp_use_stamina(self, ctx, char_name: str, comp_name: str, amount: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp: return await ctx.send("❌ Companion tidak ditemukan.")
         old, new = comp.get("stamina", 0), max(0, comp.get("stamina", 0) - amount)
         comp["stamina"] = new
@@ -343,7 +342,7 @@ class Companion(commands.Cog):
     @commands.command(name="caddstm")
     async def comp_add_stamina(self, ctx, char_name: str, comp_name: str, amount: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp: return await ctx.send("❌ Companion tidak ditemukan.")
         old, mx = comp.get("stamina", 0), comp.get("stamina_max", 0)
         new = min(mx, old + amount)
@@ -353,7 +352,7 @@ class Companion(commands.Cog):
     @commands.command(name="cuseene")
     async def comp_use_energy(self, ctx, char_name: str, comp_name: str, amount: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp: return await ctx.send("❌ Companion tidak ditemukan.")
         old, new = comp.get("energy", 0), max(0, comp.get("energy", 0) - amount)
         comp["energy"] = new
@@ -362,7 +361,7 @@ class Companion(commands.Cog):
     @commands.command(name="caddene")
     async def comp_add_energy(self, ctx, char_name: str, comp_name: str, amount: int):
         guild_id = ctx.guild.id
-        comps, comp = self._get_comp(guild_id, char_name, comp_name)
+        comps, comp = await run(guild_id, self._get_comp, guild_id, char_name, comp_name)
         if not comp: return await ctx.send("❌ Companion tidak ditemukan.")
         old, mx = comp.get("energy", 0), comp.get("energy_max", 0)
         new = min(mx, old + amount)
@@ -2,7 +2,7 @@
 import json
 import discord
 from discord.ext import commands
-from utils.db import fetchone
+from utils.db import run, afetchone
 from services import effect_service
 
 
@@ -59,7 +59,7 @@ class EffectCog(commands.Cog):
             elif desc.startswith("'") and desc.endswith("'"):
                 desc = desc[1:-1]
 
-            effect_service.add_effect_lib(
+            await run(ctx.guild.id, effect_service.add_effect_lib,
                 ctx.guild.id, name, e_type, target_stat, formula,
                 duration, stack_mode, desc, max_stack
             )
@@ -77,7 +77,7 @@ class EffectCog(commands.Cog):
     async def effect_edit_single(self, ctx, name: str, field: str, *, value: str):
         """Edit satu field dari efek (misal desc, formula, duration)."""
         try:
-            ok = effect_service.update_effect_field(ctx.guild.id, name, field, value)
+            ok = await run(ctx.guild.id, effect_service.update_effect_field, ctx.guild.id, name, field, value)
             if not ok:
                 return await ctx.send(f"❌ Efek **{name}** tidak ditemukan atau field tidak valid.")
             await ctx.send(f"✅ Efek **{name}** diperbarui: **{field}** → `{value}`")
@@ -93,7 +93,7 @@ class EffectCog(commands.Cog):
         !effect editfield poison desc="Racun berat" duration=4 formula=-2
         """
         try:
-            current = effect_service.get_effect_lib(ctx.guild.id, name)
+            current = await run(ctx.guild.id, effect_service.get_effect_lib, ctx.guild.id, name)
             if not current:
                 return await ctx.send(f"❌ Efek **{name}** tidak ditemukan di library.")
 
@@ -118,7 +118,7 @@ class EffectCog(commands.Cog):
                 current[k] = v
             after_preview = "\n".join([f"{k}: {current.get(k)}" for k in changes.keys()])
 
-            effect_service.add_effect_lib(
+            await run(ctx.guild.id, effect_service.add_effect_lib,
                 ctx.guild.id,
                 name,
                 current["type"],
@@ -143,7 +143,7 @@ class EffectCog(commands.Cog):
     # === LIST (DENGAN PAGE) ===
     @effect_group.command(name="list")
     async def effect_list(self, ctx):
-        rows = effect_service.list_effects_lib(ctx.guild.id)
+        rows = await run(ctx.guild.id, effect_service.list_effects_lib, ctx.guild.id)
         if not rows:
             return await ctx.send("ℹ️ Library efek kosong. Tambahkan dengan `!effect add`.")
 
@@ -218,7 +218,7 @@ class EffectCog(commands.Cog):
     # === INFO ===
     @effect_group.command(name="info")
     async def effect_info(self, ctx, name: str):
-        r = effect_service.get_effect_lib(ctx.guild.id, name)
+        r = await run(ctx.guild.id, effect_service.get_effect_lib, ctx.guild.id, name)
         if not r:
             return await ctx.send(f"❌ Efek **{name}** tidak ditemukan.")
         desc = (
@@ -236,7 +236,7 @@ class EffectCog(commands.Cog):
     # === REMOVE ===
     @effect_group.command(name="remove")
     async def effect_remove(self, ctx, name: str):
-        ok = effect_service.remove_effect_lib(ctx.guild.id, name)
+        ok = await run(ctx.guild.id, effect_service.remove_effect_lib, ctx.guild.id, name)
         if not ok:
             return await ctx.send(f"❌ Efek **{name}** tidak ditemukan.")
         await ctx.send(f"🗑️ Efek **{name}** dihapus dari library.")
@@ -244,7 +244,7 @@ class EffectCog(commands.Cog):
     # === ACTIVE EFFECTS ===
     @effect_group.command(name="active")
     async def effect_active(self, ctx, *, target_name: str):
-        ok, table, effs = effect_service.get_active_effects(ctx.guild.id, target_name)
+        ok, table, effs = await run(ctx.guild.id, effect_service.get_active_effects, ctx.guild.id, target_name)
         if not ok:
             return await ctx.send(table)
         if not effs:
@@ -302,7 +302,7 @@ class EffectCog(commands.Cog):
     async def tick(self, ctx):
         results = await effect_service.tick_effects(ctx.guild.id)
         engaged_names = []
-        row = fetchone(ctx.guild.id, "SELECT order_json FROM initiative LIMIT 1")
+        row = await afetchone(ctx.guild.id, "SELECT order_json FROM initiative LIMIT 1")
         if row:
             try:
                 engaged_names = [n for n, _ in json.loads(row["order_json"] or "[]")]
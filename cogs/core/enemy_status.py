@@ -1,9 +1,8 @@
 import math
-import json
 import discord
 from discord.ext import commands
-from utils.db import fetchall, fetchone, execute
-from services import status_service, effect_service
+from utils.db import execute, run, afetchone, afetchall, aexecute, ensure_once
+from services import status_service, effect_service, encounter_service
 
 # ===== Utility =====
 
@@ -66,7 +65,7 @@ def make_embed(enemies: list, title="👹 Enemy Status", mode="player"):
         return embed
 
     for e in enemies:
-        effects = json.loads(e.get("effects") or "[]")
+        effects = e.get("effects") or []
 
         buffs = [eff for eff in effects if eff.get("type", "").lower() == "buff"]
         debuffs = [eff for eff in effects if eff.get("type", "").lower() == "debuff"]
@@ -109,6 +108,9 @@ class EnemyStatus(commands.Cog):
         self.bot = bot
 
     def _ensure_table(self, guild_id: int):
+        ensure_once(guild_id, "enemies", self._create_table)
+
+    def _create_table(self, guild_id: int):
         execute(
             guild_id,
             """
@@ -141,29 +143,34 @@ class EnemyStatus(commands.Cog):
     @enemy.command(name="add")
     async def enemy_add(self, ctx, name: str, hp: int, energy: int, stamina: int):
         guild_id = ctx.guild.id
-        self._ensure_table(guild_id)
-        exists = fetchone(guild_id, "SELECT id FROM enemies WHERE name=?", (name,))
+        await run(guild_id, self._ensure_table, guild_id)
+        exists = await afetchone(guild_id, "SELECT id FROM enemies WHERE name=?", (name,))
         if exists:
-            execute(guild_id, """
+            await run(guild_id, encounter_service.drop, guild_id, "enemies", name)
+            await aexecute(guild_id, """
                 UPDATE enemies
                 SET hp=?, hp_max=?, energy=?, energy_max=?, stamina=?, stamina_max=?, ac=10, updated_at=CURRENT_TIMESTAMP
                 WHERE id=?
             """, (hp, hp, energy, energy, stamina, stamina, exists["id"]))
+            await run(guild_id, encounter_service.track, guild_id, "enemies", name)
             await ctx.send(f"♻️ Enemy **{name}** diperbarui.")
         else:
-            execute(guild_id, """
+            await aexecute(guild_id, """
                 INSERT INTO enemies (name, hp, hp_max, energy, energy_max, stamina, stamina_max, ac)
                 VALUES (?,?,?,?,?,?,?,10)
             """, (name, hp, hp, energy, energy, stamina, stamina))
+            await run(guild_id, encounter_service.track, guild_id, "enemies", name)
             await ctx.send(f"👹 Enemy **{name}** ditambahkan.")
 
     # === Show (Player) ===
     @enemy.command(name="show")
     async def enemy_show(self, ctx, *, name: str = None):
         guild_id = ctx.guild.id
-        rows = [fetchone(guild_id, "SELECT * FROM enemies WHERE name=?", (name,))] if name else fetchall(guild_id, "SELECT * FROM enemies")
+        rows = [await afetchone(guild_id, "SELECT * FROM enemies WHERE name=?", (name,))] if name else await afetchall(guild_id, "SELECT * FROM enemies")
         if not rows:
             return await ctx.send("❌ Enemy tidak ditemukan.")
+        encounter_service.overlay(guild_id, "enemies", rows)
+        await run(guild_id, effect_service.attach_effects, guild_id, "enemies", rows)
         title = f"👹 Enemy Status: {name}" if name else "👹 Enemy Status (All)"
         embed = make_embed(rows, title=title, mode="player")
         await ctx.send(embed=embed)
@@ -172,9 +179,11 @@ class EnemyStatus(commands.Cog):
     @enemy.command(name="gmshow")
     async def enemy_gmshow(self, ctx, *, name: str = None):
         guild_id = ctx.guild.id
-        rows = [fetchone(guild_id, "SELECT * FROM enemies WHERE name=?", (name,))] if name else fetchall(guild_id, "SELECT * FROM enemies")
+        rows = [await afetchone(guild_id, "SELECT * FROM enemies WHERE name=?", (name,))] if name else await afetchall(guild_id, "SELECT * FROM enemies")
         if not rows:
             return await ctx.send("❌ Enemy tidak ditemukan.")
+        encounter_service.overlay(guild_id, "enemies", rows)
+        await run(guild_id, effect_service.attach_effects, guild_id, "enemies", rows)
         title = f"🎭 GM Enemy Status: {name}" if name else "🎭 GM Enemy Status (All)"
         embed = make_embed(rows, title=title, mode="gm")
         await ctx.send(embed=embed)
@@ -229,16 +238,18 @@ class EnemyStatus(commands.Cog):
     @enemy.command(name="remove")
     async def enemy_remove(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        row = fetchone(guild_id, "SELECT id FROM enemies WHERE name=?", (name,))
+        row = await afetchone(guild_id, "SELECT id FROM enemies WHERE name=?", (name,))
         if not row:
             return await ctx.send(f"❌ Enemy **{name}** tidak ditemukan.")
-        execute(guild_id, "DELETE FROM enemies WHERE name=?", (name,))
+        await run(guild_id, encounter_service.drop, guild_id, "enemies", name)
+        await aexecute(guild_id, "DELETE FROM enemies WHERE name=?", (name,))
         await ctx.send(f"🗑️ Enemy **{name}** dihapus.")
 
     @enemy.command(name="clear")
     async def enemy_clear(self, ctx):
         guild_id = ctx.guild.id
-        execute(guild_id, "DELETE FROM enemies")
+        await run(guild_id, encounter_service.drop, guild_id, "enemies")
+        await aexecute(guild_id, "DELETE FROM enemies")
         await ctx.send("🧹 Semua enemy dihapus.")
 
     # === Alias Cepat ===
@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from services import equipment_service, item_service
+from utils.db import run
 
 VALID_SLOTS = [
     "main_hand", "off_hand",
@@ -42,7 +43,7 @@ class Equipment(commands.Cog):
     @equip_group.command(name="set")
     async def equip_set(self, ctx, char: str, slot: str, *, item: str):
         guild_id = ctx.guild.id
-        ok, msg = equipment_service.equip_item(
+        ok, msg = await run(guild_id, equipment_service.equip_item,
             guild_id, char, slot, item, user_id=str(ctx.author.id)
         )
         embed = discord.Embed(
@@ -58,7 +59,7 @@ class Equipment(commands.Cog):
     @equip_group.command(name="remove")
     async def equip_remove(self, ctx, char: str, slot: str):
         guild_id = ctx.guild.id
-        ok, msg = equipment_service.unequip_item(
+        ok, msg = await run(guild_id, equipment_service.unequip_item,
             guild_id, char, slot, user_id=str(ctx.author.id)
         )
         embed = discord.Embed(
@@ -74,7 +75,7 @@ class Equipment(commands.Cog):
     @equip_group.command(name="remove_mod")
     async def equip_remove_mod(self, ctx, char: str, *, item: str):
         guild_id = ctx.guild.id
-        ok, msg = equipment_service.remove_mod(
+        ok, msg = await run(guild_id, equipment_service.remove_mod,
             guild_id, char, item, user_id=str(ctx.author.id)
         )
         embed = discord.Embed(
@@ -90,7 +91,7 @@ class Equipment(commands.Cog):
     @equip_group.command(name="show")
     async def equip_show(self, ctx, char: str):
         guild_id = ctx.guild.id
-        eq_dict = equipment_service.get_equipment_dict(guild_id, char)
+        eq_dict = await run(guild_id, equipment_service.get_equipment_dict, guild_id, char)
         if not eq_dict:
             return await ctx.send(f"❌ Karakter **{char}** tidak ditemukan.")
 
@@ -117,7 +118,7 @@ class Equipment(commands.Cog):
             # Tangani slot selain mod
             if slot != "mod":
                 item_name = eq_dict.get(slot, "(kosong)")
-                item_data = item_service.get_item(guild_id, item_name)  # ✅ FIXED
+                item_data = await run(guild_id, item_service.get_item, guild_id, item_name)  # ✅ FIXED
                 desc_lines = []
                 if item_data:
                     if item_data.get("effect"):
@@ -141,12 +142,12 @@ class Equipment(commands.Cog):
         # === SLOT MODS ===
         embed.add_field(name="\u200b", value=CATEGORY_DIVIDERS["mod"], inline=False)
 
-        mods = equipment_service.get_mod_list(guild_id, char)
+        mods = await run(guild_id, equipment_service.get_mod_list, guild_id, char)
         if not mods:
             embed.add_field(name="(mod slot)", value="(kosong)\n\u200b", inline=False)
         else:
             for mod_name in mods:
-                item_data = item_service.get_item(guild_id, mod_name)  # ✅ FIXED
+                item_data = await run(guild_id, item_service.get_item, guild_id, mod_name)  # ✅ FIXED
                 desc_lines = []
                 if item_data:
                     if item_data.get("effect"):
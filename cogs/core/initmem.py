@@ -6,13 +6,17 @@ import re
 import discord
 from discord.ext import commands
 
-from utils.db import execute, fetchone, fetchall
+from utils.db import execute, fetchone, run, afetchall, aexecute, ensure_once
+from services import encounter_service
 
 # ===============================
 # DB Helpers & Setup
 # ===============================
 
 def _ensure_tables(guild_id: int):
+    ensure_once(guild_id, "initiative", _create_tables)
+
+def _create_tables(guild_id: int):
     execute(guild_id, """
     CREATE TABLE IF NOT EXISTS initiative (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -37,7 +41,12 @@ def _load_initiative(guild_id: int):
         "round": int(row["round"] or 1)
     }
 
+def _open_initiative(guild_id: int):
+    _ensure_tables(guild_id)
+    return _load_initiative(guild_id)
+
 def _save_initiative(guild_id: int, state: dict):
+    _ensure_tables(guild_id)
     order_json = json.dumps(state.get("order", []))
     ptr = int(state.get("ptr", 0))
     rnd = int(state.get("round", 1))
@@ -103,16 +112,20 @@ class InitiativeMemory(commands.Cog):
         self.state = {}
 
     # ---------- internal helpers ----------
-    def _ensure_state(self, ctx):
+    # I/O SQLite lewat run() (thread DB, antrian per guild) supaya event loop tidak terblok
+    async def _ensure_state(self, ctx):
         guild_id = ctx.guild.id
         if guild_id not in self.state:
-            _ensure_tables(guild_id)
-            self.state[guild_id] = _load_initiative(guild_id)
+            state = await run(guild_id, _open_initiative, guild_id)
+            self.state.setdefault(guild_id, state)
         return self.state[guild_id]
 
-    def _persist(self, ctx):
+    async def _persist(self, ctx):
         guild_id = ctx.guild.id
-        _save_initiative(guild_id, self.state[guild_id])
+        s = self.state[guild_id]
+        # snapshot: state bisa berubah lagi selagi tulisan ini masih antre
+        snapshot = {"order": list(s["order"]), "ptr": s["ptr"], "round": s["round"]}
+        await run(guild_id, _save_initiative, guild_id, snapshot)
 
     # ---------- group ----------
     @commands.group(name="init", invoke_without_command=True)
@@ -138,12 +151,12 @@ class InitiativeMemory(commands.Cog):
     # ---------- add ----------
     @init_group.command(name="add")
     async def init_add(self, ctx, name: str, score: int):
-        s = self._ensure_state(ctx)
+        s = await self._ensure_state(ctx)
         existing = {n: sc for (n, sc) in s["order"]}
         existing[name] = int(score)
         s["order"] = _sorted_order(list(existing.items()))
         s["ptr"] = s["ptr"] % len(s["order"]) if s["order"] else 0
-        self._persist(ctx)
+        await self._persist(ctx)
 
         embed = discord.Embed(
             title="✅ Peserta Ditambahkan / Diupdate",
@@ -162,7 +175,7 @@ class InitiativeMemory(commands.Cog):
         if not entries:
             return await ctx.send("⚠️ Format: `!init addmany Alice 18, Goblin 12`")
 
-        s = self._ensure_state(ctx)
+        s = await self._ensure_state(ctx)
         existing = {n: sc for (n, sc) in s["order"]}
         chunks = [c.strip() for c in re.split(r'[,\n;|]+', entries) if c.strip()]
         added = 0
@@ -186,7 +199,7 @@ class InitiativeMemory(commands.Cog):
             preview = ", ".join(skipped[:5]) + (" ..." if len(skipped) > 5 else "")
             desc += f"\n⚠️ Di-skip: {preview}"
 
-        self._persist(ctx)
+        await self._persist(ctx)
         embed = discord.Embed(
             title="📥 Add Many",
             description=desc,
@@ -197,12 +210,12 @@ class InitiativeMemory(commands.Cog):
     # ---------- remove / clear ----------
     @init_group.command(name="remove")
     async def init_remove(self, ctx, name: str):
-        s = self._ensure_state(ctx)
+        s = await self._ensure_state(ctx)
         before = len(s["order"])
         s["order"] = [(n, sc) for (n, sc) in s["order"] if n.lower() != name.lower()]
         if len(s["order"]) < before:
             s["ptr"] = s["ptr"] % len(s["order"]) if s["order"] else 0
-            self._persist(ctx)
+            await self._persist(ctx)
             embed = discord.Embed(
                 title="🗑️ Peserta Dihapus",
                 description=f"**{name}** dihapus dari urutan.",
@@ -216,7 +229,8 @@ class InitiativeMemory(commands.Cog):
     async def init_clear(self, ctx):
         guild_id = ctx.guild.id
         self.state[guild_id] = {"order": [], "ptr": 0, "round": 1}
-        self._persist(ctx)
+        await self._persist(ctx)
+        await encounter_service.end(guild_id)
         embed = discord.Embed(
             title="🧹 Initiative Reset",
             description="Semua peserta dihapus. Urutan kosong.",
@@ -228,16 +242,16 @@ class InitiativeMemory(commands.Cog):
     @init_group.command(name="show")
     async def init_show(self, ctx):
         guild_id = ctx.guild.id
-        self.state[guild_id] = _load_initiative(guild_id)
-        s = self._ensure_state(ctx)
-        self._persist(ctx)
+        self.state[guild_id] = await run(guild_id, _open_initiative, guild_id)
+        s = await self._ensure_state(ctx)
+        await self._persist(ctx)
         embed = _make_embed(ctx, "⚔️ Initiative Order", s)
         await ctx.send(embed=embed)
 
     # ---------- next / setptr / round / shuffle ----------
     @init_group.command(name="next")
     async def init_next(self, ctx):
-        s = self._ensure_state(ctx)
+        s = await self._ensure_state(ctx)
         if not s["order"]:
             return await ctx.send("⚠️ Belum ada peserta.")
 
@@ -246,7 +260,7 @@ class InitiativeMemory(commands.Cog):
             s["round"] += 1
             await ctx.send(f"🔄 **Round {s['round']} dimulai!**")
 
-        self._persist(ctx)
+        await self._persist(ctx)
         embed = _make_embed(ctx, "⏭️ Initiative Next", s)
         current = s["order"][s["ptr"]][0]
         embed.add_field(name="Giliran Saat Ini", value=f"✨ **{current}**", inline=False)
@@ -254,31 +268,31 @@ class InitiativeMemory(commands.Cog):
 
     @init_group.command(name="setptr")
     async def init_setptr(self, ctx, index: int):
-        s = self._ensure_state(ctx)
+        s = await self._ensure_state(ctx)
         if not s["order"]:
             return await ctx.send("⚠️ Belum ada peserta.")
         idx = max(1, min(index, len(s["order"]))) - 1
         s["ptr"] = idx
-        self._persist(ctx)
+        await self._persist(ctx)
         embed = _make_embed(ctx, "📌 Pointer Diset Manual", s)
         await ctx.send(embed=embed)
 
     @init_group.command(name="round")
     async def init_round(self, ctx, value: int = None):
-        s = self._ensure_state(ctx)
+        s = await self._ensure_state(ctx)
         if value is None:
             return await ctx.send(f"📜 Round saat ini: **{s['round']}**")
         s["round"] = max(1, int(value))
-        self._persist(ctx)
+        await self._persist(ctx)
         await ctx.send(f"📜 Round diset ke **{s['round']}**")
 
     @init_group.command(name="shuffle")
     async def init_shuffle(self, ctx):
-        s = self._ensure_state(ctx)
+        s = await self._ensure_state(ctx)
         if not s["order"]:
             return await ctx.send("⚠️ Belum ada peserta.")
         s["ptr"] = random.randint(0, len(s["order"]) - 1)
-        self._persist(ctx)
+        await self._persist(ctx)
         embed = _make_embed(ctx, "🎲 Shuffle Giliran", s)
         current = s["order"][s["ptr"]][0]
         embed.add_field(name="Giliran Pertama", value=f"👉 **{current}**", inline=False)
@@ -287,7 +301,7 @@ class InitiativeMemory(commands.Cog):
     # ---------- Engage / Victory ----------
     @commands.command(name="engage", aliases=["start", "begin"])
     async def engage(self, ctx):
-        s = self._ensure_state(ctx)
+        s = await self._ensure_state(ctx)
         if not s["order"]:
             return await ctx.send("⚠️ Belum ada data initiative.")
         drum = await ctx.send("🥁 Mengocok urutan giliran...")
@@ -297,7 +311,9 @@ class InitiativeMemory(commands.Cog):
         except Exception:
             pass
 
-        self._persist(ctx)
+        await self._persist(ctx)
+        # ⚡ Vital peserta dipegang di memori selama encounter (flush berkala + journal)
+        await encounter_service.start(ctx.guild.id)
         embed = _make_embed(ctx, "⚔️ Encounter Dimulai!", s)
         current = s["order"][s["ptr"]][0]
         embed.add_field(name="Giliran Pertama", value=f"👉 **{current}**", inline=False)
@@ -309,14 +325,15 @@ class InitiativeMemory(commands.Cog):
         keep_enemies = "keep" in flags
         force_end = "force" in flags
 
-        s = self._ensure_state(ctx)
+        s = await self._ensure_state(ctx)
         order = s.get("order", [])
         ptr = s.get("ptr", 0)
         rnd = s.get("round", 1)
         current_turn = order[ptr][0] if order else "-"
 
         guild_id = ctx.guild.id
-        enemies = fetchall(guild_id, "SELECT name, hp FROM enemies")
+        await run(guild_id, encounter_service.flush, guild_id)
+        enemies = await afetchall(guild_id, "SELECT name, hp FROM enemies")
         total = len(enemies)
         alive = sum(1 for e in enemies if int(e["hp"] or 0) > 0)
         defeated = total - alive
@@ -337,10 +354,11 @@ class InitiativeMemory(commands.Cog):
         embed.add_field(name="✨ Giliran Terakhir", value=current_turn, inline=True)
 
         self.state[guild_id] = {"order": [], "ptr": 0, "round": 1}
-        self._persist(ctx)
+        await self._persist(ctx)
+        await encounter_service.end(guild_id)
 
         if not keep_enemies:
-            execute(guild_id, "DELETE FROM enemies")
+            await aexecute(guild_id, "DELETE FROM enemies")
 
         await ctx.send(embed=embed)
 
@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 from services import inventory_service, item_service
-from utils.db import fetchone, fetchall
+from utils.db import run, afetchone, afetchall
 import math
 
 
@@ -14,7 +14,7 @@ class Inventory(commands.Cog):
     async def inv_group(self, ctx):
         await ctx.send(
             "Gunakan: `!inv add`, `!inv remove`, `!inv drop`, `!inv clear`, "
-            "`!inv show`, `!inv transfer`, `!inv meta`, `!inv use`, `!inv recalc_all`"
+            "`!inv show`, `!inv transfer`, `!inv loot`, `!inv meta`, `!inv use`, `!inv recalc [nama]`"
         )
 
     # === Tambah item ===
@@ -27,7 +27,7 @@ class Inventory(commands.Cog):
                 k, v = p.split("=", 1)
                 metadata[k.strip()] = v.strip()
 
-        ok = inventory_service.add_item(
+        ok = await run(guild_id, inventory_service.add_item,
             guild_id, owner, item, qty,
             metadata=metadata, user_id=str(ctx.author.id)
         )
@@ -39,11 +39,35 @@ class Inventory(commands.Cog):
 
         await ctx.send(f"📦 {qty}x **{item}** ditambahkan ke inventory {owner}.")
 
+    # === Bagikan loot (drop musuh dsb) ke banyak owner sekaligus ===
+    @inv_group.command(name="loot")
+    async def inv_loot(self, ctx, owners: str, *entries):
+        """!inv loot Udab,Nyx "Rust Shiv" 2 Potion 3 → tiap owner dapat semua item di daftar."""
+        guild_id = ctx.guild.id
+        items, i = {}, 0
+        while i < len(entries):
+            name, qty = entries[i], 1
+            if i + 1 < len(entries) and entries[i + 1].isdigit():
+                qty = int(entries[i + 1])
+                i += 1
+            items[name] = items.get(name, 0) + qty
+            i += 1
+        names = [o.strip() for o in owners.split(",") if o.strip()]
+        if not names or not items:
+            return await ctx.send("⚠️ Gunakan: `!inv loot <Char1,Char2> <Item> [Qty] [Item] [Qty] ...`")
+
+        res = await run(guild_id, inventory_service.distribute_loot,
+                        guild_id, {o: dict(items) for o in names}, user_id=str(ctx.author.id))
+        lines = [f"🎁 {o}: " + ", ".join(f"{q}x **{it}**" for it, q in got.items())
+                 for o, got in res["given"].items()]
+        lines += [f"❌ {o} tidak sanggup membawa loot (melebihi kapasitas)." for o in res["rejected"]]
+        await ctx.send("\n".join(lines))
+
     # === Hapus item ===
     @inv_group.command(name="remove")
     async def inv_remove(self, ctx, owner: str, item: str, qty: int = 1):
         guild_id = ctx.guild.id
-        ok = inventory_service.remove_item(guild_id, owner, item, qty, user_id=str(ctx.author.id))
+        ok = await run(guild_id, inventory_service.remove_item, guild_id, owner, item, qty, user_id=str(ctx.author.id))
         if ok:
             await ctx.send(f"🗑️ {qty}x **{item}** dihapus dari inventory {owner}.")
         else:
@@ -53,7 +77,7 @@ class Inventory(commands.Cog):
     @inv_group.command(name="drop")
     async def inv_drop(self, ctx, owner: str, item: str, qty: int = 1):
         guild_id = ctx.guild.id
-        ok = inventory_service.remove_item(guild_id, owner, item, qty, user_id=str(ctx.author.id))
+        ok = await run(guild_id, inventory_service.remove_item, guild_id, owner, item, qty, user_id=str(ctx.author.id))
         if ok:
             await ctx.send(f"📤 {owner} menjatuhkan {qty}x **{item}** ke tanah.")
         else:
@@ -63,12 +87,12 @@ class Inventory(commands.Cog):
     @inv_group.command(name="clear")
     async def inv_clear(self, ctx, owner: str):
         guild_id = ctx.guild.id
-        items = inventory_service.get_inventory(guild_id, owner)
+        items = await run(guild_id, inventory_service.get_inventory, guild_id, owner)
         if not items:
             return await ctx.send(f"ℹ️ Inventory {owner} sudah kosong.")
 
         for it in items:
-            inventory_service.remove_item(guild_id, owner, it["item"], it["qty"], user_id=str(ctx.author.id))
+            await run(guild_id, inventory_service.remove_item, guild_id, owner, it["item"], it["qty"], user_id=str(ctx.author.id))
 
         await ctx.send(f"🧹 Semua item di inventory **{owner}** telah dibersihkan.")
 
@@ -76,18 +100,22 @@ class Inventory(commands.Cog):
     @inv_group.command(name="show")
     async def inv_show(self, ctx, owner: str = "party"):
         guild_id = ctx.guild.id
-        items = inventory_service.get_inventory(guild_id, owner)
+        items = await run(guild_id, inventory_service.get_inventory, guild_id, owner)
         if not items:
             return await ctx.send(f"ℹ️ Inventory {owner} kosong.")
 
         # cek carry
-        char = fetchone(guild_id, "SELECT carry_capacity, carry_used FROM characters WHERE name=?", (owner,))
+        char = await afetchone(guild_id, "SELECT carry_capacity, carry_used FROM characters WHERE name=?", (owner,))
         carry_desc = None
         if char:
             cap = char.get("carry_capacity", 0) or 0
             used = char.get("carry_used", 0) or 0
             carry_desc = f"⚖️ Carry: **{used:.1f} / {cap:.1f}**\n-----------------------"
 
+        # detail katalog diambil sekali (cache katalog), paging cukup baca dari sini
+        found = await run(guild_id, item_service.get_items, guild_id, [it["item"] for it in items])
+        catalog = {it["item"]: found.get(item_service.normalize_name(it["item"])) for it in items}
+
         # fungsi buat bikin embed per page
         def make_page(page_idx: int):
             ITEMS_PER_PAGE = 4
@@ -104,7 +132,7 @@ class Inventory(commands.Cog):
 
             item_lines = []
             for it in subset:
-                item = item_service.get_item(guild_id, it["item"])
+                item = catalog.get(it["item"])
                 icon = item.get("icon", "📦") if item else "📦"
                 effect = item.get("effect", "-") if item else "-"
                 drawback = item.get("drawback", "") if item else ""
@@ -163,7 +191,7 @@ class Inventory(commands.Cog):
     @inv_group.command(name="transfer")
     async def inv_transfer(self, ctx, from_owner: str, to_owner: str, item: str, qty: int = 1):
         guild_id = ctx.guild.id
-        ok = inventory_service.transfer_item(guild_id, from_owner, to_owner, item, qty, user_id=str(ctx.author.id))
+        ok = await run(guild_id, inventory_service.transfer_item, guild_id, from_owner, to_owner, item, qty, user_id=str(ctx.author.id))
         if ok:
             await ctx.send(f"🔄 {qty}x **{item}** dipindahkan dari {from_owner} → {to_owner}.")
         else:
@@ -179,7 +207,7 @@ class Inventory(commands.Cog):
                 k, v = p.split("=", 1)
                 metadata[k.strip()] = v.strip()
 
-        ok = inventory_service.update_metadata(guild_id, owner, item, metadata, user_id=str(ctx.author.id))
+        ok = await run(guild_id, inventory_service.update_metadata, guild_id, owner, item, metadata, user_id=str(ctx.author.id))
         if ok:
             await ctx.send(f"📝 Metadata {item} diupdate: {metadata}")
         else:
@@ -190,16 +218,16 @@ class Inventory(commands.Cog):
     async def inv_use(self, ctx, owner: str, *, item_name: str):
         guild_id = ctx.guild.id
 
-        i = item_service.get_item(guild_id, item_name)
+        i = await run(guild_id, item_service.get_item, guild_id, item_name)
         if not i:
             return await ctx.send(f"❌ Item **{item_name}** tidak ditemukan di katalog.")
 
-        inv = inventory_service.get_inventory(guild_id, owner)
+        inv = await run(guild_id, inventory_service.get_inventory, guild_id, owner)
         entry = next((it for it in inv if it["item"].lower() == item_name.lower()), None)
         if not entry or entry["qty"] <= 0:
             return await ctx.send(f"❌ {owner} tidak punya item {item_name}.")
 
-        ok = inventory_service.remove_item(guild_id, owner, item_name, 1, user_id=str(ctx.author.id))
+        ok = await run(guild_id, inventory_service.remove_item, guild_id, owner, item_name, 1, user_id=str(ctx.author.id))
         if not ok:
             return await ctx.send(f"❌ Gagal mengurangi {item_name} dari {owner}.")
 
@@ -262,22 +290,33 @@ class Inventory(commands.Cog):
 
         await ctx.send(embed=embed)
 
-    # === Recalculate carry semua karakter ===
-    @inv_group.command(name="recalc_all")
-    async def inv_recalc_all(self, ctx):
+    # === Verifikasi carry (carry_used disimpan incremental) ===
+    @inv_group.command(name="recalc", aliases=["recalc_all"])
+    async def inv_recalc(self, ctx, name: str = None):
+        """Hitung ulang carry dari inventory + equipment, bandingkan dengan nilai tersimpan & perbaiki."""
         guild_id = ctx.guild.id
-        chars = fetchall(guild_id, "SELECT name, carry_capacity FROM characters")
-        if not chars:
-            return await ctx.send("ℹ️ Belum ada karakter.")
+        if name:
+            chars = await afetchall(guild_id, "SELECT name, carry_capacity FROM characters WHERE name=?", (name,))
+            if not chars:
+                return await ctx.send(f"❌ Karakter {name} tidak ditemukan.")
+        else:
+            chars = await afetchall(guild_id, "SELECT name, carry_capacity FROM characters")
+            if not chars:
+                return await ctx.send("ℹ️ Belum ada karakter.")
 
-        lines = []
+        lines, drift = [], 0
         for c in chars:
             if c["name"].lower() == "party":
                 continue
-            total = inventory_service.calc_carry(guild_id, c["name"])
-            cap = c.get("carry_capacity", 0)
-            lines.append(f"⚖️ {c['name']}: {total:.1f} / {cap:.1f}")
-
+            stored, actual = await run(guild_id, inventory_service.verify_carry, guild_id, c["name"])
+            cap = c.get("carry_capacity", 0) or 0
+            if abs(stored - actual) > 1e-6:
+                drift += 1
+                lines.append(f"🔧 {c['name']}: {stored:.1f} → **{actual:.1f}** / {cap:.1f}")
+            else:
+                lines.append(f"⚖️ {c['name']}: {actual:.1f} / {cap:.1f}")
+
+        lines.append("✅ Semua carry sudah sesuai." if not drift else f"🔧 {drift} karakter diperbaiki.")
         await ctx.send("\n".join(lines))
 
 
@@ -2,9 +2,9 @@ import math
 import json
 import discord
 from discord.ext import commands
-from services import status_service, inventory_service, item_service, effect_service
+from services import status_service, inventory_service, item_service, effect_service, encounter_service
 from services.equipment_service import SLOT_ICONS, SLOTS
-from utils.db import fetchall, fetchone, execute
+from utils.db import fetchone, run, afetchone, afetchall, aexecute
 
 # ===== Utility =====
 
@@ -118,7 +118,7 @@ async def make_embed(characters: list, ctx, title="🧍 Status Karakter"):
         st_text = f"{c['stamina']}/{c['stamina_max']}"
 
         # ===== Efek aktif =====
-        effects = json.loads(c.get("effects") or "[]")
+        effects = c.get("effects") or []
         buffs, debuffs = [], []
         for e in effects:
             typ = e.get("type", "").lower()
@@ -215,13 +215,13 @@ async def make_embed_page2(c, ctx):
         if not item_name:
             line = f"**🔹 {slot.title()}**\n(kosong)"
         else:
-            item = item_service.get_item(ctx.guild.id, item_name)
+            item = await run(ctx.guild.id, item_service.get_item, ctx.guild.id, item_name)
             item_icon = item.get("icon", "📦") if item else "📦"
             line = f"**🔹 {slot.title()}**\n{item_icon} {item_name}"
         equip_lines.append(line)
     mods = eq.get("mods", [])
     mod_lines = [f"• {m}" for m in mods] or ["(kosong) tidak ada mod"]
-    items = inventory_service.get_inventory(ctx.guild.id, c["name"])
+    items = await run(ctx.guild.id, inventory_service.get_inventory, ctx.guild.id, c["name"])
     inv_line = "\n".join([f"({it['qty']}x) {it['item']}" for it in items]) or "-"
     embed.add_field(name="Equipment", value="\n\n".join(equip_lines), inline=False)
     embed.add_field(name="Mods", value="\n".join(mod_lines), inline=False)
@@ -260,16 +260,18 @@ class CharacterStatus(commands.Cog):
     @status_group.command(name="all")
     async def status_all(self, ctx):
         guild_id = ctx.guild.id
-        rows = fetchall(guild_id, "SELECT * FROM characters")
-        for r in rows: inventory_service.calc_carry(guild_id, r["name"])
+        rows = await afetchall(guild_id, "SELECT * FROM characters")
+        encounter_service.overlay(guild_id, "characters", rows)
+        await run(guild_id, effect_service.attach_effects, guild_id, "characters", rows)
         await ctx.send(embed=await make_embed(rows, ctx, title="🧍 Semua Status Karakter"))
 
     @status_group.command(name="show")
     async def status_show(self, ctx, name: str):
         guild_id = ctx.guild.id
-        inventory_service.calc_carry(guild_id, name)
-        row = fetchone(guild_id, "SELECT * FROM characters WHERE name=?", (name,))
+        row = await afetchone(guild_id, "SELECT * FROM characters WHERE name=?", (name,))
         if not row: return await ctx.send(f"❌ Karakter {name} tidak ditemukan.")
+        encounter_service.overlay(guild_id, "characters", [row])
+        await run(guild_id, effect_service.attach_effects, guild_id, "characters", [row])
         await ctx.send(embed=await make_embed([row], ctx, title=f"🧍 Status {name}"), view=StatusView(ctx, row))
 
     @status_group.command(name="effects")
@@ -335,9 +337,9 @@ class CharacterStatus(commands.Cog):
     @status_group.command(name="set")
     async def status_set(self, ctx, name: str, hp: int, energy: int, stamina: int):
         guild_id = ctx.guild.id
-        exists = fetchone(guild_id, "SELECT id FROM characters WHERE name=?", (name,))
+        exists = await afetchone(guild_id, "SELECT id FROM characters WHERE name=?", (name,))
         if not exists:
-            execute(guild_id, """
+            await aexecute(guild_id, """
                 INSERT INTO characters (name, hp, hp_max, energy, energy_max, stamina, stamina_max)
                 VALUES (?,?,?,?,?,?,?)
             """, (name, hp, hp, energy, energy, stamina, stamina))
@@ -380,7 +382,7 @@ class CharacterStatus(commands.Cog):
     @status_group.command(name="setcarry")
     async def status_setcarry(self, ctx, name: str, capacity: float):
         guild_id = ctx.guild.id
-        execute(guild_id, "UPDATE characters SET carry_capacity=? WHERE name=?", (capacity, name))
+        await aexecute(guild_id, "UPDATE characters SET carry_capacity=? WHERE name=?", (capacity, name))
         await ctx.send(f"⚖️ Kapasitas carry {name} → {capacity}")
 
     # ==== XP & Gold ====
@@ -395,12 +397,12 @@ class CharacterStatus(commands.Cog):
     @status_group.command(name="subxp")
     async def status_subxp(self, ctx, name: str, amount: int):
         guild_id = ctx.guild.id
-        row = fetchone(guild_id, "SELECT xp FROM characters WHERE name=?", (name,))
+        row = await afetchone(guild_id, "SELECT xp FROM characters WHERE name=?", (name,))
         if not row:
             return await ctx.send(f"❌ Karakter {name} tidak ditemukan.")
         current = row["xp"] or 0
         new_val = max(0, current - amount)
-        execute(guild_id, "UPDATE characters SET xp=? WHERE name=?", (new_val, name))
+        await aexecute(guild_id, "UPDATE characters SET xp=? WHERE name=?", (new_val, name))
         await ctx.send(f"📉 {name} kehilangan {amount} XP → sisa {new_val}")
 
     @status_group.command(name="addgold")
@@ -411,25 +413,26 @@ class CharacterStatus(commands.Cog):
     @status_group.command(name="subgold")
     async def status_subgold(self, ctx, name: str, amount: int):
         guild_id = ctx.guild.id
-        row = fetchone(guild_id, "SELECT gold FROM characters WHERE name=?", (name,))
+        row = await afetchone(guild_id, "SELECT gold FROM characters WHERE name=?", (name,))
         if not row:
             return await ctx.send(f"❌ Karakter {name} tidak ditemukan.")
         current = row["gold"] or 0
         new_val = max(0, current - amount)
-        execute(guild_id, "UPDATE characters SET gold=? WHERE name=?", (new_val, name))
+        await aexecute(guild_id, "UPDATE characters SET gold=? WHERE name=?", (new_val, name))
         await ctx.send(f"💸 {name} mengeluarkan {amount} gold → sisa {new_val}")
 
     # ==== Party ====
     @commands.command(name="party")
     async def party(self, ctx):
         guild_id = ctx.guild.id
-        chars = fetchall(guild_id, "SELECT * FROM characters")
-        allies = fetchall(guild_id, "SELECT * FROM allies") if _table_exists(guild_id, "allies") else []
+        chars = await afetchall(guild_id, "SELECT * FROM characters")
+        allies = await afetchall(guild_id, "SELECT * FROM allies") if await run(guild_id, _table_exists, guild_id, "allies") else []
         if not chars and not allies:
             return await ctx.send("ℹ️ Belum ada karakter atau ally.")
+        encounter_service.overlay(guild_id, "characters", chars)
+        encounter_service.overlay(guild_id, "allies", allies)
         lines = ["🧑‍🤝‍🧑 **Party Status**"]
         for c in chars:
-            inventory_service.calc_carry(guild_id, c["name"])
             hp_text = f"{c['hp']}/{c['hp_max']} [{_bar(c['hp'], c['hp_max'])}]"
             en_text = f"{c['energy']}/{c['energy_max']} [{_bar(c['energy'], c['energy_max'])}]"
             st_text = f"{c['stamina']}/{c['stamina_max']} [{_bar(c['stamina'], c['stamina_max'])}]"
@@ -442,10 +445,11 @@ class CharacterStatus(commands.Cog):
     @status_group.command(name="remove")
     async def status_remove(self, ctx, name: str):
         guild_id = ctx.guild.id
-        row = fetchone(guild_id, "SELECT id FROM characters WHERE name=?", (name,))
+        row = await afetchone(guild_id, "SELECT id FROM characters WHERE name=?", (name,))
         if not row:
             return await ctx.send(f"❌ Karakter **{name}** tidak ditemukan.")
-        execute(guild_id, "DELETE FROM characters WHERE name=?", (name,))
+        await run(guild_id, encounter_service.drop, guild_id, "characters", name)
+        await aexecute(guild_id, "DELETE FROM characters WHERE name=?", (name,))
         await ctx.send(f"🗑️ Karakter **{name}** berhasil dihapus.")
 
 async def setup(bot):
@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 from cogs.world.encyclopedia import RACES
-from utils.db import get_recent, save_memory   # ✅ ganti ke utils.db
+from utils.db import get_recent, save_memory, run   # ✅ ganti ke utils.db
 import json
 
 # ===== Helper =====
@@ -31,7 +31,7 @@ class RaceManager(commands.Cog):
         if not race:
             return await ctx.send("❌ Race tidak ditemukan di encyclopedia.")
 
-        c = load_char(str(ctx.guild.id), str(ctx.channel.id), char_name)
+        c = await run(str(ctx.guild.id), load_char, str(ctx.guild.id), str(ctx.channel.id), char_name)
         if not c:
             return await ctx.send("❌ Karakter tidak ditemukan.")
 
@@ -45,7 +45,7 @@ class RaceManager(commands.Cog):
         c["traits"] = list(set(c.get("traits", []) + race.get("traits", [])))
         c["resist"] = list(set(c.get("resist", []) + race.get("resist", [])))
 
-        save_char(str(ctx.guild.id), str(ctx.channel.id), ctx.author.id, char_name, c)
+        await run(str(ctx.guild.id), save_char, str(ctx.guild.id), str(ctx.channel.id), ctx.author.id, char_name, c)
         await ctx.send(f"✅ {char_name} sekarang adalah {race_name}. Bonus & traits diterapkan.")
 
 async def setup(bot):
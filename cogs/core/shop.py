@@ -2,6 +2,7 @@
 import discord
 from discord.ext import commands
 from services import shop_service, item_service, npc_service
+from utils.db import run
 
 class Shop(commands.Cog):
     def __init__(self, bot):
@@ -23,11 +24,11 @@ class Shop(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def shop_gmlist(self, ctx, npc_name: str):
         guild_id = ctx.guild.id
-        npc = npc_service.get_npc(guild_id, npc_name)
+        npc = await run(guild_id, npc_service.get_npc, guild_id, npc_name)
         if not npc:
             return await ctx.send(f"❌ NPC {npc_name} tidak ditemukan.")
 
-        rows = shop_service.list_items(guild_id, npc_name, gm_view=True)
+        rows = await run(guild_id, shop_service.list_items, guild_id, npc_name, gm_view=True)
         embed = discord.Embed(
             title=f"🛒 [GM] Dagangan {npc_name}",
             color=discord.Color.dark_gold()
@@ -40,7 +41,7 @@ class Shop(commands.Cog):
     @shop_group.command(name="list")
     async def shop_list(self, ctx, npc_name: str, char_name: str = None):
         guild_id = ctx.guild.id
-        npc = npc_service.get_npc(guild_id, npc_name)
+        npc = await run(guild_id, npc_service.get_npc, guild_id, npc_name)
         if not npc:
             return await ctx.send(f"❌ NPC {npc_name} tidak ditemukan.")
 
@@ -48,7 +49,7 @@ class Shop(commands.Cog):
         if not char_name:
             char_name = ctx.author.display_name
 
-        rows = shop_service.list_items(guild_id, npc_name, char_name=char_name)
+        rows = await run(guild_id, shop_service.list_items, guild_id, npc_name, char_name=char_name)
         embed = discord.Embed(
             title=f"🛒 Dagangan {npc_name}",
             color=discord.Color.green()
@@ -61,11 +62,11 @@ class Shop(commands.Cog):
     @shop_group.command(name="add")
     async def shop_add(self, ctx, npc_name: str, item: str, price: str = "-", stock: int = -1):
         guild_id = ctx.guild.id
-        npc = npc_service.get_npc(guild_id, npc_name)
+        npc = await run(guild_id, npc_service.get_npc, guild_id, npc_name)
         if not npc:
             return await ctx.send(f"❌ NPC {npc_name} tidak ditemukan. Tambahkan dulu dengan `!npc add`.")
 
-        it = item_service.get_item(guild_id, item)
+        it = await run(guild_id, item_service.get_item, guild_id, item)
         if not it:
             return await ctx.send(f"❌ Item {item} tidak ada di katalog. Tambahkan dulu dengan `!item add`.")
 
@@ -79,7 +80,7 @@ class Shop(commands.Cog):
                 return await ctx.send("❌ Harga harus angka atau '-'.")
 
         # ✅ simpan ke shop
-        shop_service.add_item(guild_id, npc_name, item, price_val, stock)
+        await run(guild_id, shop_service.add_item, guild_id, npc_name, item, price_val, stock)
         await ctx.send(
             f"✅ {npc_name} sekarang menjual {item} seharga {price_val} gold "
             f"(stock {stock if stock>=0 else '∞'})."
@@ -89,25 +90,25 @@ class Shop(commands.Cog):
     @shop_group.command(name="remove")
     async def shop_remove(self, ctx, npc_name: str, item: str):
         guild_id = ctx.guild.id
-        shop_service.remove_item(guild_id, npc_name, item)
+        await run(guild_id, shop_service.remove_item, guild_id, npc_name, item)
         await ctx.send(f"🗑️ {item} dihapus dari dagangan {npc_name}.")
 
     # ==== Clear dagangan ====
     @shop_group.command(name="clear")
     async def shop_clear(self, ctx, npc_name: str):
         guild_id = ctx.guild.id
-        shop_service.clear_shop(guild_id, npc_name)  # ✅ fix: pakai clear_shop
+        await run(guild_id, shop_service.clear_shop, guild_id, npc_name)  # ✅ fix: pakai clear_shop
         await ctx.send(f"🗑️ Semua dagangan {npc_name} dihapus.")
 
     # ==== Beli item ====
     @shop_group.command(name="buy")
     async def shop_buy(self, ctx, npc_name: str, char_name: str, item: str, qty: int = 1):
         guild_id = ctx.guild.id
-        npc = npc_service.get_npc(guild_id, npc_name)
+        npc = await run(guild_id, npc_service.get_npc, guild_id, npc_name)
         if not npc:
             return await ctx.send(f"❌ NPC {npc_name} tidak ditemukan.")
 
-        ok, msg = shop_service.buy_item(guild_id, npc_name, char_name, item, qty)
+        ok, msg = await run(guild_id, shop_service.buy_item, guild_id, npc_name, char_name, item, qty)
         await ctx.send(msg)
 
     # ==== Lock/unlock item (favor / quest req) ====
@@ -126,7 +127,7 @@ class Shop(commands.Cog):
             elif part.lower().startswith("quest="):
                 quest_req.append(part.split("=", 1)[1].strip())
 
-        shop_service.add_item(
+        await run(guild_id, shop_service.add_item,
             guild_id, npc_name, item,
             price=0, stock=0,
             favor_req=favor_req, quest_req=quest_req
@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
-from utils.db import execute
+from utils.db import aexecute, run
+from services import inventory_service
 
 class GMTools(commands.Cog):
     def __init__(self, bot):
@@ -11,7 +12,8 @@ class GMTools(commands.Cog):
     @commands.has_permissions(administrator=True)  # biar cuma admin/GM bisa pakai
     async def inv_wipe(self, ctx, char: str):
         guild_id = ctx.guild.id
-        execute(guild_id, "DELETE FROM inventory WHERE LOWER(owner)=LOWER(?)", (char,))
+        await aexecute(guild_id, "DELETE FROM inventory WHERE LOWER(owner)=LOWER(?)", (char,))
+        await run(guild_id, inventory_service.calc_carry, guild_id, char)
         await ctx.send(f"🧹 Semua inventory milik **{char}** sudah dihapus total (wipe).")
 
     # === Clear Equipment Karakter (kosongin semua slot) ===
@@ -22,11 +24,12 @@ class GMTools(commands.Cog):
         from services.equipment_service import SLOTS
         eq = {s: "" for s in SLOTS}
         guild_id = ctx.guild.id
-        execute(
+        await aexecute(
             guild_id,
             "UPDATE characters SET equipment=?, updated_at=CURRENT_TIMESTAMP WHERE LOWER(name)=LOWER(?)",
             (json.dumps(eq), char)
         )
+        await run(guild_id, inventory_service.calc_carry, guild_id, char)
         await ctx.send(f"🛑 Semua slot equipment **{char}** sudah dikosongkan.")
 
 async def setup(bot):
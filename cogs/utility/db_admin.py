@@ -1,13 +1,36 @@
 import os
+import asyncio
+import logging
 import pandas as pd
 import discord
 from discord.ext import commands
-from utils import db
+from utils import db, outbox
+from services import ask_service, item_service
+
+logger = logging.getLogger("db_admin")
 
 
 class DbAdmin(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._checkpoint_task = None
+
+    async def cog_load(self):
+        if db.DB_CHECKPOINT_INTERVAL > 0:
+            self._checkpoint_task = asyncio.create_task(self._checkpoint_loop())
+
+    async def cog_unload(self):
+        if self._checkpoint_task:
+            self._checkpoint_task.cancel()
+
+    async def _checkpoint_loop(self):
+        """Checkpoint WAL (PASSIVE) berkala untuk koneksi yang hangat, supaya file -wal tidak terus membesar."""
+        while True:
+            await asyncio.sleep(db.DB_CHECKPOINT_INTERVAL)
+            try:
+                await db.checkpoint_all("PASSIVE")
+            except Exception as e:
+                logger.warning(f"⚠️ Checkpoint WAL berkala gagal: {e}")
 
     # ========================
     # 🔹 Group Command
@@ -20,7 +43,13 @@ class DbAdmin(commands.Cog):
             "• `!db resettable <nama>` → hapus tabel tertentu\n"
             "• `!db exportitems <csv/xlsx/docx/json>` → ekspor item database\n"
             "• `!db export <nama_tabel> <csv/xlsx/docx/json>` → ekspor tabel tertentu\n"
-            "• `!db exportall <csv/xlsx>` → ekspor semua tabel utama"
+            "• `!db exportall <csv/xlsx>` → ekspor semua tabel utama\n"
+            "• `!db askcache [clear]` → statistik / kosongkan cache jawaban `!ask`\n"
+            "• `!db gptusage [hari]` → pemakaian token & latency GPT\n"
+            "• `!db itemcache` → statistik cache katalog item\n"
+            "• `!db pool` → koneksi DB yang sedang terbuka di pool\n"
+            "• `!db walinfo` → mode journal & ukuran file db/-wal/-shm\n"
+            "• `!db checkpoint [passive/full/restart/truncate]` → tulis isi WAL ke file DB"
         )
 
     # ========================
@@ -30,7 +59,7 @@ class DbAdmin(commands.Cog):
     async def checkschema(self, ctx):
         """Cek semua tabel & kolom lalu kirim hasilnya sebagai file .txt"""
         guild_id = ctx.guild.id
-        schema = db.check_schema(guild_id)
+        schema = await db.run(guild_id, db.check_schema, guild_id)
 
         if not schema:
             return await ctx.send("❌ Tidak ada tabel yang ditemukan di database ini.")
@@ -67,6 +96,7 @@ class DbAdmin(commands.Cog):
             return await ctx.send(f"❌ Tidak ditemukan file lama: {old_path}")
 
         os.makedirs("./data", exist_ok=True)
+        db.close_conn(guild_id)
         shutil.copy2(old_path, new_path)
         size = os.path.getsize(new_path) / 1024
         await ctx.send(f"✅ DB lama berhasil disalin ke lokasi aktif.\n📦 `{new_path}` ({size:.1f} KB)")
@@ -90,17 +120,21 @@ class DbAdmin(commands.Cog):
             except Exception:
                 return 0
 
-        data = {
-            "characters": count_rows("characters"),
-            "npcs": count_rows("npc"),
-            "items": count_rows("items"),
-            "quests": count_rows("quests"),
-            "factions": count_rows("factions"),
-            "favors": count_rows("favors"),
-            "hollow_nodes": count_rows("hollow_nodes"),
-            "hollow_events": count_rows("hollow_events"),
-            "hollow_visitors": count_rows("hollow_visitors"),
-        }
+        def collect():
+            return {
+                "characters": count_rows("characters"),
+                "npcs": count_rows("npc"),
+                "items": count_rows("items"),
+                "quests": count_rows("quests"),
+                "factions": count_rows("factions"),
+                "favors": count_rows("favors"),
+                "hollow_nodes": count_rows("hollow_nodes"),
+                "hollow_events": count_rows("hollow_events"),
+                "hollow_visitors": count_rows("hollow_visitors"),
+            }
+
+        data = await db.run(guild_id, collect)
+        version = await db.run(guild_id, db.schema_version, guild_id)
 
         embed = discord.Embed(
             title="🧩 Database Info",
@@ -108,13 +142,120 @@ class DbAdmin(commands.Cog):
             color=discord.Color.blurple()
         )
         embed.add_field(name="📁 DB Path", value=f"`{path}`", inline=False)
+        embed.add_field(name="🧬 Schema", value=f"v{version} / v{db.SCHEMA_VERSION}", inline=False)
         for k, v in data.items():
             embed.add_field(name=k.replace("_", " ").title(), value=str(v), inline=True)
         embed.set_footer(text="Technonesia System — Database Inspector")
 
         await ctx.send(embed=embed)
-    
-        # ========================
+
+    # ========================
+    # 🔌 Connection pool
+    # ========================
+    @db_group.command(name="pool")
+    @commands.has_permissions(administrator=True)
+    async def pool(self, ctx):
+        """🔌 Koneksi SQLite yang sedang hangat di pool (semua guild) + lama idle-nya."""
+        st = db.pool_stats()
+        lines = [f"🔌 **Pool DB** — {st['open']} / {st['max']} koneksi terbuka • tutup setelah idle {st['idle_timeout']:.0f} s"]
+        for gid, idle in sorted(st["guilds"].items(), key=lambda kv: kv[1]):
+            mark = " ← server ini" if gid == ctx.guild.id else ""
+            lines.append(f"• `{gid}` — idle {idle:.0f} s{mark}")
+        await ctx.send("\n".join(lines)[:2000])
+
+    # ========================
+    # 🪵 WAL / Journal
+    # ========================
+    @db_group.command(name="walinfo")
+    @commands.has_permissions(administrator=True)
+    async def walinfo(self, ctx):
+        """🪵 Mode journal + ukuran file db/-wal/-shm/-journal guild ini."""
+        guild_id = ctx.guild.id
+        row = await db.afetchone(guild_id, "PRAGMA journal_mode")
+        mode = next(iter(row.values())) if row else "?"
+        sizes = db.journal_info(db.get_db_path(guild_id))
+        lines = [f"🪵 **Journal mode:** `{mode}`"]
+        lines += [f"• `{name}` — {size / 1024:.1f} KB" for name, size in sizes.items()]
+        await ctx.send("\n".join(lines))
+
+    @db_group.command(name="checkpoint")
+    @commands.has_permissions(administrator=True)
+    async def checkpoint_cmd(self, ctx, mode: str = "PASSIVE"):
+        """💾 Jalankan wal_checkpoint sekarang (PASSIVE | FULL | RESTART | TRUNCATE)."""
+        guild_id = ctx.guild.id
+        res = await db.run(guild_id, db.checkpoint, guild_id, mode)
+        await ctx.send(
+            f"💾 Checkpoint `{mode.upper()}` selesai — {res['checkpointed']}/{res['log']} frame ditulis"
+            + (" (⚠️ sebagian tertahan pembaca aktif)" if res["busy"] else "")
+        )
+
+    # ========================
+    # 🤖 Cache jawaban !ask
+    # ========================
+    @db_group.command(name="askcache")
+    @commands.has_permissions(administrator=True)
+    async def askcache(self, ctx, action: str = None):
+        """🤖 Statistik cache !ask (hit rate sejak bot start), `clear` untuk mengosongkan."""
+        guild_id = ctx.guild.id
+        if action == "clear":
+            n = await ask_service.clear_cache(guild_id)
+            return await ctx.send(f"🧹 Cache `!ask` dikosongkan ({n} entry).")
+
+        st = await ask_service.cache_stats(guild_id)
+        total = st["hit"] + st["shared"] + st["miss"]
+        rate = (st["hit"] + st["shared"]) / total * 100 if total else 0.0
+        embed = discord.Embed(title="🤖 Cache !ask", color=discord.Color.blurple())
+        embed.add_field(name="🎯 Hit rate", value=f"{rate:.1f}% dari {total} pertanyaan", inline=False)
+        embed.add_field(name="📦 Cache", value=str(st["hit"]), inline=True)
+        embed.add_field(name="🤝 Digabung", value=str(st["shared"]), inline=True)
+        embed.add_field(name="🌐 GPT", value=str(st["miss"]), inline=True)
+        embed.add_field(name="🗂️ Entry", value=f"{st['entries']} / {ask_service.ASK_CACHE_MAX}", inline=True)
+        embed.add_field(name="🔁 Total hit tersimpan", value=str(st["hits"]), inline=True)
+        embed.add_field(name="⏳ TTL", value=f"{ask_service.ASK_CACHE_TTL / 3600:.0f} jam", inline=True)
+        await ctx.send(embed=embed)
+
+    # ========================
+    # 📦 Cache katalog item
+    # ========================
+    @db_group.command(name="itemcache")
+    @commands.has_permissions(administrator=True)
+    async def itemcache(self, ctx):
+        """📦 Hit rate cache katalog item sejak bot start."""
+        st = item_service.catalog_stats(ctx.guild.id)
+        total = st["hit"] + st["miss"]
+        rate = st["hit"] / total * 100 if total else 0.0
+        await ctx.send(
+            f"📦 **Cache katalog item** — hit rate {rate:.1f}% ({st['hit']} hit / {st['miss']} load)\n"
+            f"🗂️ {st['items']} item di memori • versi katalog {st['version']}"
+        )
+
+    # ========================
+    # 📊 Pemakaian GPT
+    # ========================
+    @db_group.command(name="gptusage")
+    @commands.has_permissions(administrator=True)
+    async def gptusage(self, ctx, days: float = 1):
+        """📊 Token, latency & user teratas untuk panggilan GPT N hari terakhir."""
+        guild_id = ctx.guild.id
+        rep = await ask_service.usage_report(guild_id, days)
+        tokens = rep["prompt_tokens"] + rep["completion_tokens"]
+        embed = discord.Embed(title=f"📊 Pemakaian GPT — {days:g} hari terakhir", color=discord.Color.blurple())
+        embed.add_field(name="📨 Panggilan", value=str(rep["calls"]), inline=True)
+        embed.add_field(name="🔢 Token", value=f"{tokens} ({rep['prompt_tokens']} in / {rep['completion_tokens']} out)", inline=True)
+        p95 = f"{rep['p95_latency']} ms" if rep["p95_latency"] is not None else "-"
+        embed.add_field(name="⏱️ Latency", value=f"rata-rata {rep['avg_latency']:.0f} ms • p95 {p95}", inline=False)
+        if rep["models"]:
+            embed.add_field(name="🧠 Model", value="\n".join(
+                f"`{m['model']}` — {m['calls']}x, {m['tokens']} token" for m in rep["models"]), inline=False)
+        if rep["users"]:
+            embed.add_field(name="👤 User teratas", value="\n".join(
+                f"<@{u['user_id']}> — {u['calls']}x, {u['tokens']} token" for u in rep["users"]), inline=False)
+        budget_guild = ask_service.ASK_GUILD_DAILY_TOKENS or "∞"
+        budget_user = ask_service.ASK_USER_DAILY_TOKENS or "∞"
+        embed.set_footer(text=f"Budget 24 jam: guild {budget_guild} • per user {budget_user} token")
+        await ctx.send(embed=embed)
+
+    # ========================
     # 📂 List Semua File Database (baru)
     # ========================
     @db_group.command(name="listfiles")
@@ -159,7 +300,7 @@ class DbAdmin(commands.Cog):
         """Inisialisasi struktur database guild (buat tabel Hollow, dsb)."""
         guild_id = ctx.guild.id
         try:
-            db.init_db(guild_id)
+            await db.run(guild_id, db.init_db, guild_id)
             await ctx.send(f"✅ Database untuk guild **{ctx.guild.name}** sudah diinisialisasi / disinkronkan.")
         except Exception as e:
             await ctx.send(f"❌ Gagal inisialisasi database: {e}")
@@ -183,15 +324,26 @@ class DbAdmin(commands.Cog):
         if not os.path.exists(new_path):
             return await ctx.send(f"❌ File `{new_path}` tidak ditemukan!")
 
-        # Backup dulu yang aktif sekarang
-        backup_path = f"{current_path}.bak"
-        if os.path.exists(current_path):
-            shutil.copy2(current_path, backup_path)
+        def _swap():
+            # Semua di satu run() → pekerjaan guild yang antre tidak bisa membuka file lama di tengah jalan.
+            # Isi WAL ditulis ke file DB & koneksi pool ditutup dulu, supaya backup lengkap.
+            if os.path.exists(current_path):
+                db.checkpoint(guild_id, "TRUNCATE")
+            db.close_conn(guild_id)
+
+            # Backup dulu yang aktif sekarang
+            if os.path.exists(current_path):
+                shutil.copy2(current_path, f"{current_path}.bak")
 
-        # Ganti database aktif
-        os.makedirs(os.path.dirname(current_path), exist_ok=True)
-        shutil.copy2(new_path, current_path)
-        size = os.path.getsize(current_path) / 1024
+            # Ganti database aktif (-wal/-shm lama tidak boleh ikut diterapkan ke file baru)
+            os.makedirs(os.path.dirname(current_path), exist_ok=True)
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists(current_path + suffix):
+                    os.remove(current_path + suffix)
+            shutil.copy2(new_path, current_path)
+            return os.path.getsize(current_path) / 1024
+
+        size = await db.run(guild_id, _swap)
 
         await ctx.send(
             f"✅ Database aktif telah diganti dari:\n"
@@ -214,6 +366,11 @@ class DbAdmin(commands.Cog):
         if not os.path.exists(old_path):
             return await ctx.send(f"❌ File `{old_name}` tidak ditemukan di /data")
 
+        for name in (old_name, new_name):
+            stem = name[:-3] if name.endswith(".db") else name
+            gid = stem.replace("narator_", "")
+            if gid.isdigit():
+                db.close_conn(int(gid))
         os.rename(old_path, new_path)
         await ctx.send(f"✅ File database diubah namanya:\n`{old_name}` → `{new_name}`")
 
@@ -226,8 +383,11 @@ class DbAdmin(commands.Cog):
         """Hapus satu tabel lalu kosongkan"""
         guild_id = ctx.guild.id
         try:
-            db.execute(guild_id, f"DROP TABLE IF EXISTS {table}")
-            await ctx.send(f"✅ Tabel `{table}` sudah dihapus.")
+            await db.aexecute(guild_id, f"DROP TABLE IF EXISTS {table}")
+            # Versi skema di-reset supaya tabel dibuat ulang (kosong) oleh migrasi
+            await db.run(guild_id, db.reset_schema, guild_id)
+            await db.run(guild_id, db.init_db, guild_id)
+            await ctx.send(f"✅ Tabel `{table}` sudah dihapus & dibuat ulang kosong.")
         except Exception as e:
             await ctx.send(f"❌ Gagal drop tabel `{table}`: {e}")
 
@@ -239,7 +399,7 @@ class DbAdmin(commands.Cog):
     async def exportitems(self, ctx, fmt: str = "csv"):
         """📦 Export semua item ke file (csv/xlsx/docx/json)."""
         guild_id = ctx.guild.id
-        rows = db.fetchall(guild_id, "SELECT * FROM items")
+        rows = await db.afetchall(guild_id, "SELECT * FROM items")
 
         if not rows:
             return await ctx.send("❌ Tidak ada data item di database!")
@@ -312,7 +472,7 @@ class DbAdmin(commands.Cog):
         table = aliases.get(table.lower(), table.lower())
 
         try:
-            rows = db.fetchall(guild_id, f"SELECT * FROM {table}")
+            rows = await db.afetchall(guild_id, f"SELECT * FROM {table}")
         except Exception as e:
             return await ctx.send(f"❌ Gagal membaca tabel `{table}`: {e}")
 
@@ -398,9 +558,10 @@ class DbAdmin(commands.Cog):
         ]
         os.makedirs("/tmp", exist_ok=True)
 
+        done, failed = [], []
         for t in tables:
             try:
-                rows = db.fetchall(guild_id, f"SELECT * FROM {t}")
+                rows = await db.afetchall(guild_id, f"SELECT * FROM {t}")
                 if not rows:
                     continue
                 df = pd.DataFrame(rows)
@@ -409,9 +570,16 @@ class DbAdmin(commands.Cog):
                     df.to_excel(filename, index=False)
                 else:
                     df.to_csv(filename, index=False)
-                await ctx.send(f"✅ Export `{t}` selesai.", file=discord.File(filename))
+                # 📎 File dikumpulkan outbox → maks 10 lampiran per pesan
+                outbox.send_nowait(ctx, file=discord.File(filename))
+                done.append(t)
             except Exception as e:
-                await ctx.send(f"⚠️ Gagal export `{t}`: {e}")
+                failed.append(f"`{t}` ({e})")
+
+        summary = f"✅ Export selesai: {', '.join(f'`{t}`' for t in done) or '-'}"
+        if failed:
+            summary += f"\n⚠️ Gagal: {', '.join(failed)}"
+        await outbox.send(ctx, summary)
 
 
 async def setup(bot):
@@ -308,6 +308,15 @@ def embed_enemy() -> discord.Embed:
         ),
         inline=False
     )
+    e.add_field(
+        name="AoE (banyak target)",
+        value=(
+            "`!aoe dmg|heal|stm-|stm+|ene-|ene+ <selector> <N>`\n"
+            "• selector: `enemies:*`, `enemies:gob*`, `party`, `all`, `tag:undead`, `A,B,C`\n"
+            "• `!aoe dmg enemies:* 8` • `!tag add Skeleton undead`"
+        ),
+        inline=False
+    )
     return e
 
 def embed_companion() -> discord.Embed:
@@ -625,8 +634,9 @@ def embed_inventory() -> discord.Embed:
             "`!inv drop <Char> <Item> [Qty]` • `!inv clear <Char>`\n"
             "`!inv show <Char>`\n"
             "`!inv transfer <Char1> <Char2> <Item> [Qty]`\n"
+            "`!inv loot <Char1,Char2> <Item> [Qty] ...` → bagi loot sekaligus\n"
             "`!inv meta <Char> <Item> key=value`\n"
-            "`!inv use <Char> <Item>` • `!inv recalc_all`\n\n"
+            "`!inv use <Char> <Item>` • `!inv recalc [Char]`\n\n"
             "• `!inv add Udab Rust Shiv 1`\n"
             "• `!inv transfer Udab Nyx Rust Shiv 1`\n"
             "• `!inv meta Udab Rust Shiv weight=1.0 rarity=Common`"
@@ -846,7 +856,14 @@ def embed_utility() -> discord.Embed:
     e = _embed_base(_title("utility", "Utility"), color=discord.Color.from_rgb(100, 100, 100))
     e.add_field(name="🎲 Roll", value="`!roll 1d20+3` • `!roll 2d6+4`", inline=False)
     e.add_field(name="📊 Poll", value="`!poll \"Judul\" opsi1 opsi2` • `!poll \"Pilih jalan\" kiri kanan`", inline=False)
-    e.add_field(name="🗂️ Multi-Command", value="`!multi !dmg Goblin 3 x3`", inline=False)
+    e.add_field(name="🗂️ Multi-Command", value=(
+        "`!multi` + satu command per baris (target beda jalan paralel, hasil jadi satu ringkasan)\n"
+        "`!multi --dry-run ...` → cek & lihat urutan tanpa menjalankan"
+    ), inline=False)
+    e.add_field(name="🔎 Search", value=(
+        "`!search pedang api` → cari di item/NPC/wiki/quest/skill\n"
+        "`!search npc penjaga` → satu domain saja"
+    ), inline=False)
     e.add_field(name="🤖 Ask (GPT)", value="`!ask Ceritakan tentang Technonesia`", inline=False)
     return e
 
@@ -1,11 +1,195 @@
 import discord
 from discord.ext import commands
 import asyncio
+import copy
+import shlex
+import time
+
+from services.status_service import is_selector
+from utils import outbox
+
+_CONVERTERS = {int: int, float: float}
+_MAX_EMBEDS = 10  # batas Discord per pesan
+_MAX_FILES = 10
+
+
+class _Line:
+    """Satu baris script !multi yang sudah di-parse."""
+    def __init__(self, no: int, text: str):
+        self.no = no
+        self.text = text
+        self.cmd = None
+        self.args, self.kwargs = [], {}
+        self.tokens = None          # entity yang disentuh; None = barrier (urut dengan semua baris)
+        self.deps = set()           # index baris yang harus selesai dulu
+        self.wave = 1
+        self.error = None
+        self.outputs, self.embeds, self.files = [], [], []
+        self.ok = False
+
+
+class _SentMessage:
+    """Pengganti Message untuk output yang ditangkap (delete/edit jadi no-op)."""
+    async def delete(self, *args, **kwargs):
+        pass
+
+    async def edit(self, *args, **kwargs):
+        return self
+
 
 class MultiCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    # ===============================
+    # Parse & validasi
+    # ===============================
+    def _resolve(self, parts):
+        # coba cek 2 kata (subcommand, misal: "status set", "enemy dmg")
+        if len(parts) > 1:
+            cmd = self.bot.get_command(f"{parts[0]} {parts[1]}")
+            if cmd:
+                return cmd, parts[2:]
+        # fallback ke single command (termasuk alias: dmg, heal, ene-, ene+ dll)
+        return self.bot.get_command(parts[0]), parts[1:]
+
+    @staticmethod
+    def _bind(cmd, raw):
+        """Cocokkan argumen mentah ke parameter command (+ konversi int/float)."""
+        args, kwargs, rest = [], {}, list(raw)
+        for p in cmd.clean_params.values():
+            conv = _CONVERTERS.get(p.annotation)
+            if p.kind == p.KEYWORD_ONLY:
+                if rest:
+                    kwargs[p.name] = " ".join(rest)
+                    rest = []
+                elif p.default is p.empty:
+                    raise ValueError(f"argumen `{p.name}` kosong")
+                continue
+            if p.kind == p.VAR_POSITIONAL:
+                args.extend(conv(x) if conv else x for x in rest)
+                rest = []
+                continue
+            if not rest:
+                if p.default is p.empty:
+                    raise ValueError(f"argumen `{p.name}` kurang")
+                break
+            value = rest.pop(0)
+            try:
+                args.append(conv(value) if conv else value)
+            except ValueError:
+                raise ValueError(f"`{p.name}` harus {p.annotation.__name__}, dapat `{value}`")
+        if rest:
+            raise ValueError(f"argumen berlebih: `{' '.join(rest)}`")
+        return args, kwargs
+
+    @staticmethod
+    def _tokens(line: _Line):
+        """Nama/target yang disentuh baris ini. Selector AoE / tanpa target → barrier."""
+        words = [a for a in list(line.args) + list(line.kwargs.values()) if isinstance(a, str)]
+        if not words or any(is_selector(w) for w in words):
+            return None
+        return {w.lower() for w in words}
+
+    async def _parse(self, ctx, block: str):
+        lines = []
+        for no, text in enumerate((l.strip() for l in block.splitlines() if l.strip()), start=1):
+            line = _Line(no, text)
+            lines.append(line)
+            try:
+                parts = shlex.split(text)
+            except ValueError:
+                parts = text.split()
+            line.cmd, raw = self._resolve(parts)
+            if not line.cmd:
+                line.error = f"command `{parts[0]}` tidak ditemukan"
+                continue
+            try:
+                await line.cmd.can_run(ctx)
+                line.args, line.kwargs = self._bind(line.cmd, raw)
+            except commands.CommandError as e:
+                line.error = str(e) or "tidak punya izin"
+            except ValueError as e:
+                line.error = str(e)
+            line.tokens = self._tokens(line)
+        return lines
+
+    @staticmethod
+    def _plan(lines):
+        """Dependensi: baris dengan target sama tetap berurutan; barrier menunggu semua sebelumnya."""
+        last_by_token, since_barrier, barrier = {}, [], None
+        for i, line in enumerate(lines):
+            if line.tokens is None:
+                line.deps = set(since_barrier) | ({barrier} if barrier is not None else set())
+                barrier, since_barrier, last_by_token = i, [], {}
+            else:
+                line.deps = {last_by_token[t] for t in line.tokens if t in last_by_token}
+                if barrier is not None:
+                    line.deps.add(barrier)
+                for t in line.tokens:
+                    last_by_token[t] = i
+                since_barrier.append(i)
+            line.wave = 1 + max((lines[d].wave for d in line.deps), default=0)
+
+    # ===============================
+    # Eksekusi
+    # ===============================
+    async def _run_line(self, ctx, line: _Line):
+        sub = copy.copy(ctx)
+
+        async def _capture(content=None, *, embed=None, embeds=None, file=None, files=None, **kwargs):
+            if content:
+                line.outputs.append(str(content))
+            if embed:
+                line.embeds.append(embed)
+            line.embeds.extend(embeds or [])
+            if file:
+                line.files.append(file)
+            line.files.extend(files or [])
+            return _SentMessage()
+
+        sub.send = _capture
+        sub.reply = _capture
+        try:
+            await sub.invoke(line.cmd, *line.args, **line.kwargs)
+            line.ok = True
+        except Exception as e:
+            line.error = str(e) or type(e).__name__
+
+    async def _execute(self, ctx, lines):
+        done = [asyncio.Event() for _ in lines]
+
+        async def _task(i, line):
+            for d in line.deps:
+                await done[d].wait()
+            try:
+                await self._run_line(ctx, line)
+            finally:
+                done[i].set()
+
+        await asyncio.gather(*(_task(i, l) for i, l in enumerate(lines)))
+
+    # ===============================
+    # Output
+    # ===============================
+    @staticmethod
+    def _summary(lines, title, color):
+        rows = []
+        for l in lines:
+            if l.error:
+                rows.append(f"❌ `{l.text}` — {l.error}")
+            else:
+                out = " | ".join(o.replace("\n", " ") for o in l.outputs)
+                if l.embeds:
+                    out = (out + " | " if out else "") + " · ".join(e.title or "embed" for e in l.embeds)
+                if l.files:
+                    out = (out + " | " if out else "") + " · ".join(f"📎 {f.filename}" for f in l.files)
+                rows.append(f"✅ `{l.text}`" + (f" — {out[:150]}" if out else ""))
+        desc = "\n".join(rows)
+        if len(desc) > 4000:
+            desc = desc[:3990] + "\n…"
+        return discord.Embed(title=title, description=desc, color=color)
+
     @commands.command(name="multi")
     async def multi(self, ctx, *, block: str):
         """
@@ -14,43 +198,56 @@ class MultiCommand(commands.Cog):
         !multi
         status set Alice 20 5 3
         status setcore Alice 10 12 14 8 13 9
-        enemy set Goblin 15 2 4
-        enemy setcore Goblin 8 14 12 6 10 7
+        enemy add Goblin 15 2 4
         dmg Goblin 5
         heal Alice 3
-        """
-        lines = [l.strip() for l in block.splitlines() if l.strip()]
-        for line in lines:
-            parts = line.split()
-            if not parts:
-                continue
 
-            cmd = None
-            args = []
-
-            # coba cek 2 kata (subcommand, misal: "status set", "enemy dmg")
-            if len(parts) > 1:
-                maybe = f"{parts[0]} {parts[1]}"
-                cmd = self.bot.get_command(maybe)
-                if cmd:
-                    args = parts[2:]
+        Baris dengan target berbeda jalan paralel, target sama tetap berurutan.
+        Tambah `--dry-run` untuk cek & lihat urutan tanpa menjalankan apa pun.
+        """
+        dry_run = "--dry-run" in block
+        block = block.replace("--dry-run", "")
+        lines = await self._parse(ctx, block)
+        if not lines:
+            return await ctx.send("⚠️ Tidak ada baris untuk dijalankan.")
 
-            # fallback ke single command (termasuk alias: dmg, heal, ene-, ene+ dll)
-            if not cmd:
-                cmd = self.bot.get_command(parts[0])
-                args = parts[1:]
+        invalid = [l for l in lines if l.error]
+        if invalid:
+            embed = self._summary(invalid, f"⚠️ {len(invalid)} baris tidak valid — tidak ada yang dijalankan",
+                                  discord.Color.red())
+            return await ctx.send(embed=embed)
 
-            if not cmd:
-                await ctx.send(f"⚠️ Command `{parts[0]}` tidak ditemukan.")
-                continue
+        self._plan(lines)
+        if dry_run:
+            waves = {}
+            for l in lines:
+                waves.setdefault(l.wave, []).append(l)
+            embed = discord.Embed(title=f"🧪 Dry run — {len(lines)} baris valid", color=discord.Color.blurple())
+            for wave, items in sorted(waves.items()):
+                value = "\n".join(
+                    f"#{l.no} `{l.text}`" + (f" ⏳ setelah #{', #'.join(str(lines[d].no) for d in sorted(l.deps))}" if l.deps else "")
+                    for l in items
+                )
+                embed.add_field(name=f"Gelombang {wave}" + (" (paralel)" if len(items) > 1 else ""),
+                                value=value[:1024], inline=False)
+                if len(embed.fields) >= 25:
+                    break
+            return await ctx.send(embed=embed)
 
-            try:
-                await ctx.invoke(cmd, *args)
-            except Exception as e:
-                await ctx.send(f"❌ Error di `{line}`: {e}")
+        t0 = time.perf_counter()
+        await self._execute(ctx, lines)
+        failed = sum(1 for l in lines if l.error)
+        title = f"📜 Multi: {len(lines)} baris • {len(lines) - failed} ok • {failed} gagal • {time.perf_counter() - t0:.1f}s"
+        summary = self._summary(lines, title, discord.Color.green() if not failed else discord.Color.orange())
 
-            # jeda supaya output rapi
-            await asyncio.sleep(1)
+        # Ringkasan + embed & file hasil command digabung outbox (10 per pesan, ikut rate limit channel)
+        embeds = [summary] + [e for l in lines for e in l.embeds]
+        for i in range(0, len(embeds), _MAX_EMBEDS):
+            last = outbox.send_nowait(ctx, embeds=embeds[i:i + _MAX_EMBEDS])
+        files = [f for l in lines for f in l.files]
+        for i in range(0, len(files), _MAX_FILES):
+            last = outbox.send_nowait(ctx, files=files[i:i + _MAX_FILES])
+        await last
 
 async def setup(bot):
     await bot.add_cog(MultiCommand(bot))
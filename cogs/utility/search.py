@@ -0,0 +1,53 @@
+# cogs/utility/search.py
+import time
+import discord
+from discord.ext import commands
+from services import retrieval_service
+
+
+class SearchCog(commands.Cog):
+    """🔎 Cari item, NPC, wiki, quest & skill sekaligus (full-text)."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name="search")
+    async def search(self, ctx, *, query: str = None):
+        """
+        !search <kata kunci>              → cari di semua domain
+        !search <item|npc|wiki|quest|skill> <kata kunci> → satu domain saja
+        Kata boleh terpotong (prefix): `!search pedang api` cocok dengan "Pedang Apinya".
+        """
+        if not query:
+            return await ctx.send("⚠️ Gunakan: `!search [item|npc|wiki|quest|skill] <kata kunci>`")
+
+        sources = None
+        first, _, rest = query.partition(" ")
+        if first.lower() in retrieval_service.SEARCH_SOURCES and rest.strip():
+            sources, query = (first.lower(),), rest.strip()
+
+        t0 = time.perf_counter()
+        hits = await retrieval_service.search(ctx.guild.id, query, sources=sources)
+        elapsed = (time.perf_counter() - t0) * 1000
+        if hits is None:
+            return await ctx.send("❌ Index pencarian belum tersedia di server ini (SQLite tanpa FTS5).")
+        if not hits:
+            return await ctx.send(f"🔎 Tidak ada hasil untuk `{query}`.")
+
+        lines = []
+        for h in hits:
+            icon = retrieval_service.SEARCH_ICONS.get(h["src"], "•")
+            label = retrieval_service.SOURCE_LABELS.get(h["src"], h["src"])
+            snippet = " ".join(h["snippet"].split())
+            lines.append(f"{icon} **[{label}]** {h['title']}\n└ {snippet[:180]}")
+        embed = discord.Embed(
+            title=f"🔎 Hasil: {query}",
+            description="\n".join(lines)[:4000],
+            color=discord.Color.teal()
+        )
+        embed.set_footer(text=f"{len(hits)} hasil • {elapsed:.0f} ms")
+        await ctx.send(embed=embed)
+
+
+async def setup(bot):
+    await bot.add_cog(SearchCog(bot))
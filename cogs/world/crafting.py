@@ -5,7 +5,7 @@ from discord.ext import commands
 from discord.ui import View, button
 from discord import ButtonStyle
 
-from utils.db import execute, fetchone, fetchall
+from utils.db import execute, run, afetchone, afetchall, aexecute, ensure_once
 from services import inventory_service  # dipakai untuk add_item hasil crafting
 
 # ===========================
@@ -31,6 +31,10 @@ def safe_field_value(text: str, limit: int = 1024) -> str:
 
 
 def ensure_tables(guild_id: int):
+    ensure_once(guild_id, "crafting", _create_tables)
+
+
+def _create_tables(guild_id: int):
     # Tabel blueprint global
     execute(
         guild_id,
@@ -134,7 +138,7 @@ class Crafting(commands.Cog):
     # ---------------------------
     @commands.group(name="crafting", invoke_without_command=True)
     async def crafting_root(self, ctx: commands.Context):
-        ensure_tables(ctx.guild.id)
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
         embed = discord.Embed(
             title=f"{ICONS['start']} Crafting System – Technonesia",
             description=(
@@ -162,7 +166,7 @@ class Crafting(commands.Cog):
     # ---------------------------
     @crafting_root.group(name="blueprint")
     async def crafting_bp(self, ctx: commands.Context):
-        ensure_tables(ctx.guild.id)
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
 
     @crafting_bp.command(name="add")
     async def bp_add(self, ctx: commands.Context, *, data: str):
@@ -170,7 +174,7 @@ class Crafting(commands.Cog):
         Format:
         !crafting blueprint add <Nama> | <Deskripsi> | <Bahan:qty, Bahan:qty> | <Hasil> | <TargetProgress>
         """
-        ensure_tables(ctx.guild.id)
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
         parts = [p.strip() for p in data.split("|")]
         if len(parts) < 5:
             return await ctx.send(
@@ -185,7 +189,7 @@ class Crafting(commands.Cog):
         except Exception:
             return await ctx.send("❌ TargetProgress harus angka > 0.")
 
-        execute(
+        await aexecute(
             ctx.guild.id,
             """
             INSERT INTO blueprints (name, desc, req, result, target_progress)
@@ -213,8 +217,8 @@ class Crafting(commands.Cog):
     @crafting_bp.command(name="list")
     async def bp_list(self, ctx: commands.Context):
         """List semua blueprint (paged)."""
-        ensure_tables(ctx.guild.id)
-        rows = fetchall(ctx.guild.id, "SELECT * FROM blueprints ORDER BY name ASC", ())
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
+        rows = await afetchall(ctx.guild.id, "SELECT * FROM blueprints ORDER BY name ASC", ())
         if not rows:
             return await ctx.send("📭 Belum ada blueprint.")
 
@@ -243,8 +247,8 @@ class Crafting(commands.Cog):
     @crafting_bp.command(name="detail")
     async def bp_detail(self, ctx: commands.Context, *, name: str):
         """Detail 1 blueprint (desc, bahan, hasil, target)."""
-        ensure_tables(ctx.guild.id)
-        bp = fetchone(ctx.guild.id, "SELECT * FROM blueprints WHERE name=?", (name,))
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
+        bp = await afetchone(ctx.guild.id, "SELECT * FROM blueprints WHERE name=?", (name,))
         if not bp:
             return await ctx.send("❌ Blueprint tidak ditemukan.")
 
@@ -265,12 +269,12 @@ class Crafting(commands.Cog):
     @crafting_root.command(name="learn")
     async def bp_learn(self, ctx: commands.Context, player: str, *, blueprint: str):
         """GM menandai player telah mempelajari blueprint tertentu."""
-        ensure_tables(ctx.guild.id)
-        bp = fetchone(ctx.guild.id, "SELECT name FROM blueprints WHERE name=?", (blueprint,))
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
+        bp = await afetchone(ctx.guild.id, "SELECT name FROM blueprints WHERE name=?", (blueprint,))
         if not bp:
             return await ctx.send("❌ Blueprint tidak ditemukan di database.")
 
-        execute(
+        await aexecute(
             ctx.guild.id,
             "INSERT OR IGNORE INTO known_blueprints (player, blueprint) VALUES (?,?)",
             (player, bp["name"]),
@@ -286,8 +290,8 @@ class Crafting(commands.Cog):
     @crafting_root.command(name="known")
     async def bp_known(self, ctx: commands.Context, player: str):
         """List blueprint yang diketahui player (paged)."""
-        ensure_tables(ctx.guild.id)
-        rows = fetchall(
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
+        rows = await afetchall(
             ctx.guild.id,
             "SELECT b.name, b.result, b.target_progress, b.desc FROM known_blueprints k "
             "JOIN blueprints b ON b.name = k.blueprint WHERE k.player=? ORDER BY b.name ASC",
@@ -329,11 +333,11 @@ class Crafting(commands.Cog):
         - Cek 'stat crafting' (jika tidak ada -> gagal)
         - Cek & kurangi bahan dari inventory
         """
-        ensure_tables(ctx.guild.id)
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
         guild_id = ctx.guild.id
 
         # Locked mode: harus sudah learn
-        known = fetchone(
+        known = await afetchone(
             guild_id,
             "SELECT 1 FROM known_blueprints WHERE player=? AND blueprint=?",
             (player, blueprint),
@@ -348,7 +352,7 @@ class Crafting(commands.Cog):
             return await ctx.send(embed=embed)
 
         # Ambil blueprint
-        bp = fetchone(guild_id, "SELECT * FROM blueprints WHERE name=?", (blueprint,))
+        bp = await afetchone(guild_id, "SELECT * FROM blueprints WHERE name=?", (blueprint,))
         if not bp:
             return await ctx.send("❌ Blueprint tidak ditemukan.")
 
@@ -356,7 +360,7 @@ class Crafting(commands.Cog):
         # Kita coba baca dari table characters.crafting_lvl; jika tidak ada table/kolom → dianggap gagal.
         has_craft_stat = False
         try:
-            row_stat = fetchone(
+            row_stat = await afetchone(
                 guild_id,
                 "SELECT crafting_lvl FROM characters WHERE name=?",
                 (player,),
@@ -391,7 +395,7 @@ class Crafting(commands.Cog):
             else:
                 item, need = p, 1
 
-            have = inventory_service.get_qty(guild_id, player, item)
+            have = await run(guild_id, inventory_service.get_qty, guild_id, player, item)
             if have < need:
                 missing.append(f"{item} ({have}/{need})")
 
@@ -411,10 +415,10 @@ class Crafting(commands.Cog):
                 need = int(qty) if qty.isdigit() else 1
             else:
                 item, need = p, 1
-            inventory_service.remove_item(guild_id, player, item, need)
+            await run(guild_id, inventory_service.remove_item, guild_id, player, item, need)
 
         # Set crafting aktif progress=0
-        execute(
+        await aexecute(
             guild_id,
             "INSERT OR REPLACE INTO crafting (player, blueprint, progress) VALUES (?,?,0)",
             (player, bp["name"]),
@@ -437,20 +441,20 @@ class Crafting(commands.Cog):
         Update progress manual (GM input dari hasil roll).
         Contoh: !crafting progress Rain +72
         """
-        ensure_tables(ctx.guild.id)
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
         guild_id = ctx.guild.id
 
-        row = fetchone(guild_id, "SELECT * FROM crafting WHERE player=?", (player,))
+        row = await afetchone(guild_id, "SELECT * FROM crafting WHERE player=?", (player,))
         if not row:
             return await ctx.send("❌ Tidak ada crafting aktif untuk player ini.")
 
-        bp = fetchone(guild_id, "SELECT * FROM blueprints WHERE name=?", (row["blueprint"],))
+        bp = await afetchone(guild_id, "SELECT * FROM blueprints WHERE name=?", (row["blueprint"],))
         if not bp:
             return await ctx.send("❌ Blueprint tidak ditemukan.")
 
         old = int(row["progress"])
         new = max(0, old + int(value))
-        execute(guild_id, "UPDATE crafting SET progress=? WHERE player=?", (new, player))
+        await aexecute(guild_id, "UPDATE crafting SET progress=? WHERE player=?", (new, player))
 
         bar, pct = build_bar(new, int(bp["target_progress"]))
         embed = discord.Embed(
@@ -470,14 +474,14 @@ class Crafting(commands.Cog):
     @crafting_root.command(name="show")
     async def craft_show(self, ctx: commands.Context, player: str):
         """Tampilkan bar: nama, target, progress (minimalis)."""
-        ensure_tables(ctx.guild.id)
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
         guild_id = ctx.guild.id
 
-        row = fetchone(guild_id, "SELECT * FROM crafting WHERE player=?", (player,))
+        row = await afetchone(guild_id, "SELECT * FROM crafting WHERE player=?", (player,))
         if not row:
             return await ctx.send("❌ Tidak ada crafting aktif.")
 
-        bp = fetchone(guild_id, "SELECT * FROM blueprints WHERE name=?", (row["blueprint"],))
+        bp = await afetchone(guild_id, "SELECT * FROM blueprints WHERE name=?", (row["blueprint"],))
         if not bp:
             return await ctx.send("❌ Blueprint tidak ditemukan.")
 
@@ -496,21 +500,21 @@ class Crafting(commands.Cog):
     @crafting_root.command(name="finish")
     async def craft_finish(self, ctx: commands.Context, player: str):
         """Selesaikan crafting bila progress sudah cukup (dipanggil otomatis)."""
-        ensure_tables(ctx.guild.id)
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
         guild_id = ctx.guild.id
 
-        row = fetchone(guild_id, "SELECT * FROM crafting WHERE player=?", (player,))
+        row = await afetchone(guild_id, "SELECT * FROM crafting WHERE player=?", (player,))
         if not row:
             return await ctx.send("❌ Tidak ada crafting aktif.")
-        bp = fetchone(guild_id, "SELECT result, target_progress FROM blueprints WHERE name=?", (row["blueprint"],))
+        bp = await afetchone(guild_id, "SELECT result, target_progress FROM blueprints WHERE name=?", (row["blueprint"],))
         if not bp:
             return await ctx.send("❌ Blueprint tidak ditemukan.")
         if int(row["progress"]) < int(bp["target_progress"]):
             return await ctx.send("⚠️ Belum selesai. Progress belum mencapai target.")
 
         # Tambahkan item ke inventory & hapus crafting
-        inventory_service.add_item(guild_id, player, bp["result"], 1)
-        execute(guild_id, "DELETE FROM crafting WHERE player=?", (player,))
+        await run(guild_id, inventory_service.add_item, guild_id, player, bp["result"], 1)
+        await aexecute(guild_id, "DELETE FROM crafting WHERE player=?", (player,))
 
         embed = discord.Embed(
             title=f"{ICONS['done']} Crafting Selesai!",
@@ -522,8 +526,8 @@ class Crafting(commands.Cog):
     @crafting_root.command(name="cancel")
     async def craft_cancel(self, ctx: commands.Context, player: str):
         """Batalkan crafting aktif (bahan tidak dikembalikan)."""
-        ensure_tables(ctx.guild.id)
-        execute(ctx.guild.id, "DELETE FROM crafting WHERE player=?", (player,))
+        await run(ctx.guild.id, ensure_tables, ctx.guild.id)
+        await aexecute(ctx.guild.id, "DELETE FROM crafting WHERE player=?", (player,))
         embed = discord.Embed(
             title=f"{ICONS['fail']} Crafting Dibatalkan",
             description=f"Proses crafting milik **{player}** dibatalkan.",
@@ -538,11 +542,11 @@ class Crafting(commands.Cog):
     async def _auto_finish(self, ctx: commands.Context, player: str, blueprint_name: str):
         """Dipanggil otomatis saat progress >= target."""
         guild_id = ctx.guild.id
-        bp = fetchone(guild_id, "SELECT result FROM blueprints WHERE name=?", (blueprint_name,))
+        bp = await afetchone(guild_id, "SELECT result FROM blueprints WHERE name=?", (blueprint_name,))
         if not bp:
             return await ctx.send("⚠️ Blueprint rusak atau tidak lengkap.")
-        inventory_service.add_item(guild_id, player, bp["result"], 1)
-        execute(guild_id, "DELETE FROM crafting WHERE player=?", (player,))
+        await run(guild_id, inventory_service.add_item, guild_id, player, bp["result"], 1)
+        await aexecute(guild_id, "DELETE FROM crafting WHERE player=?", (player,))
 
         embed = discord.Embed(
             title=f"{ICONS['done']} Crafting Selesai!",
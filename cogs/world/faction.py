@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 from discord.ui import View, button
 from services import faction_service
+from utils.db import run
 
 FACTION_ICONS = {
     "city": "🏙️",
@@ -70,7 +71,7 @@ class Faction(commands.Cog):
         name = parts[0]
         desc = parts[1] if len(parts) > 1 else ""
         ftype = parts[2].lower() if len(parts) > 2 else "general"
-        msg = faction_service.add_faction(guild_id, name, desc, ftype, hidden=0)
+        msg = await run(guild_id, faction_service.add_faction, guild_id, name, desc, ftype, hidden=0)
         await ctx.send(msg)
 
     @faction.command(name="list")
@@ -78,7 +79,7 @@ class Faction(commands.Cog):
         """List semua faction visible (bisa filter: corp/gang/city/etc).
         Kalau tanpa filter → group per kategori"""
         guild_id = ctx.guild.id
-        rows = faction_service.list_factions(guild_id, include_hidden=False)
+        rows = await run(guild_id, faction_service.list_factions, guild_id, include_hidden=False)
 
         if not rows:
             return await ctx.send("❌ Tidak ada faction ditemukan.")
@@ -143,7 +144,7 @@ class Faction(commands.Cog):
     async def faction_gmshow(self, ctx):
         """List semua faction termasuk hidden (dengan pagination)"""
         guild_id = ctx.guild.id
-        rows = faction_service.list_factions(guild_id, include_hidden=True)
+        rows = await run(guild_id, faction_service.list_factions, guild_id, include_hidden=True)
         if not rows:
             return await ctx.send("❌ Tidak ada faction.")
         
@@ -174,7 +175,7 @@ class Faction(commands.Cog):
     async def faction_detail(self, ctx, *, name: str):
         """Detail 1 faction"""
         guild_id = ctx.guild.id
-        f = faction_service.get_faction(guild_id, name)
+        f = await run(guild_id, faction_service.get_faction, guild_id, name)
         if not f:
             return await ctx.send("❌ Faction tidak ditemukan.")
         status = "🙈 Hidden" if f.get("hidden", 0) == 1 else "👁️ Visible"
@@ -192,21 +193,21 @@ class Faction(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def faction_remove(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        msg = faction_service.remove_faction(guild_id, name)
+        msg = await run(guild_id, faction_service.remove_faction, guild_id, name)
         await ctx.send(msg)
 
     @faction.command(name="hide")
     @commands.has_permissions(administrator=True)
     async def faction_hide(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        msg = faction_service.hide_faction(guild_id, name, hidden=1)
+        msg = await run(guild_id, faction_service.hide_faction, guild_id, name, hidden=1)
         await ctx.send(msg)
 
     @faction.command(name="show")
     @commands.has_permissions(administrator=True)
     async def faction_show(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        msg = faction_service.hide_faction(guild_id, name, hidden=0)
+        msg = await run(guild_id, faction_service.hide_faction, guild_id, name, hidden=0)
         await ctx.send(msg)
 
     @faction.command(name="type")
@@ -214,7 +215,7 @@ class Faction(commands.Cog):
     async def faction_type(self, ctx, name: str, ftype: str):
         """Ubah type faction (city/region/corp/gang/etc)"""
         guild_id = ctx.guild.id
-        msg = faction_service.set_faction_type(guild_id, name, ftype)
+        msg = await run(guild_id, faction_service.set_faction_type, guild_id, name, ftype)
         await ctx.send(msg)
 
     @faction.command(name="resetdb")
@@ -223,16 +224,15 @@ class Faction(commands.Cog):
         """Reset tabel factions & favors (hapus semua data)."""
         guild_id = ctx.guild.id
         try:
-            from utils.db import execute
-            from services import faction_service, favor_service
+            from utils.db import aexecute, reset_schema, init_db
 
             # Drop tabel lama
-            execute(guild_id, "DROP TABLE IF EXISTS factions")
-            execute(guild_id, "DROP TABLE IF EXISTS favors")
+            await aexecute(guild_id, "DROP TABLE IF EXISTS factions")
+            await aexecute(guild_id, "DROP TABLE IF EXISTS favors")
 
-            # Buat ulang
-            faction_service.ensure_table(guild_id)
-            favor_service.ensure_table(guild_id)
+            # Buat ulang (migrasi skema dijalankan ulang dari awal)
+            await run(guild_id, reset_schema, guild_id)
+            await run(guild_id, init_db, guild_id)
 
             await ctx.send("✅ Tabel `factions` & `favors` sudah direset. Semua data lama hilang.")
         except Exception as e:
@@ -7,7 +7,8 @@ from datetime import datetime
 import discord
 from discord.ext import commands
 
-from utils.db import execute, fetchone, fetchall
+from utils.db import execute, fetchone, fetchall, run, ensure_schema
+from utils import outbox
 
 # ======================================================
 # 📦 HELPERS (JSON, Warna, Ikon, Trait Effects)
@@ -48,81 +49,9 @@ RARITY_ICON = {
 # 🗄️ DB ENSURE (tabel & index Hollow saja)
 # ======================================================
 def _ensure_tables(guild_id: int):
-    # Nodes
-    execute(guild_id, """
-    CREATE TABLE IF NOT EXISTS hollow_nodes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE,
-        zone TEXT,
-        type TEXT,
-        traits TEXT DEFAULT '[]',
-        types TEXT DEFAULT '[]',
-        npcs TEXT DEFAULT '[]',
-        visitors TEXT DEFAULT '[]',
-        events TEXT DEFAULT '[]',
-        vendors_today TEXT DEFAULT '[]',
-        event_today TEXT DEFAULT '{}',
-        visitors_today TEXT DEFAULT '[]',
-        tags TEXT DEFAULT '[]',
-        cooldown_until TIMESTAMP DEFAULT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    """)
-
-    # Log
-    execute(guild_id, """
-    CREATE TABLE IF NOT EXISTS hollow_log (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        node TEXT,
-        vendors TEXT,
-        visitors TEXT,
-        event TEXT,
-        time TEXT DEFAULT 'day',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    """)
-
-    # Visitor Library
-    execute(guild_id, """
-    CREATE TABLE IF NOT EXISTS hollow_visitors (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE,
-        rarity TEXT DEFAULT 'common',
-        chance INTEGER DEFAULT 50,
-        desc TEXT DEFAULT '',
-        origin TEXT DEFAULT '',
-        hook TEXT DEFAULT ''
-    );
-    """)
-
-    # Event Library
-    execute(guild_id, """
-    CREATE TABLE IF NOT EXISTS hollow_events (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE,
-        rarity TEXT DEFAULT 'common',
-        chance INTEGER DEFAULT 10,
-        desc TEXT DEFAULT '',
-        effect TEXT DEFAULT '',
-        effect_formula TEXT DEFAULT ''
-    );
-    """)
-
-    # Indexes
-    execute(guild_id, "CREATE UNIQUE INDEX IF NOT EXISTS idx_hollow_nodes_name ON hollow_nodes(name);")
-    execute(guild_id, "CREATE INDEX IF NOT EXISTS idx_hollow_log_node ON hollow_log(node);")
-    execute(guild_id, "CREATE INDEX IF NOT EXISTS idx_hollow_log_time ON hollow_log(time);")
-    execute(guild_id, "CREATE UNIQUE INDEX IF NOT EXISTS idx_hollow_visitors_name ON hollow_visitors(name);")
-    execute(guild_id, "CREATE UNIQUE INDEX IF NOT EXISTS idx_hollow_events_name ON hollow_events(name);")
-
-def _migrate_hollow_visitors(guild_id: int):
-    cols = [c["name"] for c in fetchall(guild_id, "PRAGMA table_info(hollow_visitors)")]
-    if "origin" not in cols:
-        execute(guild_id, "ALTER TABLE hollow_visitors ADD COLUMN origin TEXT DEFAULT ''")
-    if "hook" not in cols:
-        execute(guild_id, "ALTER TABLE hollow_visitors ADD COLUMN hook TEXT DEFAULT ''")
-    print(f"[MIGRATE] ✅ hollow_visitors updated for guild {guild_id}")
+    # Tabel, kolom (tags, cooldown_until, origin, hook) & index Hollow
+    # sekarang bagian dari migrasi skema di utils.db
+    ensure_schema(guild_id)
 
 # ======================================================
 # 🔧 HOLLOW CORE (CRUD & Operasi)
@@ -561,14 +490,7 @@ class Hollow(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        # 🔧 Auto-ensure Hollow tables for every guild on load
-        for guild in bot.guilds:
-            try:
-                _ensure_tables(guild.id)
-                _migrate_hollow_visitors(guild.id)
-                print(f"[HOLLOW INIT] ✅ Tables ensured & migrated for guild {guild.id}")
-            except Exception as e:
-                print(f"[HOLLOW INIT] ⚠️ Failed ensure for {guild.id}: {e}")
+        # Tabel Hollow ikut migrasi skema guild (init di background / saat command pertama)
 
     # ---------------- Base Help ----------------
     @commands.group(name="hollow", invoke_without_command=True)
@@ -606,12 +528,12 @@ class Hollow(commands.Cog):
     @hollow.command(name="addnode")
     @commands.has_permissions(administrator=True)
     async def addnode(self, ctx, name: str, zone: str, node_type: str = "market"):
-        msg = _add_node(ctx.guild.id, name, zone, node_type)
+        msg = await run(ctx.guild.id, _add_node, ctx.guild.id, name, zone, node_type)
         await ctx.send(msg)
 
     @hollow.command(name="list")
     async def list_nodes(self, ctx):
-        rows = _list_nodes(ctx.guild.id)
+        rows = await run(ctx.guild.id, _list_nodes, ctx.guild.id)
         if not rows:
             return await ctx.send("📭 Belum ada node Hollow terdaftar.")
         embed = discord.Embed(title="📍 Hollow Network Map", color=discord.Color.blue())
@@ -630,7 +552,7 @@ class Hollow(commands.Cog):
 
     @hollow.command(name="info")
     async def node_info(self, ctx, node_name: str):
-        node = _get_node(ctx.guild.id, node_name)
+        node = await run(ctx.guild.id, _get_node, ctx.guild.id, node_name)
         if not node:
             return await ctx.send("❌ Node tidak ditemukan.")
         embed = _make_node_embed(node)
@@ -639,30 +561,30 @@ class Hollow(commands.Cog):
     @hollow.command(name="edit")
     @commands.has_permissions(administrator=True)
     async def edit_node(self, ctx, node_name: str, *, entry: str):
-        msg = _edit_node(ctx.guild.id, node_name, entry)
+        msg = await run(ctx.guild.id, _edit_node, ctx.guild.id, node_name, entry)
         await ctx.send(msg)
 
     @hollow.command(name="remove")
     @commands.has_permissions(administrator=True)
     async def remove_node(self, ctx, *, node_name: str):
-        msg = _remove_node(ctx.guild.id, node_name)
+        msg = await run(ctx.guild.id, _remove_node, ctx.guild.id, node_name)
         await ctx.send(msg)
 
     @hollow.command(name="clone")
     @commands.has_permissions(administrator=True)
     async def clone_node(self, ctx, source: str, target: str):
-        msg = _clone_node(ctx.guild.id, source, target)
+        msg = await run(ctx.guild.id, _clone_node, ctx.guild.id, source, target)
         await ctx.send(msg)
 
     @hollow.command(name="reset")
     @commands.has_permissions(administrator=True)
     async def reset_node(self, ctx, *, node_name: str):
-        msg = _reset_node(ctx.guild.id, node_name)
+        msg = await run(ctx.guild.id, _reset_node, ctx.guild.id, node_name)
         await ctx.send(msg)
 
     @hollow.command(name="log")
     async def show_log(self, ctx, node_name: str, n: int = 5):
-        logs = _get_logs(ctx.guild.id, node_name, n)
+        logs = await run(ctx.guild.id, _get_logs, ctx.guild.id, node_name, n)
         if not logs:
             return await ctx.send("📭 Belum ada histori untuk node itu.")
         embed = discord.Embed(title=f"🧾 Hollow Log — {node_name}", color=discord.Color.dark_teal())
@@ -682,25 +604,25 @@ class Hollow(commands.Cog):
     @hollow.command(name="roll")
     @commands.has_permissions(administrator=True)
     async def roll_node(self, ctx, node_name: str):
-        embed = _roll_daily(ctx.guild.id, node_name)
+        embed = await run(ctx.guild.id, _roll_daily, ctx.guild.id, node_name)
         await ctx.send(embed=embed)
 
     @hollow.command(name="daily_roll")
     @commands.has_permissions(administrator=True)
     async def daily_roll(self, ctx, node_name: str):
-        embed = _roll_daily(ctx.guild.id, node_name, time_label="day")
+        embed = await run(ctx.guild.id, _roll_daily, ctx.guild.id, node_name, time_label="day")
         await ctx.send(embed=embed)
 
     @hollow.command(name="slot_roll")
     @commands.has_permissions(administrator=True)
     async def slot_roll(self, ctx, node_name: str, slot: str):
-        embed = _roll_slot(ctx.guild.id, node_name, slot)
+        embed = await run(ctx.guild.id, _roll_slot, ctx.guild.id, node_name, slot)
         await ctx.send(embed=embed)
 
     @hollow.command(name="announce")
     @commands.has_permissions(administrator=True)
     async def announce_node(self, ctx, node_name: str):
-        embed = _make_announcement(ctx.guild.id, node_name)
+        embed = await run(ctx.guild.id, _make_announcement, ctx.guild.id, node_name)
         if not embed:
             return await ctx.send("📭 Tidak ada hasil roll terakhir untuk node itu.")
         await ctx.send(embed=embed)
@@ -708,10 +630,11 @@ class Hollow(commands.Cog):
     @hollow.command(name="sync")
     @commands.has_permissions(administrator=True)
     async def sync_all(self, ctx):
-        embeds = _sync_all(ctx.guild.id)
+        embeds = await run(ctx.guild.id, _sync_all, ctx.guild.id)
+        # 📦 Embed per node digabung 10 per pesan oleh outbox
         for e in embeds:
-            await ctx.send(embed=e)
-        await ctx.send("✅ Semua node Hollow telah di-roll ulang.")
+            outbox.send_nowait(ctx, embed=e)
+        await outbox.send(ctx, "✅ Semua node Hollow telah di-roll ulang.")
 
     # ---------------- Vendor Management ----------------
     @hollow.command(name="addnpc")
@@ -721,18 +644,18 @@ class Hollow(commands.Cog):
         Tambah vendor/NPC ke node, sekaligus set chance & rarity.
         Contoh: !hollow addnpc "Kall Ryn" Outskritz 20 uncommon
         """
-        msg = _add_npc(ctx.guild.id, node_name, npc_name, chance, rarity)
+        msg = await run(ctx.guild.id, _add_npc, ctx.guild.id, node_name, npc_name, chance, rarity)
         await ctx.send(msg)
 
     @hollow.command(name="removenpc")
     @commands.has_permissions(administrator=True)
     async def removenpc(self, ctx, npc_name: str, node_name: str):
-        msg = _remove_npc(ctx.guild.id, node_name, npc_name)
+        msg = await run(ctx.guild.id, _remove_npc, ctx.guild.id, node_name, npc_name)
         await ctx.send(msg)
 
     @hollow.command(name="listnpc")
     async def listnpc(self, ctx, node_name: str):
-        npcs = _list_npc(ctx.guild.id, node_name)
+        npcs = await run(ctx.guild.id, _list_npc, ctx.guild.id, node_name)
         if not npcs:
             return await ctx.send("📭 Tidak ada NPC di node itu.")
         embed = discord.Embed(title=f"💰 Vendor & NPC — {node_name}", color=discord.Color.gold())
@@ -757,13 +680,13 @@ class Hollow(commands.Cog):
     @hollow.command(name="addvisitor")
     @commands.has_permissions(administrator=True)
     async def addvisitor(self, ctx, *, visitor_name: str):
-        msg = _add_visitor(ctx.guild.id, visitor_name)
+        msg = await run(ctx.guild.id, _add_visitor, ctx.guild.id, visitor_name)
         await ctx.send(msg)
 
     @hollow.command(name="removevisitor")
     @commands.has_permissions(administrator=True)
     async def removevisitor(self, ctx, *, visitor_name: str):
-        msg = _remove_visitor(ctx.guild.id, visitor_name)
+        msg = await run(ctx.guild.id, _remove_visitor, ctx.guild.id, visitor_name)
         await ctx.send(msg)
 
     @hollow.command(name="editvisitor")
@@ -777,12 +700,12 @@ class Hollow(commands.Cog):
         except Exception as e:
             return await ctx.send(f"❌ Format salah: {e}")
 
-        msg = _edit_visitor(ctx.guild.id, visitor_name, fields)
+        msg = await run(ctx.guild.id, _edit_visitor, ctx.guild.id, visitor_name, fields)
         await ctx.send(msg)
 
     @hollow.command(name="listvisitor")
     async def listvisitor(self, ctx):
-        visitors = _list_visitors(ctx.guild.id)
+        visitors = await run(ctx.guild.id, _list_visitors, ctx.guild.id)
         if not visitors:
             return await ctx.send("📭 Belum ada visitor global.")
         embed = _make_visitor_list_embed(visitors)
@@ -792,13 +715,13 @@ class Hollow(commands.Cog):
     @hollow.command(name="addevent")
     @commands.has_permissions(administrator=True)
     async def addevent(self, ctx, *, event_name: str):
-        msg = _add_event(ctx.guild.id, event_name)
+        msg = await run(ctx.guild.id, _add_event, ctx.guild.id, event_name)
         await ctx.send(msg)
 
     @hollow.command(name="removeevent")
     @commands.has_permissions(administrator=True)
     async def removeevent(self, ctx, *, event_name: str):
-        msg = _remove_event(ctx.guild.id, event_name)
+        msg = await run(ctx.guild.id, _remove_event, ctx.guild.id, event_name)
         await ctx.send(msg)
 
     @hollow.command(name="editevent")
@@ -815,13 +738,13 @@ class Hollow(commands.Cog):
         print(f"[DEBUG] EVENT_NAME: {event_name}")
         print(f"[DEBUG] FIELDS: {fields}")
     
-        msg = _edit_event(ctx.guild.id, event_name, fields)
+        msg = await run(ctx.guild.id, _edit_event, ctx.guild.id, event_name, fields)
         await ctx.send(msg)
 
     @hollow.command(name="listevent")
     async def listevent(self, ctx):
         """📜 Menampilkan semua event Hollow dengan pagination"""
-        events = _list_events(ctx.guild.id)
+        events = await run(ctx.guild.id, _list_events, ctx.guild.id)
         if not events:
             return await ctx.send("📭 Tidak ada event global.")
 
@@ -880,13 +803,13 @@ class Hollow(commands.Cog):
     @hollow.command(name="assign")
     @commands.has_permissions(administrator=True)
     async def assign_event(self, ctx, event_name: str, node_name: str):
-        msg = _assign_event(ctx.guild.id, event_name, node_name)
+        msg = await run(ctx.guild.id, _assign_event, ctx.guild.id, event_name, node_name)
         await ctx.send(msg)
 
     @hollow.command(name="clearevent")
     @commands.has_permissions(administrator=True)
     async def clear_event(self, ctx, node_name: str):
-        msg = _clear_event(ctx.guild.id, node_name)
+        msg = await run(ctx.guild.id, _clear_event, ctx.guild.id, node_name)
         await ctx.send(msg)
 
     # ---------------- Traits & Types ----------------
@@ -897,17 +820,17 @@ class Hollow(commands.Cog):
 
     @trait_group.command(name="add")
     async def add_trait(self, ctx, node_name: str, *, trait: str):
-        msg = _add_trait(ctx.guild.id, node_name, trait)
+        msg = await run(ctx.guild.id, _add_trait, ctx.guild.id, node_name, trait)
         await ctx.send(msg)
 
     @trait_group.command(name="remove")
     async def remove_trait(self, ctx, node_name: str, *, trait: str):
-        msg = _remove_trait(ctx.guild.id, node_name, trait)
+        msg = await run(ctx.guild.id, _remove_trait, ctx.guild.id, node_name, trait)
         await ctx.send(msg)
 
     @trait_group.command(name="list")
     async def list_trait(self, ctx, node_name: str):
-        traits = _list_traits(ctx.guild.id, node_name)
+        traits = await run(ctx.guild.id, _list_traits, ctx.guild.id, node_name)
         embed = discord.Embed(
             title=f"🧩 Traits — {node_name}",
             description="\n".join(traits) if traits else "Tidak ada trait aktif.",
@@ -922,17 +845,17 @@ class Hollow(commands.Cog):
 
     @type_group.command(name="add")
     async def add_type(self, ctx, node_name: str, *, t: str):
-        msg = _add_type(ctx.guild.id, node_name, t)
+        msg = await run(ctx.guild.id, _add_type, ctx.guild.id, node_name, t)
         await ctx.send(msg)
 
     @type_group.command(name="remove")
     async def remove_type(self, ctx, node_name: str, *, t: str):
-        msg = _remove_type(ctx.guild.id, node_name, t)
+        msg = await run(ctx.guild.id, _remove_type, ctx.guild.id, node_name, t)
         await ctx.send(msg)
 
     @type_group.command(name="list")
     async def list_type(self, ctx, node_name: str):
-        types = _list_types(ctx.guild.id, node_name)
+        types = await run(ctx.guild.id, _list_types, ctx.guild.id, node_name)
         embed = discord.Embed(
             title=f"💠 Types — {node_name}",
             description="\n".join(types) if types else "Tidak ada type aktif.",
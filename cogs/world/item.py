@@ -4,6 +4,7 @@ from services import item_service
 import re
 from discord.ui import View, button
 from discord import ButtonStyle
+from utils.db import run
 
 # ===========================
 # Helper
@@ -106,20 +107,20 @@ class Item(commands.Cog):
         if not data["name"] or not data["type"]:
             return await ctx.send("⚠️ Format salah! Gunakan: `!item add Nama | Type | Effect | Rarity | Value | Weight | [Slot] | [Notes] | [Rules] | [Requirement]`")
 
-        existing = item_service.get_item(guild_id, data["name"])
+        existing = await run(guild_id, item_service.get_item, guild_id, data["name"])
         if existing:
-            item_service.remove_item(guild_id, data["name"])
-            item_service.add_item(guild_id, data)
+            await run(guild_id, item_service.remove_item, guild_id, data["name"])
+            await run(guild_id, item_service.add_item, guild_id, data)
             await ctx.send(f"♻️ Item **{data['name']}** diperbarui (replace item lama).")
         else:
-            item_service.add_item(guild_id, data)
+            await run(guild_id, item_service.add_item, guild_id, data)
             await ctx.send(f"🧰 Item **{data['name']}** ditambahkan ke katalog.")
 
     # === SHOW ITEMS ===
     @item.command(name="show")
     async def item_show(self, ctx, *, type_name: str = None):
         guild_id = ctx.guild.id
-        items = item_service.list_items(guild_id, limit=9999)
+        items = await run(guild_id, item_service.list_items, guild_id, limit=9999)
         if not items:
             return await ctx.send("❌ Tidak ada item di katalog.")
 
@@ -176,7 +177,7 @@ class Item(commands.Cog):
     @item.command(name="detail")
     async def item_detail(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        i = item_service.get_item(guild_id, name)
+        i = await run(guild_id, item_service.get_item, guild_id, name)
         if not i:
             return await ctx.send("❌ Item tidak ditemukan.")
 
@@ -205,10 +206,10 @@ class Item(commands.Cog):
     @item.command(name="remove")
     async def item_remove(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        found = item_service.get_item(guild_id, name)
+        found = await run(guild_id, item_service.get_item, guild_id, name)
         if not found:
             return await ctx.send("❌ Item tidak ditemukan.")
-        item_service.remove_item(guild_id, name)
+        await run(guild_id, item_service.remove_item, guild_id, name)
         await ctx.send(f"🗑️ Item **{name}** dihapus dari katalog.")
 
     @item.command(name="clearall")
@@ -216,14 +217,14 @@ class Item(commands.Cog):
         guild_id = ctx.guild.id
         if confirm != "gmacc":
             return await ctx.send("⚠️ Konfirmasi salah. Gunakan: `!item clearall gmacc`.")
-        count = item_service.clear_items(guild_id)
+        count = await run(guild_id, item_service.clear_items, guild_id)
         await ctx.send(f"🗑️ Semua item dihapus dari katalog. (Total: {count})")
 
     # === USE ITEM (tetap sama) ===
     @commands.command(name="use")
     async def use_item(self, ctx, char: str, *, item_name: str):
         guild_id = ctx.guild.id
-        i = item_service.get_item(guild_id, item_name)
+        i = await run(guild_id, item_service.get_item, guild_id, item_name)
         if not i:
             return await ctx.send("❌ Item tidak ditemukan.")
 
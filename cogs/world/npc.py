@@ -4,6 +4,7 @@ from discord.ui import View, Button
 import math
 import json
 from services import npc_service
+from utils.db import run
 
 
 class NPC(commands.Cog):
@@ -130,7 +131,7 @@ class NPC(commands.Cog):
     # === Detail NPC (Embed Cantik) ===
     @npc.command(name="detail")
     async def npc_detail(self, ctx, *, name: str):
-        npc = npc_service.get_npc(ctx.guild.id, name)
+        npc = await run(ctx.guild.id, npc_service.get_npc, ctx.guild.id, name)
         if not npc:
             return await ctx.send("❌ NPC tidak ditemukan.")
 
@@ -194,7 +195,7 @@ class NPC(commands.Cog):
     # === GM Show (lihat semua trait & info tanpa hidden) ===
     @npc.command(name="gmshow")
     async def npc_gmshow(self, ctx, *, name: str):
-        npc = npc_service.get_npc(ctx.guild.id, name)
+        npc = await run(ctx.guild.id, npc_service.get_npc, ctx.guild.id, name)
         if not npc:
             return await ctx.send("❌ NPC tidak ditemukan.")
 
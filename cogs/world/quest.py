@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-from utils.db import fetchone, fetchall, execute
+from utils.db import fetchone, fetchall, execute, run
 import json
 import re
 from cogs.world.timeline import log_event  # hook timeline
@@ -34,6 +34,7 @@ def save_quest(guild_id: int, data: dict):
         data.get("archived", 0),
         data.get("rewards_visible", 1)
     ))
+    quest_service.touch_status(guild_id)
 
 def load_quest(guild_id: int, name: str):
     row = fetchone(guild_id, "SELECT * FROM quests WHERE name=?", (name,))
@@ -137,14 +138,14 @@ class Quest(commands.Cog):
         name, desc = parts[0], parts[1]
         hidden = any("--hidden" in p.lower() for p in parts[2:])
         q = self._quest_template(name, desc, hidden)
-        save_quest(guild_id, q)
+        await run(guild_id, save_quest, guild_id, q)
         await ctx.send(f"📜 Quest **{name}** dibuat. Status: {'hidden' if hidden else 'open'}.")
 
     # ---------- Player Show ----------
     @quest.command(name="show")
     async def quest_show(self, ctx, *, name: str = None):
         guild_id = ctx.guild.id
-        allq = load_all_quests(guild_id)
+        allq = await run(guild_id, load_all_quests, guild_id)
 
         # Kalau input kosong → tampilkan quest assigned ke display_name user
         if not name:
@@ -187,7 +188,7 @@ class Quest(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def quest_gmshow(self, ctx):
         guild_id = ctx.guild.id
-        allq = load_all_quests(guild_id)
+        allq = await run(guild_id, load_all_quests, guild_id)
         out = []
         for nm, q in allq.items():
             if q.get("archived", 0) == 1:
@@ -203,7 +204,7 @@ class Quest(commands.Cog):
     @quest.command(name="showarchived")
     async def quest_show_archived(self, ctx):
         guild_id = ctx.guild.id
-        allq = load_all_quests(guild_id)
+        allq = await run(guild_id, load_all_quests, guild_id)
         out = []
         for nm, q in allq.items():
             if q.get("archived", 0) == 1:
@@ -217,7 +218,7 @@ class Quest(commands.Cog):
     @quest.command(name="detail")
     async def quest_detail(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        q = load_quest(guild_id, name)
+        q = await run(guild_id, load_quest, guild_id, name)
         if not q:
             return await ctx.send("❌ Quest tidak ditemukan.")
         await self._send_quest_detail(ctx, q)
@@ -226,19 +227,19 @@ class Quest(commands.Cog):
     @quest.command(name="assign")
     async def quest_assign(self, ctx, name: str, *, chars_csv: str):
         guild_id = ctx.guild.id
-        q = load_quest(guild_id, name)
+        q = await run(guild_id, load_quest, guild_id, name)
         if not q:
             return await ctx.send("❌ Quest tidak ditemukan.")
         chars = [c.strip() for c in chars_csv.split(",") if c.strip()]
         q["assigned_to"] = list(dict.fromkeys(chars))
-        save_quest(guild_id, q)
+        await run(guild_id, save_quest, guild_id, q)
         await ctx.send(f"✅ Quest **{name}** di-assign ke: {', '.join(q['assigned_to'])}")
 
     # ---------- Reward ----------
     @quest.command(name="reward")
     async def quest_reward(self, ctx, name: str, *, spec: str):
         guild_id = ctx.guild.id
-        q = load_quest(guild_id, name)
+        q = await run(guild_id, load_quest, guild_id, name)
         if not q:
             return await ctx.send("❌ Quest tidak ditemukan.")
         kv = parse_kv_pairs(spec)
@@ -268,7 +269,7 @@ class Quest(commands.Cog):
             r["favor"] = fav
 
         q["rewards"] = r
-        save_quest(guild_id, q)
+        await run(guild_id, save_quest, guild_id, q)
         await ctx.send(f"🎁 Reward quest **{name}** diset. XP {r.get('xp',0)}, Gold {r.get('gold',0)}, Loot {len(r.get('loot',{}))}.")
 
     # ---------- Toggle reward visible ----------
@@ -276,17 +277,17 @@ class Quest(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def quest_reward_visible(self, ctx, name: str, mode: str):
         guild_id = ctx.guild.id
-        q = load_quest(guild_id, name)
+        q = await run(guild_id, load_quest, guild_id, name)
         if not q:
             return await ctx.send("❌ Quest tidak ditemukan.")
 
         if mode.lower() in ["on", "yes", "true", "1"]:
             q["rewards_visible"] = 1
-            save_quest(guild_id, q)
+            await run(guild_id, save_quest, guild_id, q)
             await ctx.send(f"👁️ Reward quest **{name}** sekarang **terlihat** oleh player.")
         elif mode.lower() in ["off", "no", "false", "0"]:
             q["rewards_visible"] = 0
-            save_quest(guild_id, q)
+            await run(guild_id, save_quest, guild_id, q)
             await ctx.send(f"🙈 Reward quest **{name}** sekarang **disembunyikan** dari player.")
         else:
             await ctx.send("⚠️ Gunakan: `!quest rewardvisible <nama> on/off`")
@@ -295,11 +296,11 @@ class Quest(commands.Cog):
     @quest.command(name="reveal")
     async def quest_reveal(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        q = load_quest(guild_id, name)
+        q = await run(guild_id, load_quest, guild_id, name)
         if not q:
             return await ctx.send("❌ Quest tidak ditemukan.")
         q["status"] = "open"
-        save_quest(guild_id, q)
+        await run(guild_id, save_quest, guild_id, q)
 
         embed = discord.Embed(
             title=f"🔔 Quest Baru: {q['name']}",
@@ -313,13 +314,13 @@ class Quest(commands.Cog):
     @quest.command(name="complete")
     async def quest_complete(self, ctx, name: str):
         guild_id = ctx.guild.id
-        q = load_quest(guild_id, name)
+        q = await run(guild_id, load_quest, guild_id, name)
         if not q:
             return await ctx.send("❌ Quest tidak ditemukan.")
 
         q["status"] = "completed"
         q["archived"] = 1
-        save_quest(guild_id, q)
+        await run(guild_id, save_quest, guild_id, q)
 
         rewards = q.get("rewards", {})
         embed = discord.Embed(
@@ -351,7 +352,7 @@ class Quest(commands.Cog):
         if msg:
             await ctx.send(msg)
 
-        log_event(
+        await run(guild_id, log_event,
             guild_id,
             ctx.author.id,
             code=f"Q_COMPLETE_{name.upper()}",
@@ -367,13 +368,13 @@ class Quest(commands.Cog):
     @quest.command(name="fail")
     async def quest_fail(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        q = load_quest(guild_id, name)
+        q = await run(guild_id, load_quest, guild_id, name)
         if not q:
             return await ctx.send("❌ Quest tidak ditemukan.")
         q["status"] = "failed"
         q["archived"] = 1
-        save_quest(guild_id, q)
-        log_event(guild_id,
+        await run(guild_id, save_quest, guild_id, q)
+        await run(guild_id, log_event, guild_id,
                   ctx.author.id,
                   code=f"Q_FAIL_{name.upper()}",
                   title=f"Quest gagal: {name}",
@@ -387,11 +388,11 @@ class Quest(commands.Cog):
     @quest.command(name="archive")
     async def quest_archive(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        q = load_quest(guild_id, name)
+        q = await run(guild_id, load_quest, guild_id, name)
         if not q:
             return await ctx.send("❌ Quest tidak ditemukan.")
         q["archived"] = 1
-        save_quest(guild_id, q)
+        await run(guild_id, save_quest, guild_id, q)
         await ctx.send(f"📦 Quest **{name}** berhasil diarsipkan.")
 
     # ---------- Helper ----------
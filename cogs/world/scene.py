@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-from utils.db import execute, fetchall, fetchone
+from utils.db import execute, fetchone, run, afetchone, afetchall, aexecute, ensure_once
 import json
 from cogs.world.timeline import log_event  # ✅ untuk catat ke timeline
 
@@ -11,6 +11,9 @@ class Scene(commands.Cog):
 
     # ---------- DB Helpers ----------
     def _ensure_table(self, guild_id: int):
+        ensure_once(guild_id, "scenes", self._create_table)
+
+    def _create_table(self, guild_id: int):
         execute(
             guild_id,
             """
@@ -44,19 +47,19 @@ class Scene(commands.Cog):
     async def scene_create(self, ctx, *, entry: str):
         """Buat scene baru: !scene create <nama> | <desc>"""
         guild_id = ctx.guild.id
-        self._ensure_table(guild_id)
+        await run(guild_id, self._ensure_table, guild_id)
 
         if "|" not in entry:
             return await ctx.send("⚠️ Format: `!scene create <nama> | <desc>`")
 
         name, desc = [p.strip() for p in entry.split("|", 1)]
-        execute(
+        await aexecute(
             guild_id,
             "INSERT OR REPLACE INTO scenes (name, desc) VALUES (?, ?)",
             (name, desc),
         )
 
-        log_event(
+        await run(guild_id, log_event,
             guild_id,
             ctx.author.id,
             code=f"SCENE_CREATE_{name.upper()}",
@@ -76,7 +79,7 @@ class Scene(commands.Cog):
         Edit scene lama: !scene edit <nama> | <desc baru> [--faction ... --danger ...]
         """
         guild_id = ctx.guild.id
-        self._ensure_table(guild_id)
+        await run(guild_id, self._ensure_table, guild_id)
 
         if "|" not in entry:
             return await ctx.send("⚠️ Format: `!scene edit <nama> | <desc>`")
@@ -93,17 +96,17 @@ class Scene(commands.Cog):
             parts = desc.split("--danger")
             desc, danger = parts[0].strip(), parts[1].strip()
 
-        row = fetchone(guild_id, "SELECT * FROM scenes WHERE name=?", (name,))
+        row = await afetchone(guild_id, "SELECT * FROM scenes WHERE name=?", (name,))
         if not row:
             return await ctx.send(f"❌ Scene **{name}** tidak ditemukan.")
 
-        execute(
+        await aexecute(
             guild_id,
             "UPDATE scenes SET desc=?, factions=?, danger=?, updated_at=CURRENT_TIMESTAMP WHERE name=?",
             (desc, json.dumps(factions), (danger or row.get("danger") or "-"), name)
         )
 
-        log_event(
+        await run(guild_id, log_event,
             guild_id,
             ctx.author.id,
             code=f"SCENE_EDIT_{name.upper()}",
@@ -128,9 +131,9 @@ class Scene(commands.Cog):
     @scene.command(name="list")
     async def scene_list(self, ctx):
         guild_id = ctx.guild.id
-        self._ensure_table(guild_id)
+        await run(guild_id, self._ensure_table, guild_id)
 
-        rows = fetchall(guild_id, "SELECT * FROM scenes ORDER BY updated_at DESC LIMIT 10")
+        rows = await afetchall(guild_id, "SELECT * FROM scenes ORDER BY updated_at DESC LIMIT 10")
         if not rows:
             return await ctx.send("⚠️ Belum ada scene.")
 
@@ -143,9 +146,9 @@ class Scene(commands.Cog):
     @scene.command(name="recall")
     async def scene_recall(self, ctx, *, name: str):
         guild_id = ctx.guild.id
-        self._ensure_table(guild_id)
+        await run(guild_id, self._ensure_table, guild_id)
 
-        row = fetchone(guild_id, "SELECT * FROM scenes WHERE name=?", (name,))
+        row = await afetchone(guild_id, "SELECT * FROM scenes WHERE name=?", (name,))
         if not row:
             return await ctx.send(f"❌ Scene **{name}** tidak ditemukan.")
 
@@ -162,7 +165,7 @@ class Scene(commands.Cog):
     @scene.command(name="pin")
     async def scene_pin_cmd(self, ctx):
         guild_id = ctx.guild.id
-        row = self._get_latest_scene(guild_id)
+        row = await run(guild_id, self._get_latest_scene, guild_id)
         if not row:
             return await ctx.send("⚠️ Tidak ada scene/zone terakhir.")
         self.scene_pin[guild_id] = {
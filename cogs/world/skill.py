@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from services import skill_service
+from utils.db import run
 
 CATEGORY_EMOJI = {
     "Basic": "📘",
@@ -29,7 +30,7 @@ class Skill(commands.Cog):
         """
         Tampilkan skill milik karakter, bisa difilter per kategori.
         """
-        skills = skill_service.get_char_skills(ctx.guild.id, char)
+        skills = await run(ctx.guild.id, skill_service.get_char_skills, ctx.guild.id, char)
         if not skills:
             return await ctx.send(f"❌ Karakter `{char}` belum punya skill.")
 
@@ -43,7 +44,7 @@ class Skill(commands.Cog):
         # ambil detail library
         details = []
         for sk in skills:
-            lib = skill_service.get_library_info(ctx.guild.id, sk["name"])
+            lib = await run(ctx.guild.id, skill_service.get_library_info, ctx.guild.id, sk["name"])
             if lib:
                 details.append({
                     "name": lib["name"],
@@ -110,7 +111,7 @@ class Skill(commands.Cog):
     # === USE SKILL ===
     @skill.command(name="use")
     async def skill_use(self, ctx, char_name: str, *, skill_name: str):
-        row = skill_service.use_skill(ctx.guild.id, char_name, skill_name)
+        row = await run(ctx.guild.id, skill_service.use_skill, ctx.guild.id, char_name, skill_name)
         if not row:
             await ctx.send(f"❌ {char_name} tidak punya skill {skill_name}.")
             return
@@ -128,7 +129,7 @@ class Skill(commands.Cog):
     # ===== GM COMMANDS =====
     @skill.command(name="add")
     async def skill_add(self, ctx, char_name: str, *, skill_ref: str):
-        msg = skill_service.add_skill(ctx.guild.id, char_name, skill_ref)
+        msg = await run(ctx.guild.id, skill_service.add_skill, ctx.guild.id, char_name, skill_ref)
         await ctx.send(msg)
 
     @skill.command(name="edit")
@@ -136,22 +137,22 @@ class Skill(commands.Cog):
         """
         Update level skill karakter
         """
-        msg = skill_service.edit_skill(ctx.guild.id, char_name, skill_name, level)
+        msg = await run(ctx.guild.id, skill_service.edit_skill, ctx.guild.id, char_name, skill_name, level)
         await ctx.send(msg)
 
     @skill.command(name="remove")
     async def skill_remove(self, ctx, char_name: str, *, skill_name: str):
-        msg = skill_service.remove_skill(ctx.guild.id, char_name, skill_name)
+        msg = await run(ctx.guild.id, skill_service.remove_skill, ctx.guild.id, char_name, skill_name)
         await ctx.send(msg)
 
     @skill.command(name="reset")
     async def skill_reset(self, ctx, char_name: str):
-        msg = skill_service.reset_skills(ctx.guild.id, char_name)
+        msg = await run(ctx.guild.id, skill_service.reset_skills, ctx.guild.id, char_name)
         await ctx.send(msg)
 
     @skill.command(name="gmglobal")
     async def skill_gmglobal(self, ctx):
-        rows = skill_service.get_all_skills(ctx.guild.id)
+        rows = await run(ctx.guild.id, skill_service.get_all_skills, ctx.guild.id)
         if not rows:
             await ctx.send("📂 Belum ada skill yang tercatat di database guild ini.")
             return
@@ -174,12 +175,12 @@ class Skill(commands.Cog):
 
     @skill_library.command(name="add")
     async def skill_library_add(self, ctx, category: str, name: str, effect: str, drawback: str, cost: str):
-        msg = skill_service.add_library(ctx.guild.id, category, name, effect, drawback, cost)
+        msg = await run(ctx.guild.id, skill_service.add_library, ctx.guild.id, category, name, effect, drawback, cost)
         await ctx.send(msg)
 
     @skill_library.command(name="list")
     async def skill_library_list(self, ctx, category: str = None):
-        rows = skill_service.list_library(ctx.guild.id, category)
+        rows = await run(ctx.guild.id, skill_service.list_library, ctx.guild.id, category)
         if not rows:
             await ctx.send("❌ Belum ada skill di library.")
             return
@@ -231,7 +232,7 @@ class Skill(commands.Cog):
 
     @skill_library.command(name="info")
     async def skill_library_info(self, ctx, *, skill_ref: str):
-        row = skill_service.get_library_info(ctx.guild.id, skill_ref)
+        row = await run(ctx.guild.id, skill_service.get_library_info, ctx.guild.id, skill_ref)
         if not row:
             await ctx.send("❌ Skill tidak ditemukan di library.")
             return
@@ -246,12 +247,12 @@ class Skill(commands.Cog):
 
     @skill_library.command(name="remove")
     async def skill_library_remove(self, ctx, *, skill_ref: str):
-        msg = skill_service.remove_library(ctx.guild.id, skill_ref)
+        msg = await run(ctx.guild.id, skill_service.remove_library, ctx.guild.id, skill_ref)
         await ctx.send(msg)
 
     @skill_library.command(name="update")
     async def skill_library_update(self, ctx, skill_ref: str, effect: str, drawback: str, cost: str):
-        msg = skill_service.update_library(ctx.guild.id, skill_ref, effect, drawback, cost)
+        msg = await run(ctx.guild.id, skill_service.update_library, ctx.guild.id, skill_ref, effect, drawback, cost)
         await ctx.send(msg)
 
 
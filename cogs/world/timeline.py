@@ -3,7 +3,7 @@ import json
 from datetime import datetime
 import discord
 from discord.ext import commands
-from utils.db import save_memory, get_recent
+from utils.db import save_memory, get_recent, run
 
 TIMELINE_CATEGORY = "timeline"
 DEFAULT_LIMIT = 15
@@ -110,7 +110,7 @@ class Timeline(commands.Cog):
     @commands.group(name="timeline", invoke_without_command=True)
     async def timeline(self, ctx: commands.Context, limit: int = DEFAULT_LIMIT):
         """Tampilkan N event timeline terakhir (default 15)."""
-        rows = get_recent(ctx.guild.id, TIMELINE_CATEGORY, limit)
+        rows = await run(ctx.guild.id, get_recent, ctx.guild.id, TIMELINE_CATEGORY, limit)
         if not rows:
             return await ctx.send("ℹ️ Timeline kosong.")
 
@@ -133,13 +133,13 @@ class Timeline(commands.Cog):
         else:
             return await ctx.send("❌ Format salah. Pakai: CODE | Judul | detail")
 
-        log_event(ctx.guild.id, ctx.author.id, code=code, title=title, details=details, etype="note")
+        await run(ctx.guild.id, log_event, ctx.guild.id, ctx.author.id, code=code, title=title, details=details, etype="note")
         await ctx.send(f"✅ Ditambahkan ke timeline: **{title}** (code: {code})")
 
     @timeline.command(name="full")
     async def timeline_full(self, ctx: commands.Context):
         """Tampilkan semua event timeline."""
-        rows = get_recent(ctx.guild.id, TIMELINE_CATEGORY, 5000)
+        rows = await run(ctx.guild.id, get_recent, ctx.guild.id, TIMELINE_CATEGORY, 5000)
         if not rows:
             return await ctx.send("ℹ️ Timeline kosong.")
 
@@ -155,7 +155,7 @@ class Timeline(commands.Cog):
     @timeline.command(name="search")
     async def timeline_search(self, ctx: commands.Context, *, keyword: str):
         """Cari event di timeline berdasarkan kata kunci."""
-        rows = get_recent(ctx.guild.id, TIMELINE_CATEGORY, 5000)
+        rows = await run(ctx.guild.id, get_recent, ctx.guild.id, TIMELINE_CATEGORY, 5000)
         if not rows:
             return await ctx.send("ℹ️ Timeline kosong.")
 
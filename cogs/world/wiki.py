@@ -1,5 +1,5 @@
 from discord.ext import commands
-from utils.db import execute, query_all, query_one
+from utils.db import afetchone, afetchall, aexecute
 from utils.embeds import info_embed, error_embed, ok_embed
 import discord
 
@@ -22,7 +22,7 @@ class WikiCog(commands.Cog):
     # GET entry
     @wiki.command(name="get")
     async def get(self, ctx: commands.Context, category: str, *, name: str):
-        row = query_one("SELECT * FROM wiki WHERE category=? AND name=?", (category.lower(), name.lower()))
+        row = await afetchone(ctx.guild.id, "SELECT * FROM wiki WHERE category=? AND name=?", (category.lower(), name.lower()))
         if not row:
             await ctx.send(embed=error_embed(f"Tidak ada **{category}** bernama `{name}`"))
             return
@@ -37,7 +37,7 @@ class WikiCog(commands.Cog):
     # LIST entries
     @wiki.command(name="list")
     async def list_(self, ctx: commands.Context, category: str):
-        rows = query_all("SELECT * FROM wiki WHERE category=? ORDER BY name ASC", (category.lower(),))
+        rows = await afetchall(ctx.guild.id, "SELECT * FROM wiki WHERE category=? ORDER BY name ASC", (category.lower(),))
         if not rows:
             await ctx.send(embed=info_embed(f"📚 {category.title()}", "❌ Belum ada data."))
             return
@@ -54,7 +54,7 @@ class WikiCog(commands.Cog):
             await ctx.send(embed=error_embed("Gunakan format: `<name> | <content>`"))
             return
         name, content = parts
-        execute("INSERT INTO wiki (category, name, content) VALUES (?,?,?)", 
+        await aexecute(ctx.guild.id, "INSERT INTO wiki (category, name, content) VALUES (?,?,?)",
                 (category.lower(), name.lower(), content))
         await ctx.send(embed=ok_embed("✅ Wiki updated", f"{category.title()} `{name}` ditambahkan."))
 
@@ -62,7 +62,7 @@ class WikiCog(commands.Cog):
     @wiki.command(name="remove")
     @commands.has_permissions(administrator=True)
     async def remove(self, ctx: commands.Context, wid: int):
-        execute("DELETE FROM wiki WHERE id=?", (wid,))
+        await aexecute(ctx.guild.id, "DELETE FROM wiki WHERE id=?", (wid,))
         await ctx.send(embed=ok_embed("🗑️ Wiki removed", f"Entry #{wid} dihapus."))
 
 async def setup(bot: commands.Bot):
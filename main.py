@@ -1,12 +1,14 @@
 import os
+import time
+import asyncio
 import logging
 from dotenv import load_dotenv
 import discord
 from discord.ext import commands
-from openai import OpenAI
 
 # === DB (SQLite) ===
-from utils.db import init_db
+from utils.db import init_db, ensure_schema, close_all, run, prune_idle
+from services import encounter_service, ask_service
 
 # === Utils ===
 from utils.discord_tools import send_long
@@ -22,15 +24,14 @@ logger = logging.getLogger("bot")
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+DB_INIT_CONCURRENCY = int(os.getenv("DB_INIT_CONCURRENCY", "4"))  # sebaiknya < DB_WORKERS
+DB_PRUNE_INTERVAL = float(os.getenv("DB_PRUNE_INTERVAL", "60"))   # detik antar cek koneksi idle
 
 if not DISCORD_TOKEN:
     raise RuntimeError("❌ ENV DISCORD_TOKEN kosong.")
 if not OPENAI_API_KEY:
     raise RuntimeError("❌ ENV OPENAI_API_KEY kosong.")
 
-# ====== GPT CLIENT ======
-client_gpt = OpenAI(api_key=OPENAI_API_KEY)
-
 # ====== DISCORD BOT ======
 intents = discord.Intents.default()
 intents.message_content = True
@@ -54,6 +55,7 @@ class MyBot(commands.Bot):
             "cogs.core.companion",
             "cogs.core.ally_status",
             "cogs.core.equipment", 
+            "cogs.core.aoe",
 
             # WORLD SYSTEM
             "cogs.world.quest",
@@ -74,6 +76,7 @@ class MyBot(commands.Bot):
             "cogs.utility.db_admin",
             "cogs.utility.poll",
             "cogs.utility.multi",
+            "cogs.utility.search",
             "cogs.utility.help_ui",
         ]
         for ext in exts:
@@ -85,6 +88,14 @@ class MyBot(commands.Bot):
                 import traceback
                 traceback.print_exc()
 
+    async def close(self):
+        await super().close()
+        # ⚔️ Mutasi encounter yang belum di-flush masuk DB dulu
+        encounter_service.flush_all()
+        # 🔒 Tutup semua koneksi SQLite yang masih hangat di pool
+        close_all()
+        logger.info("📦 Semua koneksi DB ditutup.")
+
 # ✅ Matikan help bawaan supaya tidak bentrok
 bot = MyBot(command_prefix=commands.when_mentioned_or("!", "/"),
             intents=intents, help_command=None)
@@ -93,15 +104,54 @@ try:
 except Exception:
     pass
 
-@bot.event
-async def on_ready():
-    # 🔧 Init DB untuk semua guild yang sudah join
-    for g in bot.guilds:
+# ====== INIT DB PER GUILD ======
+async def _init_guild_db(guild) -> None:
+    t0 = time.perf_counter()
+    try:
+        version = await run(guild.id, init_db, guild.id)
+        # 🩹 Sisa journal encounter (bot mati di tengah combat) diputar ulang ke DB
+        await run(guild.id, encounter_service.recover, guild.id)
+        ms = (time.perf_counter() - t0) * 1000
+        logger.info(f"📦 DB ready untuk guild {guild.name} ({guild.id}) v{version} dalam {ms:.0f} ms")
+    except Exception as e:
+        logger.error(f"❌ Gagal init DB untuk guild {guild.id}: {e}")
+
+async def _warm_guild_dbs(guilds) -> None:
+    """Init DB semua guild di background, maksimal DB_INIT_CONCURRENCY sekaligus."""
+    sem = asyncio.Semaphore(DB_INIT_CONCURRENCY)
+
+    async def _one(g):
+        async with sem:
+            await _init_guild_db(g)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_one(g) for g in guilds))
+    logger.info(f"📦 Init DB {len(guilds)} guild selesai dalam {time.perf_counter() - t0:.1f} s")
+
+async def _prune_idle_loop() -> None:
+    """Tutup koneksi DB yang idle > DB_POOL_IDLE walau bot sedang sepi command."""
+    while True:
+        await asyncio.sleep(DB_PRUNE_INTERVAL)
         try:
-            init_db(g.id)
-            logger.info(f"📦 DB ready untuk guild {g.name} ({g.id})")
+            closed = await asyncio.to_thread(prune_idle)
+            if closed:
+                logger.info(f"📦 {closed} koneksi DB idle ditutup")
         except Exception as e:
-            logger.error(f"❌ Gagal init DB untuk guild {g.id}: {e}")
+            logger.warning(f"⚠️ Prune koneksi DB gagal: {e}")
+
+@bot.before_invoke
+async def _ensure_guild_db(ctx):
+    """Guild yang belum kebagian warm-up tetap di-init saat command pertamanya."""
+    if ctx.guild:
+        await run(ctx.guild.id, ensure_schema, ctx.guild.id)
+
+@bot.event
+async def on_ready():
+    # 🔧 Init DB semua guild di background supaya bot langsung bisa jawab command
+    if not getattr(bot, "_db_warmup", None):
+        bot._db_warmup = asyncio.create_task(_warm_guild_dbs(list(bot.guilds)))
+    if not getattr(bot, "_db_prune", None):
+        bot._db_prune = asyncio.create_task(_prune_idle_loop())
 
     cmds = ", ".join(sorted(c.name for c in bot.commands))
     logger.info(f"🤖 Bot login sebagai {bot.user} | Commands: [{cmds}]")
@@ -109,11 +159,7 @@ async def on_ready():
 @bot.event
 async def on_guild_join(guild):
     """Auto setup DB saat join server baru."""
-    try:
-        init_db(guild.id)
-        logger.info(f"📦 DB created for guild {guild.name} ({guild.id})")
-    except Exception as e:
-        logger.error(f"❌ Gagal init DB untuk guild {guild.id}: {e}")
+    await _init_guild_db(guild)
 
 @bot.event
 async def on_command_error(ctx, error):
@@ -129,28 +175,40 @@ async def ask(ctx, *, prompt: str = None):
     if not prompt:
         await send_long(ctx, "⚠️ Tolong kasih pertanyaan setelah `!ask`")
         return
+    if not ctx.guild:
+        await ctx.send("🚫 `!ask` hanya bisa dipakai di server (budget token dihitung per server).")
+        return
     msg = await ctx.send("🤖...")
+
+    async def _progress(text: str):
+        # ✍️ Jawaban muncul bertahap di pesan placeholder (edit di-throttle ask_service)
+        preview = text if len(text) <= 1900 else "…" + text[-1900:]
+        try:
+            await msg.edit(content=preview + " ▌")
+        except discord.HTTPException:
+            pass
+
     try:
-        response = client_gpt.chat.completions.create(
-            model="gpt-4o",  # ✅ ganti ke gpt-4o
-            messages=[
-                {"role": "system", "content": "Kamu adalah asisten yang ramah."},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=1500,  # ✅ tetap pakai max_tokens
-        )
-        answer = response.choices[0].message.content
-        logger.info(f"💬 GPT Prompt: {prompt}")
-        logger.info(f"📝 GPT Answer (first 100 chars): {answer[:100]}...")
-        await send_long(ctx, answer)
+        answer, source = await ask_service.answer(ctx.guild.id, prompt, on_progress=_progress,
+                                                  user_id=ctx.author.id)
+        logger.info(f"💬 GPT Prompt ({source}): {prompt}")
+        logger.info(f"📝 GPT Answer ({len(answer)} chars): {answer[:100]}...")
+        if answer and len(answer) <= 2000:
+            await msg.edit(content=answer)
+            return
+        await send_long(ctx, answer or "(jawaban kosong)")
+    except ask_service.BudgetExceeded as e:
+        await ctx.send(str(e))
+    except TimeoutError:
+        logger.error(f"⏱️ GPT timeout ({ask_service.ASK_TIMEOUT:.0f}s): {prompt[:100]}")
+        await ctx.send(f"⏱️ GPT tidak menjawab dalam {ask_service.ASK_TIMEOUT:.0f} detik, coba lagi nanti.")
     except Exception as e:
         logger.error(f"❌ Error GPT: {e}")
         await send_long(ctx, f"❌ Error: {str(e)}")
-    finally:
-        try:
-            await msg.delete()
-        except Exception:
-            pass
+    try:
+        await msg.delete()
+    except Exception:
+        pass
 
 if __name__ == "__main__":
     bot.run(DISCORD_TOKEN)
@@ -0,0 +1,355 @@
+# services/ask_service.py
+import os
+import re
+import time
+import hashlib
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from utils.db import ensure_schema, execute, fetchall, fetchone, offload, transaction
+from services import retrieval_service
+from services.retrieval_service import estimate_tokens
+
+logger = logging.getLogger("ask")
+
+# ===============================
+# Konfigurasi
+# ===============================
+ASK_MODEL = os.getenv("ASK_MODEL", "gpt-4o")
+ASK_MAX_TOKENS = int(os.getenv("ASK_MAX_TOKENS", "1500"))
+ASK_CONCURRENCY = int(os.getenv("ASK_CONCURRENCY", "3"))        # request GPT paralel maksimal
+ASK_TIMEOUT = float(os.getenv("ASK_TIMEOUT", "60"))             # detik, total per jawaban
+ASK_EDIT_INTERVAL = float(os.getenv("ASK_EDIT_INTERVAL", "1.2"))  # jeda minimal antar edit pesan
+ASK_CACHE_TTL = float(os.getenv("ASK_CACHE_TTL", str(7 * 24 * 3600)))  # detik; 0 = cache mati
+ASK_CACHE_MAX = int(os.getenv("ASK_CACHE_MAX", "500"))           # entry per guild (LRU)
+ASK_GUILD_DAILY_TOKENS = int(os.getenv("ASK_GUILD_DAILY_TOKENS", "200000"))  # per guild / 24 jam; 0 = bebas
+ASK_USER_DAILY_TOKENS = int(os.getenv("ASK_USER_DAILY_TOKENS", "20000"))     # per user / 24 jam; 0 = bebas
+ASK_MIN_TOKENS = int(os.getenv("ASK_MIN_TOKENS", "64"))          # sisa budget di bawah ini → tolak
+
+SYSTEM_PROMPT = "Kamu adalah asisten yang ramah."
+CONTEXT_HINT = ("Di awal pertanyaan ada konteks dari data kampanye server ini. "
+                "Pakai kalau relevan, dan jangan mengarang detail kampanye yang tidak ada di konteks.")
+
+_client: Optional[AsyncOpenAI] = None
+_sem: Optional[asyncio.Semaphore] = None
+
+def _get_client() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=ASK_TIMEOUT)
+    return _client
+
+def _get_sem() -> asyncio.Semaphore:
+    global _sem
+    if _sem is None:
+        _sem = asyncio.Semaphore(ASK_CONCURRENCY)
+    return _sem
+
+def build_messages(prompt: str, context: str = "") -> list:
+    if not context:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+    return [
+        {"role": "system", "content": f"{SYSTEM_PROMPT} {CONTEXT_HINT}"},
+        {"role": "user", "content": f"Konteks kampanye:\n{context}\n\nPertanyaan: {prompt}"},
+    ]
+
+# ===============================
+# Streaming
+# ===============================
+def _usage(messages: list, text: str, usage, latency_ms: int) -> Dict:
+    if usage:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+    else:
+        # API lama / proxy tanpa include_usage / stream putus → perkiraan kasar
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        completion_tokens = estimate_tokens(text)
+    return {
+        "model": ASK_MODEL,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "latency_ms": latency_ms,
+    }
+
+async def ask(prompt: str, on_progress: Optional[Callable[[str], Awaitable[None]]] = None,
+              context: str = "", max_tokens: int = None, meter: Optional[Dict] = None) -> Tuple[str, Dict]:
+    """
+    Minta jawaban GPT secara streaming (AsyncOpenAI, tidak memblok event loop).
+    on_progress(teks_sejauh_ini) dipanggil paling sering tiap ASK_EDIT_INTERVAL detik.
+    Return (teks, usage) — usage: model, prompt_tokens, completion_tokens, latency_ms.
+    Raise TimeoutError kalau lewat ASK_TIMEOUT. `meter` (dict) tetap diisi usage
+    walau panggilan gagal di tengah jalan, supaya token yang terpakai bisa dicatat.
+    """
+    messages = build_messages(prompt, context)
+    meter = {} if meter is None else meter
+    parts = []
+    usage = None
+    last_edit = 0.0
+    async with _get_sem():
+        t0 = time.monotonic()
+        try:
+            async with asyncio.timeout(ASK_TIMEOUT):
+                stream = await _get_client().chat.completions.create(
+                    model=ASK_MODEL,
+                    messages=messages,
+                    max_tokens=max_tokens or ASK_MAX_TOKENS,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    now = time.monotonic()
+                    if on_progress and now - last_edit >= ASK_EDIT_INTERVAL:
+                        last_edit = now
+                        await on_progress("".join(parts))
+        finally:
+            meter.update(_usage(messages, "".join(parts), usage, int((time.monotonic() - t0) * 1000)))
+    return "".join(parts), meter
+
+# ===============================
+# Cache jawaban (per guild, di DB)
+# ===============================
+_WS = re.compile(r"\s+")
+
+def normalize_prompt(prompt: str) -> str:
+    """Huruf kecil, spasi dirapikan, tanda baca di ujung dibuang → "Apa itu Hollow?" == "apa itu hollow"."""
+    return _WS.sub(" ", prompt.lower()).strip().rstrip("?!.。 ")
+
+def cache_key(prompt: str, model: str = None, context: str = "") -> str:
+    """Konteks ikut di-hash: data kampanye berubah → jawaban lama otomatis tidak dipakai."""
+    model = model or ASK_MODEL
+    raw = f"{model}\n{normalize_prompt(prompt)}\n{context}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+@offload
+def _cache_get(guild_id: int, key: str) -> Optional[str]:
+    ensure_schema(guild_id)
+    now = time.time()
+    row = fetchone(guild_id, "SELECT answer, created_at FROM ask_cache WHERE key=?", (key,))
+    if not row:
+        return None
+    if now - row["created_at"] > ASK_CACHE_TTL:
+        execute(guild_id, "DELETE FROM ask_cache WHERE key=?", (key,))
+        return None
+    execute(guild_id, "UPDATE ask_cache SET hits=hits+1, last_hit=? WHERE key=?", (now, key))
+    return row["answer"]
+
+@offload
+def _cache_put(guild_id: int, key: str, prompt: str, answer: str) -> None:
+    ensure_schema(guild_id)
+    now = time.time()
+    with transaction(guild_id) as tx:
+        tx.execute("""
+            INSERT INTO ask_cache (key, model, prompt, answer, hits, created_at, last_hit)
+            VALUES (?,?,?,?,0,?,?)
+            ON CONFLICT(key) DO UPDATE SET answer=excluded.answer,
+                created_at=excluded.created_at, last_hit=excluded.last_hit
+        """, (key, ASK_MODEL, prompt, answer, now, now))
+        # Buang yang kedaluwarsa, lalu yang paling lama tidak dipakai di atas ASK_CACHE_MAX
+        tx.execute("DELETE FROM ask_cache WHERE created_at < ?", (now - ASK_CACHE_TTL,))
+        tx.execute("""
+            DELETE FROM ask_cache WHERE key IN (
+                SELECT key FROM ask_cache ORDER BY last_hit DESC LIMIT -1 OFFSET ?
+            )
+        """, (ASK_CACHE_MAX,))
+
+@offload
+def clear_cache(guild_id: int) -> int:
+    ensure_schema(guild_id)
+    with transaction(guild_id) as tx:
+        n = tx.fetchone("SELECT COUNT(*) AS n FROM ask_cache")["n"]
+        tx.execute("DELETE FROM ask_cache")
+    return n
+
+# Statistik sejak bot start: hit = dari cache, shared = ikut request yang sedang jalan, miss = panggil GPT
+_stats: Dict[int, Dict[str, int]] = {}
+
+def _count(guild_id: int, kind: str) -> None:
+    st = _stats.setdefault(int(guild_id), {"hit": 0, "shared": 0, "miss": 0})
+    st[kind] += 1
+
+@offload
+def cache_stats(guild_id: int) -> Dict:
+    ensure_schema(guild_id)
+    row = fetchone(guild_id, """
+        SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits,
+               COALESCE(SUM(LENGTH(answer)), 0) AS chars
+        FROM ask_cache
+    """)
+    return {**row, **_stats.get(int(guild_id), {"hit": 0, "shared": 0, "miss": 0})}
+
+# ===============================
+# Dedup request yang sedang jalan
+# ===============================
+class _Flight:
+    """Satu panggilan GPT yang ditunggu beberapa !ask dengan prompt sama."""
+    def __init__(self):
+        self.future = asyncio.get_running_loop().create_future()
+        self.listeners: List[Callable[[str], Awaitable[None]]] = []
+
+    async def progress(self, text: str) -> None:
+        for cb in list(self.listeners):
+            try:
+                await cb(text)
+            except Exception as e:
+                logger.debug(f"progress listener gagal: {e}")
+
+_inflight: Dict[Tuple[int, str], _Flight] = {}
+
+# ===============================
+# Metering & budget token (per guild, di DB)
+# ===============================
+class BudgetExceeded(Exception):
+    """Budget token guild/user habis; pesan sudah siap ditampilkan ke user."""
+
+_DAY = 24 * 3600
+
+@offload
+def record_usage(guild_id: int, user_id, usage: Dict) -> None:
+    ensure_schema(guild_id)
+    execute(guild_id, """
+        INSERT INTO gpt_usage (user_id, model, prompt_tokens, completion_tokens, latency_ms, created_at)
+        VALUES (?,?,?,?,?,?)
+    """, (str(user_id) if user_id is not None else None, usage["model"], usage["prompt_tokens"],
+          usage["completion_tokens"], usage["latency_ms"], time.time()))
+
+@offload
+def remaining_budget(guild_id: int, user_id=None) -> Optional[int]:
+    """Sisa token 24 jam terakhir (minimum guild & user). None = tanpa batas."""
+    ensure_schema(guild_id)
+    since = time.time() - _DAY
+    left = []
+    if ASK_GUILD_DAILY_TOKENS > 0:
+        row = fetchone(guild_id, """
+            SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) AS used
+            FROM gpt_usage WHERE created_at >= ?
+        """, (since,))
+        left.append(ASK_GUILD_DAILY_TOKENS - row["used"])
+    if ASK_USER_DAILY_TOKENS > 0 and user_id is not None:
+        row = fetchone(guild_id, """
+            SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) AS used
+            FROM gpt_usage WHERE user_id = ? AND created_at >= ?
+        """, (str(user_id), since))
+        left.append(ASK_USER_DAILY_TOKENS - row["used"])
+    return min(left) if left else None
+
+@offload
+def usage_report(guild_id: int, days: float = 1) -> Dict:
+    """Ringkasan pemakaian GPT: total, per model, user teratas, latency rata-rata & p95."""
+    ensure_schema(guild_id)
+    since = time.time() - days * _DAY
+    total = fetchone(guild_id, """
+        SELECT COUNT(*) AS calls, COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens,
+               COALESCE(SUM(completion_tokens), 0) AS completion_tokens,
+               COALESCE(AVG(latency_ms), 0) AS avg_latency
+        FROM gpt_usage WHERE created_at >= ?
+    """, (since,))
+    models = fetchall(guild_id, """
+        SELECT model, COUNT(*) AS calls, SUM(prompt_tokens + completion_tokens) AS tokens
+        FROM gpt_usage WHERE created_at >= ? GROUP BY model ORDER BY tokens DESC
+    """, (since,))
+    users = fetchall(guild_id, """
+        SELECT user_id, COUNT(*) AS calls, SUM(prompt_tokens + completion_tokens) AS tokens
+        FROM gpt_usage WHERE created_at >= ? GROUP BY user_id ORDER BY tokens DESC LIMIT 5
+    """, (since,))
+    p95 = None
+    if total["calls"]:
+        row = fetchone(guild_id, """
+            SELECT latency_ms FROM gpt_usage WHERE created_at >= ?
+            ORDER BY latency_ms LIMIT 1 OFFSET ?
+        """, (since, int(total["calls"] * 0.95)))
+        p95 = row["latency_ms"] if row else None
+    return {**total, "p95_latency": p95, "models": models, "users": users}
+
+async def _metered_ask(guild_id: int, user_id, prompt: str, on_progress, context: str) -> str:
+    """ask() + cek budget sebelum panggil (fast-fail) + catat usage sesudahnya."""
+    left = await remaining_budget(guild_id, user_id)
+    max_tokens = ASK_MAX_TOKENS
+    if left is not None:
+        max_tokens = min(ASK_MAX_TOKENS, left - estimate_tokens(prompt + context))
+        if max_tokens < ASK_MIN_TOKENS:
+            raise BudgetExceeded("🚫 Budget token GPT (24 jam) untuk server/kamu sudah habis, coba lagi nanti.")
+    meter: Dict = {}
+    try:
+        text, _ = await ask(prompt, on_progress, context, max_tokens=max_tokens, meter=meter)
+    finally:
+        # dicatat juga kalau timeout / stream putus: token yang sudah terpakai tetap masuk budget
+        if meter:
+            try:
+                await record_usage(guild_id, user_id, meter)
+            except Exception as e:
+                logger.warning(f"⚠️ Gagal mencatat usage GPT guild {guild_id}: {e}")
+            logger.info(f"📊 GPT usage guild {guild_id} user {user_id}: {meter['prompt_tokens']}+"
+                        f"{meter['completion_tokens']} token, {meter['latency_ms']} ms ({meter['model']})")
+    return text
+
+async def answer(guild_id: Optional[int], prompt: str,
+                 on_progress: Optional[Callable[[str], Awaitable[None]]] = None,
+                 user_id=None) -> Tuple[str, str]:
+    """
+    Jawaban untuk !ask → (teks, sumber) dengan sumber "cache" / "shared" / "gpt".
+    Prompt identik yang sedang diproses tidak memanggil GPT lagi, cukup ikut menunggu
+    (dan ikut menerima update streaming-nya). Tanpa guild (DM) → ditolak (BudgetExceeded).
+    Snippet data kampanye guild (retrieval_service) ditaruh di depan prompt.
+    Panggilan GPT sungguhan dicek budget & dicatat di gpt_usage (raise BudgetExceeded).
+    """
+    if guild_id is None:
+        # budget & gpt_usage disimpan per guild → DM tidak bisa dimeter, jadi ditolak
+        raise BudgetExceeded("🚫 `!ask` hanya bisa dipakai di server (budget token dihitung per server).")
+
+    context = retrieval_service.format_context(await retrieval_service.retrieve(guild_id, prompt))
+    if ASK_CACHE_TTL <= 0:
+        return await _metered_ask(guild_id, user_id, prompt, on_progress, context), "gpt"
+
+    key = cache_key(prompt, context=context)
+    if (guild_id, key) not in _inflight:
+        cached = await _cache_get(guild_id, key)
+        if cached is not None:
+            _count(guild_id, "hit")
+            return cached, "cache"
+
+    # dicek setelah await DB: selama itu !ask lain bisa sudah mulai prompt yang sama
+    flight = _inflight.get((guild_id, key))
+    if flight:
+        _count(guild_id, "shared")
+        if on_progress:
+            flight.listeners.append(on_progress)
+        try:
+            return await asyncio.shield(flight.future), "shared"
+        except BudgetExceeded:
+            # yang habis budget pemanggil pertama → cek ulang dengan budget sendiri
+            return await answer(guild_id, prompt, on_progress, user_id)
+
+    _count(guild_id, "miss")
+    flight = _inflight[(guild_id, key)] = _Flight()
+    if on_progress:
+        flight.listeners.append(on_progress)
+    try:
+        text = await _metered_ask(guild_id, user_id, prompt, flight.progress, context)
+    except asyncio.CancelledError:
+        flight.future.cancel()
+        raise
+    except Exception as e:
+        flight.future.set_exception(e)
+        flight.future.exception()   # tandai sudah dibaca kalau tidak ada yang menunggu
+        raise
+    else:
+        flight.future.set_result(text)
+    finally:
+        _inflight.pop((guild_id, key), None)
+
+    if text:
+        await _cache_put(guild_id, key, prompt, text)
+    return text, "gpt"
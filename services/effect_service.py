@@ -1,33 +1,47 @@
 import json
 import re
+import threading
 from typing import Dict, List, Optional, Tuple
-from utils.db import execute, fetchone, fetchall
+from utils.db import execute, executemany, fetchone, fetchall, offload, ensure_schema, transaction, on_invalidate
 
 # ===============================
 # Konfigurasi & Mode Efek
 # ===============================
 DEFAULT_STACK_MAX = 3  # untuk efek "stack" jika tidak ditentukan
 
+# ===============================
+# Cache Library Efek (per guild)
+# ===============================
+# {guild_id: {name: row}} — dimuat sekali dengan satu query, dibuang saat library berubah
+_lib_cache: Dict[int, Dict[str, Dict]] = {}
+_lib_lock = threading.Lock()
+
+def _library(guild_id: int) -> Dict[str, Dict]:
+    gid = int(guild_id)
+    lib = _lib_cache.get(gid)
+    if lib is None:
+        ensure_effects_table(gid)
+        rows = fetchall(gid, "SELECT * FROM effects ORDER BY name ASC")
+        lib = {r["name"]: r for r in rows}
+        with _lib_lock:
+            _lib_cache[gid] = lib
+    return lib
+
+@on_invalidate
+def invalidate_library(guild_id: Optional[int] = None) -> None:
+    """Buang cache library efek (satu guild, atau semua kalau None)."""
+    with _lib_lock:
+        if guild_id is None:
+            _lib_cache.clear()
+        else:
+            _lib_cache.pop(int(guild_id), None)
+
 # ===============================
 # Bootstrap Tabel Library Efek
 # ===============================
 def ensure_effects_table(guild_id: int):
-    execute(guild_id, """
-    CREATE TABLE IF NOT EXISTS effects (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        guild_id INTEGER NOT NULL,
-        name TEXT NOT NULL,
-        type TEXT,
-        target_stat TEXT,
-        formula TEXT,
-        duration INTEGER DEFAULT 0,
-        stack_mode TEXT DEFAULT 'add',
-        description TEXT,
-        max_stack INTEGER DEFAULT 3,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE(guild_id, name)
-    );
-    """)
+    # Tabel effects dibuat oleh migrasi skema; ini cuma cek versi (no-op kalau sudah terbaru)
+    ensure_schema(guild_id)
 
 def add_effect_lib(
     guild_id: int,
@@ -52,14 +66,14 @@ def add_effect_lib(
         """,
         (guild_id, name.lower(), e_type, target_stat, formula, int(duration), stack_mode, int(max_stack), description),
     )
+    invalidate_library(guild_id)
 
 def get_effect_lib(guild_id: int, name: str) -> Optional[Dict]:
-    ensure_effects_table(guild_id)
-    return fetchone(guild_id, "SELECT * FROM effects WHERE name=?", (name.lower(),))
+    row = _library(guild_id).get((name or "").lower())
+    return dict(row) if row else None
 
 def list_effects_lib(guild_id: int) -> List[Dict]:
-    ensure_effects_table(guild_id)
-    return fetchall(guild_id, "SELECT * FROM effects WHERE guild_id=? ORDER BY name ASC", (guild_id,))
+    return [dict(r) for r in _library(guild_id).values() if r.get("guild_id") == guild_id]
 
 def remove_effect_lib(guild_id: int, name: str) -> bool:
     ensure_effects_table(guild_id)
@@ -67,74 +81,139 @@ def remove_effect_lib(guild_id: int, name: str) -> bool:
     if not row:
         return False
     execute(guild_id, "DELETE FROM effects WHERE id=?", (row["id"],))
+    invalidate_library(guild_id)
     return True
 
 # ===============================
 # Helpers
 # ===============================
+# Satu query: tabel utama (kolom name UNIQUE) lalu index companion JSON (companion_names)
+_RESOLVE_SQL = """
+    SELECT 'characters' AS tbl, id, 0 AS prio FROM characters WHERE name = ?
+    UNION ALL SELECT 'enemies', id, 1 FROM enemies WHERE name = ?
+    UNION ALL SELECT 'allies', id, 2 FROM allies WHERE name = ?
+    UNION ALL SELECT 'companions', id, 3 FROM companions WHERE name = ?
+    UNION ALL SELECT 'companion_json', owner_id, 4 FROM companion_names WHERE name_key = lower(?)
+    ORDER BY prio LIMIT 1
+"""
+
+def resolve_target(guild_id: int, name: str) -> Optional[Tuple[str, int]]:
+    """Nama → (tabel, id). Untuk companion_json, id = id karakter pemilik."""
+    ensure_schema(guild_id)
+    hit = fetchone(guild_id, _RESOLVE_SQL, (name,) * 5)
+    if not hit:
+        return None
+    return hit["tbl"], hit["id"]
+
 def _find_target(guild_id: int, name: str) -> Optional[Tuple[str, Dict]]:
     """
     Cari target berdasarkan nama di semua tabel yang bisa kena efek:
     characters, enemies, allies, companions (tabel),
     serta companion JSON di dalam tabel characters.
     """
-    # 1️⃣ Cek tabel utama
-    for table in ["characters", "enemies", "allies", "companions"]:
-        row = fetchone(guild_id, f"SELECT * FROM {table} WHERE name=?", (name,))
-        if row:
-            return table, row
-
-    # 2️⃣ Cek companions JSON di dalam karakter
-    chars = fetchall(guild_id, "SELECT id, name, companions FROM characters")
-    for ch in chars:
-        try:
-            comps = json.loads(ch.get("companions") or "[]")
-            for comp in comps:
-                if comp.get("name", "").lower() == name.lower():
-                    comp["_owner_id"] = ch["id"]
-                    comp["_owner_name"] = ch["name"]
-                    return "companion_json", comp
-        except Exception:
-            continue
-    return None
-
-
-def _load_effects(row: Dict) -> List[Dict]:
+    hit = resolve_target(guild_id, name)
+    if not hit:
+        return None
+    table, row_id = hit
+
+    if table != "companion_json":
+        row = fetchone(guild_id, f"SELECT * FROM {table} WHERE id=?", (row_id,))
+        return (table, row) if row else None
+
+    # Companion JSON: ambil dari karakter pemiliknya saja
+    ch = fetchone(guild_id, "SELECT id, name, companions FROM characters WHERE id=?", (row_id,))
+    if not ch:
+        return None
     try:
-        return json.loads(row.get("effects") or "[]")
+        comps = json.loads(ch.get("companions") or "[]")
     except Exception:
-        return []
+        return None
+    for comp in comps:
+        if isinstance(comp, dict) and comp.get("name", "").lower() == name.lower():
+            comp["_owner_id"] = ch["id"]
+            comp["_owner_name"] = ch["name"]
+            return "companion_json", comp
+    return None
 
 
-def _save_effects(guild_id: int, table: str, row_id: int, effects: List[Dict]) -> None:
-    """
-    Simpan efek tergantung targetnya:
-    - Tabel biasa (characters/enemies/allies/companions)
-    - Companion JSON (dalam kolom characters.companions)
-    """
+# ===============================
+# Active Effects (tabel active_effects)
+# ===============================
+# entity_type = nama tabel target; companion JSON → entity_id = id karakter pemilik + comp_name
+_EFFECT_COLS = ("text", "type", "stack", "mode", "duration", "formula", "target_stat", "description")
+_TICK_BUCKET = {"characters": "char", "enemies": "enemy", "allies": "ally",
+                "companions": "companion", "companion_json": "companion"}
+
+def _effect_from_row(r: Dict) -> Dict:
+    """Row active_effects → dict efek (format sama seperti JSON lama)."""
+    e = {"id": r["effect_id"]}
+    for col in _EFFECT_COLS:
+        e[col] = r[col]
+    e["_aid"] = r["id"]
+    return e
+
+def _entity_key(table: str, row: Dict) -> Tuple[str, int, str]:
     if table == "companion_json":
-        owner_id = row_id
-        owner_row = fetchone(guild_id, "SELECT * FROM characters WHERE id=?", (owner_id,))
-        if not owner_row:
-            return
+        return table, row["_owner_id"], row.get("name", "")
+    return table, row["id"], ""
 
-        comps = json.loads(owner_row.get("companions") or "[]")
-        for c in comps:
-            if c.get("name", "").lower() == effects[0].get("id", "").lower():
-                c["effects"] = effects
-
-        execute(
+def _load_effects(guild_id: int, table: str, row: Dict) -> List[Dict]:
+    etype, eid, comp = _entity_key(table, row)
+    rows = fetchall(
+        guild_id,
+        "SELECT * FROM active_effects WHERE entity_type=? AND entity_id=? AND lower(comp_name)=lower(?) ORDER BY id",
+        (etype, eid, comp),
+    )
+    return [_effect_from_row(r) for r in rows]
+
+def attach_effects(guild_id: int, table: str, rows: List[Dict]) -> List[Dict]:
+    """Isi row["effects"] (list) untuk banyak entity sekaligus dengan satu query."""
+    rows = [r for r in rows if r]
+    by_id = {r["id"]: [] for r in rows}
+    if by_id:
+        ph = ",".join("?" * len(by_id))
+        for r in fetchall(
             guild_id,
-            "UPDATE characters SET companions=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-            (json.dumps(comps), owner_id)
-        )
+            f"SELECT * FROM active_effects WHERE entity_type=? AND entity_id IN ({ph}) ORDER BY id",
+            (table, *by_id),
+        ):
+            by_id[r["entity_id"]].append(_effect_from_row(r))
+    for r in rows:
+        r["effects"] = by_id[r["id"]]
+    return rows
+
+def companion_effects(guild_id: int, owner_name: str) -> Dict[str, List[Dict]]:
+    """Efek aktif semua companion JSON milik satu karakter → {nama_lower: [efek]}."""
+    rows = fetchall(
+        guild_id,
+        """
+        SELECT ae.* FROM active_effects ae
+        JOIN characters c ON c.id = ae.entity_id
+        WHERE ae.entity_type='companion_json' AND c.name=?
+        ORDER BY ae.id
+        """,
+        (owner_name,),
+    )
+    out: Dict[str, List[Dict]] = {}
+    for r in rows:
+        out.setdefault((r["comp_name"] or "").lower(), []).append(_effect_from_row(r))
+    return out
 
-    else:
-        execute(
-            guild_id,
-            f"UPDATE {table} SET effects=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-            (json.dumps(effects), row_id),
-        )
+def _insert_effect(guild_id: int, key: Tuple[str, int, str], inst: Dict) -> None:
+    execute(
+        guild_id,
+        """
+        INSERT INTO active_effects (entity_type, entity_id, comp_name, effect_id, text, type,
+                                    stack, mode, duration, formula, target_stat, description)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+        """,
+        (*key, inst["id"], *(inst[c] for c in _EFFECT_COLS)),
+    )
+
+def _update_effect(guild_id: int, aid: int, inst: Dict) -> None:
+    sets = ", ".join(f"{c}=?" for c in _EFFECT_COLS)
+    execute(guild_id, f"UPDATE active_effects SET {sets} WHERE id=?",
+            (*(inst[c] for c in _EFFECT_COLS), aid))
 
 
 def _pretty_name(name: str) -> str:
@@ -154,12 +233,14 @@ def update_effect_field(guild_id: int, name: str, field: str, value: str):
     if not row:
         return False
     execute(guild_id, f"UPDATE effects SET {field}=? WHERE name=?", (value, name))
+    invalidate_library(guild_id)
     return True
 
 # ===============================
 # APPLY / CLEAR / QUERY
 # ===============================
-async def apply_effect(guild_id: int, target_name: str, effect_name: str, override_duration: Optional[str] = None):
+@offload
+def apply_effect(guild_id: int, target_name: str, effect_name: str, override_duration: Optional[str] = None):
     found = _find_target(guild_id, target_name)
     if not found:
         return False, f"❌ Target **{target_name}** tidak ditemukan."
@@ -168,7 +249,8 @@ async def apply_effect(guild_id: int, target_name: str, effect_name: str, overri
     if not lib:
         return False, f"❌ Efek **{effect_name}** tidak ada di library."
 
-    effects = _load_effects(row)
+    key = _entity_key(table, row)
+    effects = _load_effects(guild_id, table, row)
     mode = (lib.get("stack_mode") or "unique").lower()
     max_stack = int(lib.get("max_stack") or (DEFAULT_STACK_MAX if mode == "stack" else 1))
 
@@ -186,7 +268,7 @@ async def apply_effect(guild_id: int, target_name: str, effect_name: str, overri
             duration = int(override_duration)
     base_duration = duration
 
-    existing_idx = next((i for i, e in enumerate(effects) if _match_effect_instance(e, lib["name"])), None)
+    existing = next((e for e in effects if _match_effect_instance(e, lib["name"])), None)
     display = _pretty_name(lib["name"])
     e_type = lib["type"] or "debuff"
 
@@ -205,38 +287,33 @@ async def apply_effect(guild_id: int, target_name: str, effect_name: str, overri
 
     # Multi-instance
     if mode == "multi-instance":
-        effects.append(_make_inst())
-        _save_effects(guild_id, table, row.get("id") or row.get("_owner_id"), effects)
+        _insert_effect(guild_id, key, _make_inst())
         return True, f"☠️ {target_name} mendapat **{display}** ({base_duration} turn)."
 
     # Refresh
     if mode == "refresh":
-        if existing_idx is None:
-            effects.append(_make_inst())
+        if existing is None:
+            _insert_effect(guild_id, key, _make_inst())
         else:
-            effects[existing_idx]["duration"] = base_duration
-            effects[existing_idx]["formula"] = formula
-        _save_effects(guild_id, table, row.get("id") or row.get("_owner_id"), effects)
+            execute(guild_id, "UPDATE active_effects SET duration=?, formula=? WHERE id=?",
+                    (base_duration, formula, existing["_aid"]))
         return True, f"🔁 {target_name}: **{display}** di-refresh ({base_duration} turn)."
 
     # Stack
     if mode == "stack":
-        if existing_idx is None:
-            effects.append(_make_inst(1))
+        if existing is None:
+            _insert_effect(guild_id, key, _make_inst(1))
             msg = f"📈 {target_name} mendapat **{display} Lv1** ({base_duration} turn)."
         else:
-            cur = effects[existing_idx]
-            new_stack = min(int(cur.get("stack", 1)) + 1, max_stack)
-            cur.update(_make_inst(new_stack))
+            new_stack = min(int(existing.get("stack") or 1) + 1, max_stack)
+            _update_effect(guild_id, existing["_aid"], _make_inst(new_stack))
             msg = f"📈 {target_name}: **{display}** naik ke **Lv{new_stack}** ({base_duration} turn)."
-        _save_effects(guild_id, table, row.get("id") or row.get("_owner_id"), effects)
         return True, msg
 
     # Unique
-    if existing_idx is not None:
+    if existing is not None:
         return True, f"ℹ️ {target_name} sudah memiliki **{display}** (unique)."
-    effects.append(_make_inst())
-    _save_effects(guild_id, table, row.get("id") or row.get("_owner_id"), effects)
+    _insert_effect(guild_id, key, _make_inst())
     return True, f"✅ {target_name} mendapat **{display}** ({base_duration} turn)."
 
 def get_active_effects(guild_id: int, target_name: str):
@@ -244,7 +321,7 @@ def get_active_effects(guild_id: int, target_name: str):
     if not found:
         return False, f"❌ Target **{target_name}** tidak ditemukan.", []
     table, row = found
-    return True, table, _load_effects(row)
+    return True, table, _load_effects(guild_id, table, row)
 
 # ===============================
 # TICK (manual-GM mode)
@@ -256,44 +333,66 @@ def _format_eff_line(e: Dict, guild_id: int) -> str:
     stack = e.get("stack", 1)
     stack_txt = f" Lv{stack}" if stack > 1 else ""
 
-    # Ambil deskripsi langsung dari DB
+    # Deskripsi fallback dari cache library (tanpa query)
     desc = e.get("description", "")
     if not desc and e.get("id"):
-        row = fetchone(guild_id, "SELECT description FROM effects WHERE name=?", (e["id"].lower(),))
+        row = _library(guild_id).get(e["id"].lower())
         if row and row.get("description"):
             desc = row["description"]
 
     return f"🔹 **{e.get('text','')}**{stack_txt} — {form} *(sisa {dur_txt} turn)*\n🛈 {desc or '(tidak ada deskripsi)'}"
 
-async def tick_effects(guild_id: int) -> Dict:
+def _entity_names(tx, rows: List[Dict]) -> Dict[Tuple[str, int, str], str]:
+    """(entity_type, entity_id, comp_name) → nama tampilan, satu query per tabel."""
+    ids: Dict[str, set] = {}
+    for r in rows:
+        if r["entity_type"] != "companion_json":
+            ids.setdefault(r["entity_type"], set()).add(r["entity_id"])
+    names = {}
+    for table, id_set in ids.items():
+        ph = ",".join("?" * len(id_set))
+        for n in tx.fetchall(f"SELECT id, name FROM {table} WHERE id IN ({ph})", tuple(id_set)):
+            names[(table, n["id"], "")] = n["name"]
+    for r in rows:
+        if r["entity_type"] == "companion_json":
+            names[("companion_json", r["entity_id"], r["comp_name"])] = r["comp_name"]
+    return names
+
+@offload
+def tick_effects(guild_id: int) -> Dict:
+    """
+    Kurangi durasi semua efek aktif satu ronde, langsung di SQL:
+    yang sisa 1 turn dihapus, sisanya duration-1. Efek permanen (-1) tidak disentuh.
+    """
     results = {"char": {}, "enemy": {}, "ally": {}, "companion": {}}
-    for ttype, table in [("char","characters"),("enemy","enemies"),("ally","allies"),("companion","companions")]:
-        rows = fetchall(guild_id, f"SELECT * FROM {table}")
-        for r in rows:
-            name = r["name"]
-            effs = _load_effects(r)
-            remain, expired = [], []
-            for e in effs:
-                d = int(e.get("duration", -1))
-                if d == -1:
-                    remain.append(e)
-                elif d > 1:
-                    e["duration"] = d - 1
-                    remain.append(e)
-                else:
-                    expired.append(e)
-            _save_effects(guild_id, table, r["id"], remain)
-            if expired:
-                for e in expired:
-                    execute(guild_id, "INSERT INTO timeline (event) VALUES (?)",
-                            (f"⌛ {name} kehilangan efek: {e.get('text','')}",))
-            results[ttype][name] = {"active": remain, "expired": expired}
+    with transaction(guild_id) as tx:
+        expired = tx.fetchall("SELECT * FROM active_effects WHERE duration <> -1 AND duration <= 1 ORDER BY id")
+        if expired:
+            tx.execute("DELETE FROM active_effects WHERE duration <> -1 AND duration <= 1")
+        tx.execute("UPDATE active_effects SET duration = duration - 1 WHERE duration > 1")
+        active = tx.fetchall("SELECT * FROM active_effects ORDER BY id")
+
+        names = _entity_names(tx, expired + active)
+        expired_log = []
+        for rows, slot in ((active, "active"), (expired, "expired")):
+            for r in rows:
+                name = names.get((r["entity_type"], r["entity_id"], r["comp_name"] or ""))
+                if not name:
+                    continue  # entity sudah tidak ada
+                bucket = results[_TICK_BUCKET.get(r["entity_type"], "companion")]
+                bucket.setdefault(name, {"active": [], "expired": []})[slot].append(_effect_from_row(r))
+                if slot == "expired":
+                    expired_log.append((f"⌛ {name} kehilangan efek: {r['text'] or ''}",))
+        if expired_log:
+            tx.executemany("INSERT INTO timeline (event) VALUES (?)", expired_log)
+    _library(guild_id)  # panaskan cache di thread worker → build_tick_embed murni dari memori
     return results
 
 # ===============================
 # CLEAR EFFECTS (Manual GM / Status)
 # ===============================
-async def clear_effects(guild_id: int, target_name: str, is_buff: Optional[bool] = None) -> Tuple[bool, str]:
+@offload
+def clear_effects(guild_id: int, target_name: str, is_buff: Optional[bool] = None) -> Tuple[bool, str]:
     """
     Hapus efek dari target.
     - is_buff = True → hanya buff
@@ -305,27 +404,25 @@ async def clear_effects(guild_id: int, target_name: str, is_buff: Optional[bool]
         return False, f"❌ Target **{target_name}** tidak ditemukan."
 
     table, row = found
-    effects = _load_effects(row)
+    etype, eid, comp = _entity_key(table, row)
+    effects = _load_effects(guild_id, table, row)
     if not effects:
         return True, f"ℹ️ {target_name} tidak memiliki efek aktif."
 
     # === Filter sesuai flag ===
     if is_buff is None:
-        effects = []
+        drop = effects
         msg = f"🧹 Semua efek dihapus dari **{target_name}**."
     else:
         typ = "buff" if is_buff else "debuff"
-        before = len(effects)
-        effects = [e for e in effects if e.get("type", "").lower() != typ]
-        removed = before - len(effects)
-        if removed == 0:
-            msg = f"ℹ️ Tidak ada {typ} pada {target_name}."
-        else:
-            icon = "✨" if is_buff else "☠️"
-            msg = f"{icon} {removed} {typ} dihapus dari **{target_name}**."
-
-    # === Simpan hasil baru ===
-    _save_effects(guild_id, table, row.get("id") or row.get("_owner_id"), effects)
+        drop = [e for e in effects if (e.get("type") or "").lower() == typ]
+        if not drop:
+            return True, f"ℹ️ Tidak ada {typ} pada {target_name}."
+        icon = "✨" if is_buff else "☠️"
+        msg = f"{icon} {len(drop)} {typ} dihapus dari **{target_name}**."
+
+    # === Hapus baris efeknya ===
+    executemany(guild_id, "DELETE FROM active_effects WHERE id=?", [(e["_aid"],) for e in drop])
     return True, msg
 
 # ===============================
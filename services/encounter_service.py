@@ -0,0 +1,290 @@
+# services/encounter_service.py
+import os
+import json
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.db import fetchall, fetchone, transaction, get_db_path, run
+
+logger = logging.getLogger("encounter")
+
+# ===============================
+# Konfigurasi
+# ===============================
+FLUSH_INTERVAL = float(os.getenv("ENCOUNTER_FLUSH_INTERVAL", "2"))      # detik antar flush ke SQLite
+JOURNAL_FSYNC = os.getenv("ENCOUNTER_JOURNAL_FSYNC", "0") == "1"        # fsync tiap entry (tahan mati listrik)
+
+# Companion tidak ikut: vitalnya ada di JSON characters.companions (bukan kolom vital) dan
+# diubah cog companion dengan satu tulis per aksi → tetap lewat jalur DB biasa.
+TABLES = ("characters", "enemies", "allies")
+VITALS = ("hp", "hp_max", "energy", "energy_max", "stamina", "stamina_max")
+
+# ===============================
+# State encounter (per guild, in-memory)
+# ===============================
+# Selama encounter aktif, vital peserta dipegang di memori:
+#   mutasi → update record + antri (pending & buffer journal), tanpa I/O di caller
+#   journal→ buffer ditulis ke JSONL oleh thread journal (urut, di luar event loop)
+#   flush  → semua antrian jadi satu transaksi (executemany), journal dipotong
+# Kalau proses mati sebelum flush, recover() memutar ulang journal saat guild di-init.
+class Encounter:
+    def __init__(self, guild_id: int, records: Dict[Tuple[str, str], Dict], path: str):
+        self.guild_id = guild_id
+        self.records = records          # {(tabel, nama): {"id", "name", hp, ...}}
+        self.pending: List[Dict] = []   # entry yang belum masuk DB
+        self.buffer: List[Dict] = []    # entry yang belum tertulis di journal
+        self.drain_scheduled = False
+        self.closed = False
+        self.lock = threading.Lock()          # jaga records/pending/buffer (tanpa I/O di dalamnya)
+        self.journal_lock = threading.Lock()  # jaga file journal (tulis / rewrite / close)
+        self.flush_lock = threading.Lock()    # flush berurutan
+        self.path = path
+        self.journal = open(path, "a", encoding="utf-8")
+        self.task: Optional[asyncio.Task] = None
+
+_active: Dict[int, Encounter] = {}
+# Satu thread untuk semua tulisan journal → urutan entry terjaga, event loop tidak menunggu disk
+_journal_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="narator-journal")
+
+def journal_path(guild_id: int) -> str:
+    return os.path.join(os.path.dirname(get_db_path(guild_id)), f"encounter_{int(guild_id)}.jsonl")
+
+def is_active(guild_id: int) -> bool:
+    return int(guild_id) in _active
+
+# ===============================
+# Low-level helpers
+# ===============================
+def _load_record(guild_id: int, table: str, name: str) -> Optional[Dict]:
+    cols = ", ".join(("id", "name") + VITALS)
+    return fetchone(guild_id, f"SELECT {cols} FROM {table} WHERE name=?", (name,))
+
+def _load_records(guild_id: int) -> Dict[Tuple[str, str], Dict]:
+    cols = ", ".join(("id", "name") + VITALS)
+    records = {}
+    for table in TABLES:
+        for r in fetchall(guild_id, f"SELECT {cols} FROM {table}"):
+            records[(table, r["name"])] = r
+    return records
+
+def _drain_journal(enc: Encounter) -> None:
+    """Tulis buffer journal ke file (jalan di thread journal)."""
+    with enc.journal_lock:
+        with enc.lock:
+            batch, enc.buffer = enc.buffer, []
+            enc.drain_scheduled = False
+        if not batch or enc.closed:
+            return
+        enc.journal.write("".join(json.dumps(e) + "\n" for e in batch))
+        enc.journal.flush()
+        if JOURNAL_FSYNC:
+            os.fsync(enc.journal.fileno())
+
+def _rewrite_journal(enc: Encounter) -> None:
+    """Journal diganti isinya dengan entry yang masih pending (atomic via os.replace)."""
+    with enc.journal_lock:
+        with enc.lock:
+            # semua isi buffer juga ada di pending → ikut tertulis di sini
+            entries, enc.buffer = list(enc.pending), []
+        if enc.closed:
+            return
+        tmp = enc.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        enc.journal.close()
+        os.replace(tmp, enc.path)
+        enc.journal = open(enc.path, "a", encoding="utf-8")
+
+def _apply_entries(guild_id: int, entries: List[Dict]) -> None:
+    """Tulis entry journal ke DB: vital per entity dipadatkan (nilai terakhir menang), satu transaksi."""
+    sets: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    history, timeline = [], []
+    for e in entries:
+        if e.get("t") not in TABLES:
+            continue
+        changes = {k: v for k, v in (e.get("set") or {}).items() if k in VITALS}
+        if changes:
+            sets.setdefault((e["t"], int(e["id"])), {}).update(changes)
+        if e.get("h"):
+            history.append(tuple(e["h"]))
+        if e.get("tl"):
+            timeline.append((e["tl"],))
+
+    grouped: Dict[Tuple[str, Tuple[str, ...]], List[tuple]] = {}
+    for (table, row_id), changes in sets.items():
+        cols = tuple(sorted(changes))
+        grouped.setdefault((table, cols), []).append((*(changes[c] for c in cols), row_id))
+
+    with transaction(guild_id) as tx:
+        for (table, cols), params in grouped.items():
+            assign = ", ".join(f"{c}=?" for c in cols)
+            tx.executemany(f"UPDATE {table} SET {assign}, updated_at=CURRENT_TIMESTAMP WHERE id=?", params)
+        if history:
+            tx.executemany("INSERT INTO history (action, data) VALUES (?,?)", history)
+        if timeline:
+            tx.executemany("INSERT INTO timeline (event) VALUES (?)", timeline)
+
+# ===============================
+# Mutasi & baca (dipanggil status_service / cogs)
+# ===============================
+def mutate(guild_id: int, table: str, name: str, plan: Callable, *args) -> Tuple[bool, Any]:
+    """
+    Jalankan plan(record, *args) → (hasil, perubahan, history, timeline) di memori.
+    Return (False, None) kalau tidak ada encounter / entity tidak ikut → caller pakai jalur DB.
+    """
+    enc = _active.get(int(guild_id))
+    if not enc:
+        return False, None
+    with enc.lock:
+        rec = enc.records.get((table, name))
+        if rec is None:
+            return False, None
+        result, changes, history, timeline = plan(rec, *args)
+        rec.update(changes)
+        entry = {"t": table, "id": rec["id"], "set": changes, "h": history, "tl": timeline}
+        enc.pending.append(entry)
+        enc.buffer.append(entry)
+        schedule = not enc.drain_scheduled
+        enc.drain_scheduled = True
+    if schedule:
+        _journal_executor.submit(_drain_journal, enc)
+    return True, result
+
+def overlay(guild_id: int, table: str, rows: List[Dict]) -> List[Dict]:
+    """Timpa kolom vital di row hasil query dengan nilai terbaru dari memori."""
+    enc = _active.get(int(guild_id))
+    if not enc:
+        return rows
+    with enc.lock:
+        for r in rows:
+            rec = r and enc.records.get((table, r.get("name")))
+            if rec and rec["id"] == r.get("id"):
+                r.update({k: rec[k] for k in VITALS if k in r})
+    return rows
+
+def track(guild_id: int, table: str, name: str) -> bool:
+    """Masukkan (atau muat ulang) satu entity ke encounter aktif, mis. enemy yang baru di-add."""
+    enc = _active.get(int(guild_id))
+    if not enc:
+        return False
+    row = _load_record(guild_id, table, name)
+    if not row:
+        return False
+    with enc.lock:
+        enc.records[(table, name)] = row
+    return True
+
+def drop(guild_id: int, table: str, name: Optional[str] = None) -> None:
+    """
+    Flush lalu lepas entity dari memori (sebelum row-nya ditulis langsung / dihapus dari DB).
+    name=None → semua entity tabel itu (mis. `!enemy clear`).
+    """
+    enc = _active.get(int(guild_id))
+    if not enc:
+        return
+    flush(guild_id)
+    with enc.lock:
+        for key in [k for k in enc.records if k[0] == table and (name is None or k[1] == name)]:
+            del enc.records[key]
+
+# ===============================
+# Flush / Recover
+# ===============================
+def flush(guild_id: int) -> int:
+    """Tulis semua mutasi pending ke SQLite (satu transaksi). Return jumlah entry."""
+    enc = _active.get(int(guild_id))
+    if not enc:
+        return 0
+    with enc.flush_lock:
+        with enc.lock:
+            entries, enc.pending = enc.pending, []
+        if not entries:
+            return 0
+        try:
+            _apply_entries(enc.guild_id, entries)
+        except Exception:
+            with enc.lock:
+                enc.pending[:0] = entries   # coba lagi di flush berikutnya; journal masih utuh
+            raise
+        _rewrite_journal(enc)
+    return len(entries)
+
+def flush_all() -> None:
+    """Flush semua encounter aktif (dipanggil saat bot shutdown)."""
+    for gid in list(_active):
+        try:
+            flush(gid)
+        except Exception as e:
+            logger.error(f"❌ Gagal flush encounter guild {gid}: {e}")
+
+def recover(guild_id: int) -> int:
+    """Putar ulang journal sisa crash ke DB. Return jumlah entry yang dipulihkan."""
+    gid = int(guild_id)
+    path = journal_path(gid)
+    if gid in _active or not os.path.exists(path):
+        return 0
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # baris terakhir bisa terpotong saat crash
+    if entries:
+        _apply_entries(gid, entries)
+        logger.info(f"🩹 {len(entries)} mutasi encounter dipulihkan dari journal (guild {gid})")
+    os.remove(path)
+    return len(entries)
+
+# ===============================
+# Lifecycle (async, dipanggil dari cog)
+# ===============================
+async def _flush_loop(guild_id: int) -> None:
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        try:
+            await run(guild_id, flush, guild_id)
+        except Exception as e:
+            logger.error(f"❌ Flush encounter guild {guild_id} gagal: {e}")
+
+async def start(guild_id: int) -> int:
+    """Mulai encounter: muat vital semua characters/enemies/allies ke memori. Return jumlah peserta."""
+    gid = int(guild_id)
+    if gid not in _active:
+        await run(gid, recover, gid)
+        records = await run(gid, _load_records, gid)
+        if gid not in _active:
+            enc = Encounter(gid, records, journal_path(gid))
+            _active[gid] = enc
+            enc.task = asyncio.create_task(_flush_loop(gid))
+    return len(_active[gid].records)
+
+def _close(guild_id: int) -> None:
+    enc = _active.get(guild_id)
+    if not enc:
+        return
+    flush(guild_id)
+    _active.pop(guild_id, None)
+    with enc.journal_lock:
+        enc.closed = True
+        enc.journal.close()
+    try:
+        os.remove(enc.path)
+    except FileNotFoundError:
+        pass
+
+async def end(guild_id: int) -> None:
+    """Akhiri encounter: flush terakhir, hapus journal, kembali ke jalur DB biasa."""
+    gid = int(guild_id)
+    enc = _active.get(gid)
+    if not enc:
+        return
+    if enc.task:
+        enc.task.cancel()
+    await run(gid, _close, gid)
@@ -1,5 +1,5 @@
 import json
-from utils.db import fetchone, execute
+from utils.db import fetchone, execute, transaction
 from services import inventory_service, item_service
 from cogs.world.timeline import log_event
 
@@ -81,10 +81,12 @@ def equip_item(guild_id: int, char: str, slot: str, item_name: str, user_id="0")
 
         eq.setdefault("mods", [])
         eq["mods"].append(found["item"])
-        _update_equipment(guild_id, char, eq)
-
-        inventory_service.remove_item(guild_id, char, found["item"], 1, user_id=user_id)
-        inventory_service.calc_carry(guild_id, char)
+        with transaction(guild_id) as tx:
+            # remove_item sudah mengurangi carry; mod terpasang tidak dihitung beratnya
+            if not inventory_service.remove_item(guild_id, char, found["item"], 1, user_id=user_id):
+                tx.rollback()
+                return False, f"❌ {char} tidak punya \"{item_name}\" di inventory."
+            _update_equipment(guild_id, char, eq)
 
         log_event(
             guild_id, user_id,
@@ -118,14 +120,20 @@ def equip_item(guild_id: int, char: str, slot: str, item_name: str, user_id="0")
     if carry_capacity > 0 and carry_used + weight > carry_capacity:
         return False, f"❌ {char} tidak sanggup equip {item_name} (melebihi kapasitas)."
 
-    if eq.get(slot):
-        inventory_service.add_item(guild_id, char, eq[slot], 1, user_id=user_id)
-
+    old = eq.get(slot)
     eq[slot] = found["item"]
-    _update_equipment(guild_id, char, eq)
-
-    inventory_service.remove_item(guild_id, char, found["item"], 1, user_id=user_id)
-    inventory_service.calc_carry(guild_id, char)
+    with transaction(guild_id) as tx:
+        if not inventory_service.remove_item(guild_id, char, found["item"], 1, user_id=user_id):
+            tx.rollback()
+            return False, f"❌ {char} tidak punya \"{item_name}\" di inventory."
+        _update_equipment(guild_id, char, eq)
+        # remove/add inventory sudah menggeser carry; sisanya selisih berat slot equipment
+        inventory_service.adjust_carry(
+            guild_id, char, weight - (inventory_service.equipped_weight(guild_id, old) if old else 0.0))
+        # item lama baru masuk inventory setelah beratnya dilepas dari slot
+        if old and not inventory_service.add_item(guild_id, char, old, 1, user_id=user_id):
+            tx.rollback()
+            return False, f"❌ {char} tidak sanggup menyimpan {old} ke inventory (melebihi kapasitas)."
 
     log_event(
         guild_id,
@@ -142,7 +150,7 @@ def equip_item(guild_id: int, char: str, slot: str, item_name: str, user_id="0")
 
 
 def unequip_item(guild_id: int, char: str, slot: str, user_id="0"):
-    """Unequip item dari slot ke inventory karakter (boleh overload)."""
+    """Unequip item dari slot ke inventory karakter (ditolak kalau inventory jadi overload)."""
     slot = (slot or "").lower()
     if slot not in SLOTS:
         return False, f"❌ Slot tidak valid. Pilih: {', '.join(SLOTS)}"
@@ -159,11 +167,14 @@ def unequip_item(guild_id: int, char: str, slot: str, user_id="0"):
         return False, f"❌ Slot {slot} kosong."
 
     item_name = eq[slot]
-    inventory_service.add_item(guild_id, char, item_name, 1, user_id=user_id)
     eq[slot] = ""
-    _update_equipment(guild_id, char, eq)
-
-    inventory_service.calc_carry(guild_id, char)
+    with transaction(guild_id) as tx:
+        # berat dari slot equipment dilepas dulu, baru add_item menambah berat inventory
+        inventory_service.adjust_carry(guild_id, char, -inventory_service.equipped_weight(guild_id, item_name))
+        if not inventory_service.add_item(guild_id, char, item_name, 1, user_id=user_id):
+            tx.rollback()
+            return False, f"❌ {char} tidak sanggup menyimpan {item_name} ke inventory (melebihi kapasitas)."
+        _update_equipment(guild_id, char, eq)
 
     log_event(
         guild_id,
@@ -196,10 +207,11 @@ def remove_mod(guild_id: int, char: str, item_name: str, user_id="0"):
 
     mods.remove(match)
     eq["mods"] = mods
-    _update_equipment(guild_id, char, eq)
-
-    inventory_service.add_item(guild_id, char, match, 1, user_id=user_id)
-    inventory_service.calc_carry(guild_id, char)
+    with transaction(guild_id) as tx:
+        if not inventory_service.add_item(guild_id, char, match, 1, user_id=user_id):
+            tx.rollback()
+            return False, f"❌ {char} tidak sanggup menyimpan mod {match} ke inventory (melebihi kapasitas)."
+        _update_equipment(guild_id, char, eq)
 
     log_event(
         guild_id, user_id,
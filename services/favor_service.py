@@ -1,5 +1,7 @@
 import json
-from utils.db import execute, fetchone, fetchall
+import threading
+from typing import Dict
+from utils.db import execute, fetchone, fetchall, offload, ensure_schema
 from cogs.world.timeline import log_event
 from services import faction_service   # supaya bisa auto-create faction
 
@@ -12,23 +14,21 @@ ICONS = {
 
 # ---------- Setup ----------
 def ensure_table(guild_id: int):
-    # Drop tabel lama (favor) kalau masih ada
-    execute(guild_id, "DROP TABLE IF EXISTS favor")
-
-    execute(guild_id, """
-        CREATE TABLE IF NOT EXISTS favors (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            guild_id INTEGER NOT NULL,
-            char_name TEXT NOT NULL,
-            faction TEXT NOT NULL,
-            favor INTEGER DEFAULT 0,
-            notes TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(guild_id, char_name, faction)
-        )
-    """)
-    execute(guild_id, "CREATE INDEX IF NOT EXISTS idx_favor_char ON favors(char_name)")
-    execute(guild_id, "CREATE INDEX IF NOT EXISTS idx_favor_faction ON favors(faction)")
+    # Tabel favors + index dibuat lewat migrasi skema (utils.db.MIGRATIONS)
+    ensure_schema(guild_id)
+
+
+# ---------- Versi (untuk cache lain, mis. render shop) ----------
+_versions: Dict[int, int] = {}
+_version_lock = threading.Lock()
+
+def favors_version(guild_id: int) -> int:
+    return _versions.get(int(guild_id), 0)
+
+def touch_favors(guild_id: int) -> None:
+    """Tandai favor guild berubah → cache yang bergantung pada favor dibuang."""
+    with _version_lock:
+        _versions[int(guild_id)] = favors_version(guild_id) + 1
 
 
 # ---------- Helper ----------
@@ -46,7 +46,8 @@ def favor_status(value: int) -> str:
 
 
 # ---------- CRUD ----------
-async def add_or_set_favor(guild_id: int, char_name: str, faction: str, value: int, notes: str = ""):
+@offload
+def add_or_set_favor(guild_id: int, char_name: str, faction: str, value: int, notes: str = ""):
     ensure_table(guild_id)
 
     if not faction_service.exists_faction(guild_id, faction):
@@ -64,6 +65,7 @@ async def add_or_set_favor(guild_id: int, char_name: str, faction: str, value: i
         """,
         (guild_id, char_name, faction, value, notes)
     )
+    touch_favors(guild_id)
     log_event(
         guild_id,
         char_name,
@@ -77,7 +79,8 @@ async def add_or_set_favor(guild_id: int, char_name: str, faction: str, value: i
     return f"{ICONS['favor']} Favor {faction} untuk **{char_name}** di-set ke `{value}`."
 
 
-async def mod_favor(guild_id: int, char_name: str, faction: str, delta: int, notes: str = ""):
+@offload
+def mod_favor(guild_id: int, char_name: str, faction: str, delta: int, notes: str = ""):
     ensure_table(guild_id)
 
     if not faction_service.exists_faction(guild_id, faction):
@@ -101,18 +104,22 @@ async def mod_favor(guild_id: int, char_name: str, faction: str, delta: int, not
         """,
         (guild_id, char_name, faction, new_value, notes, new_value)
     )
+    touch_favors(guild_id)
     return f"{ICONS['favor']} Favor {faction} untuk **{char_name}** berubah {delta:+d} → `{new_value}`."
 
 
-async def remove_favor(guild_id: int, char_name: str, faction: str):
+@offload
+def remove_favor(guild_id: int, char_name: str, faction: str):
     ensure_table(guild_id)
     execute(guild_id, "DELETE FROM favors WHERE guild_id=? AND char_name=? AND faction=?",
             (guild_id, char_name, faction))
+    touch_favors(guild_id)
     return f"{ICONS['remove']} Favor {faction} untuk **{char_name}** dihapus."
 
 
 # ---------- Query ----------
-async def list_favors(guild_id: int, char_name: str = None):
+@offload
+def list_favors(guild_id: int, char_name: str = None):
     ensure_table(guild_id)
     if char_name:
         return fetchall(guild_id, "SELECT * FROM favors WHERE guild_id=? AND char_name=?",
@@ -120,7 +127,8 @@ async def list_favors(guild_id: int, char_name: str = None):
     return fetchall(guild_id, "SELECT * FROM favors WHERE guild_id=?", (guild_id,))
 
 
-async def get_detail(guild_id: int, faction: str, char_name: str = None):
+@offload
+def get_detail(guild_id: int, faction: str, char_name: str = None):
     ensure_table(guild_id)
     if char_name:
         return fetchone(guild_id, "SELECT * FROM favors WHERE guild_id=? AND char_name=? AND faction=?",
@@ -128,12 +136,14 @@ async def get_detail(guild_id: int, faction: str, char_name: str = None):
     return fetchall(guild_id, "SELECT * FROM favors WHERE guild_id=? AND faction=?", (guild_id, faction))
 
 
-async def list_all_favors(guild_id: int):
+@offload
+def list_all_favors(guild_id: int):
     ensure_table(guild_id)
     return fetchall(guild_id, "SELECT * FROM favors WHERE guild_id=?", (guild_id,))
 
 
-async def list_factions_status(guild_id: int, char_name: str, factions: list):
+@offload
+def list_factions_status(guild_id: int, char_name: str, factions: list):
     ensure_table(guild_id)
     out = []
     for fac in factions:
@@ -146,7 +156,8 @@ async def list_factions_status(guild_id: int, char_name: str, factions: list):
 
 
 # ---------- Quest Integration ----------
-async def add_favor(guild_id: int, targets: list, faction: str, value: int):
+@offload
+def add_favor(guild_id: int, targets: list, faction: str, value: int):
     ensure_table(guild_id)
 
     if not faction_service.exists_faction(guild_id, faction):
@@ -171,5 +182,6 @@ async def add_favor(guild_id: int, targets: list, faction: str, value: int):
             (guild_id, ch, faction, new_value, new_value)
         )
         result.append(f"{ch}: {new_value}")
+    touch_favors(guild_id)
 
     return f"{ICONS['favor']} Favor {faction} ditambahkan → " + ", ".join(result)
@@ -4,7 +4,7 @@ import random
 from typing import Dict, List, Tuple, Optional
 import discord
 
-from utils.db import execute, fetchone
+from utils.db import execute, fetchone, ensure_once
 
 ICONS = {
     "order": "⚔️",
@@ -24,7 +24,7 @@ ICONS = {
 # ===============================
 # DB bootstrap
 # ===============================
-def ensure_table(guild_id: int):
+def _create_table(guild_id: int):
     execute(guild_id, """
     CREATE TABLE IF NOT EXISTS initiative (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -35,6 +35,9 @@ def ensure_table(guild_id: int):
     );
     """)
 
+def ensure_table(guild_id: int):
+    ensure_once(guild_id, "initiative", _create_table)
+    # baris state bisa dihapus initmem (!init clear), jadi tetap dicek tiap kali
     row = fetchone(guild_id, "SELECT * FROM initiative LIMIT 1")
     if not row:
         execute(guild_id,
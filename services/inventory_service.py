@@ -1,5 +1,5 @@
 import json
-from utils.db import execute, fetchone, fetchall
+from utils.db import execute, fetchone, fetchall, transaction
 from cogs.world.timeline import log_event   # pakai log_event biar konsisten
 from services import item_service
 
@@ -28,50 +28,89 @@ def _norm_owner(owner: str) -> str:
     """Owner disimpan apa adanya, tapi query selalu case-insensitive."""
     return (owner or "").strip()
 
-# ---------- Carry Calculation ----------
-def calc_carry(guild_id: int, owner: str):
-    """Hitung total weight dari inventory + equipment owner dan update ke characters.carry_used"""
-    owner = _norm_owner(owner)
-    total_weight = 0.0
+def _meta_weight(metadata) -> float:
+    """Berat per unit dari metadata inventory (dict / JSON string)."""
+    try:
+        meta = json.loads(metadata or "{}") if isinstance(metadata, str) else (metadata or {})
+        return float(meta.get("weight", 0))
+    except Exception:
+        return 0.0
 
-    # --- Inventory items (case-insens owner) ---
-    rows = fetchall(
+def equipped_weight(guild_id: int, item_name: str) -> float:
+    """Berat item yang sedang dipakai (diambil dari katalog, sama seperti calc_carry)."""
+    item = item_service.get_item(guild_id, item_name) if item_name else None
+    try:
+        return float(item.get("weight", 0)) if item else 0.0
+    except Exception:
+        return 0.0
+
+# ---------- Carry (incremental) ----------
+# carry_used disimpan & diubah lewat delta di transaksi yang sama dengan perubahan
+# inventory/equipment, jadi add/remove tidak perlu scan ulang inventory.
+# calc_carry() tetap ada untuk verifikasi / perbaikan (`!inv recalc`).
+def adjust_carry(guild_id: int, owner: str, delta: float) -> None:
+    """Tambah/kurangi carry_used karakter sebesar delta (owner bukan karakter → no-op)."""
+    if not delta:
+        return
+    execute(
         guild_id,
-        "SELECT qty, metadata FROM inventory WHERE lower(owner)=lower(?)",
-        (owner,)
+        "UPDATE characters SET carry_used=MAX(0, COALESCE(carry_used, 0) + ?), "
+        "updated_at=CURRENT_TIMESTAMP WHERE lower(name)=lower(?)",
+        (delta, _norm_owner(owner))
     )
-    for r in rows:
-        try:
-            meta = json.loads(r["metadata"] or "{}")
-            weight = float(meta.get("weight", 0))
-            total_weight += weight * (r["qty"] or 0)
-        except Exception:
-            continue
 
-    # --- Equipment items ---
-    row = fetchone(guild_id, "SELECT equipment FROM characters WHERE name=?", (owner,))
+def compute_carry(guild_id: int, owner: str) -> float:
+    """Hitung ulang total weight inventory + equipment owner dari nol (tanpa menulis)."""
+    owner = _norm_owner(owner)
+
+    # --- Inventory items (case-insens owner), dijumlah langsung di SQLite ---
+    row = fetchone(guild_id, """
+        SELECT COALESCE(SUM(COALESCE(qty, 0) * COALESCE(
+                   CASE WHEN json_valid(metadata) THEN CAST(json_extract(metadata, '$.weight') AS REAL) END, 0
+               )), 0) AS w
+        FROM inventory WHERE lower(owner)=lower(?)
+    """, (owner,))
+    total_weight = float(row["w"] or 0) if row else 0.0
+
+    # --- Equipment items (slot biasa; mod tidak dihitung) → dari cache katalog ---
+    row = fetchone(guild_id, "SELECT equipment FROM characters WHERE lower(name)=lower(?)", (owner,))
     if row and row.get("equipment"):
         try:
             eq = json.loads(row["equipment"] or "{}")
-            for _, item_name in eq.items():
-                if not item_name:
-                    continue
-                item = item_service.get_item(guild_id, item_name)
-                if item:
-                    try:
-                        total_weight += float(item.get("weight", 0))
-                    except Exception:
-                        continue
         except Exception:
-            pass
+            eq = {}
+        names = [_norm_item(v) for v in eq.values() if v and isinstance(v, str)]
+        catalog = item_service.get_items(guild_id, names) if names else {}
+        for n in names:
+            try:
+                total_weight += float((catalog.get(n) or {}).get("weight") or 0)
+            except Exception:
+                continue
+    return total_weight
 
+def calc_carry(guild_id: int, owner: str):
+    """Hitung ulang carry dari nol lalu simpan ke characters.carry_used (verifikasi / perbaikan)."""
+    owner = _norm_owner(owner)
+    total_weight = compute_carry(guild_id, owner)
     execute(
         guild_id,
-        "UPDATE characters SET carry_used=?, updated_at=CURRENT_TIMESTAMP WHERE name=?",
+        "UPDATE characters SET carry_used=?, updated_at=CURRENT_TIMESTAMP WHERE lower(name)=lower(?)",
         (total_weight, owner)
     )
     return total_weight
 
+def verify_carry(guild_id: int, owner: str, fix: bool = True):
+    """Bandingkan carry_used tersimpan dengan hitungan ulang → (tersimpan, seharusnya)."""
+    owner = _norm_owner(owner)
+    with transaction(guild_id):
+        row = fetchone(guild_id, "SELECT carry_used FROM characters WHERE lower(name)=lower(?)", (owner,))
+        stored = float(row["carry_used"] or 0) if row else 0.0
+        actual = compute_carry(guild_id, owner)
+        if fix and row and abs(stored - actual) > 1e-6:
+            execute(guild_id, "UPDATE characters SET carry_used=?, updated_at=CURRENT_TIMESTAMP WHERE lower(name)=lower(?)",
+                    (actual, owner))
+    return stored, actual
+
 # ---------- CRUD ----------
 def add_item(guild_id: int, owner, item_name, qty=1, metadata=None, user_id="0"):
     """Tambah item ke inventory (owner = karakter / 'party')."""
@@ -99,85 +138,186 @@ def add_item(guild_id: int, owner, item_name, qty=1, metadata=None, user_id="0")
         weight = 0.1
         metadata["weight"] = weight
 
-    # --- Cek kapasitas karakter (kalau ada) ---
-    char = fetchone(guild_id, "SELECT carry_capacity, carry_used FROM characters WHERE name=?", (owner,))
-    if char and (char.get("carry_capacity", 0) or 0) > 0:
-        projected = float(char.get("carry_used", 0) or 0) + (weight * qty)
-        if projected > (char["carry_capacity"] or 0):
-            return False  # overload
-
-    # --- Tambah / update inventory (case-insens di lookup) ---
-    row = fetchone(
-        guild_id,
-        "SELECT * FROM inventory WHERE lower(owner)=lower(?) AND lower(item)=lower(?)",
-        (owner, item_name)
-    )
-    if row:
-        new_qty = (row["qty"] or 0) + qty
-        execute(guild_id, "UPDATE inventory SET qty=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-                (new_qty, row["id"]))
-    else:
-        # simpan owner apa adanya, item sudah dinormalkan
-        execute(guild_id, "INSERT INTO inventory (owner, item, qty, metadata) VALUES (?,?,?,?)",
-                (owner, item_name, qty, json.dumps(metadata or {})))
-
-    # sync carry
-    calc_carry(guild_id, owner)
-
-    # history
-    execute(guild_id, "INSERT INTO history (action, data) VALUES (?,?)",
-            ("loot_add", json.dumps({"owner": owner, "item": item_name, "qty": qty})))
-
-    # timeline log_event
-    log_event(
-        guild_id,
-        user_id,
-        code="INV_ADD",
-        title=f"{ICONS['add']} {owner} mendapatkan {qty}x {item_name}",
-        details=f"Item: {item_name}, Qty: {qty}",
-        etype="inventory_add",
-        actors=[owner],
-        tags=["inventory","add"]
-    )
-    return True
+    with transaction(guild_id) as tx:
+        # baris lama mempertahankan metadata-nya → berat tersimpan itulah yang masuk carry
+        existing = tx.fetchone(
+            "SELECT metadata FROM inventory WHERE lower(owner)=lower(?) AND lower(item)=lower(?)",
+            (owner, item_name)
+        )
+        unit_weight = _meta_weight(existing["metadata"]) if existing else weight
+
+        # --- Cek kapasitas karakter (kalau ada) ---
+        char = fetchone(guild_id, "SELECT carry_capacity, carry_used FROM characters WHERE lower(name)=lower(?)", (owner,))
+        if char and (char.get("carry_capacity", 0) or 0) > 0:
+            projected = float(char.get("carry_used", 0) or 0) + (unit_weight * qty)
+            if projected > (char["carry_capacity"] or 0):
+                return False  # overload
+
+        # --- Tambah / update inventory: satu UPSERT di unique index (lower(owner), lower(item)) ---
+        # baris baru: owner apa adanya + item sudah dinormalkan; baris lama: qty ditambah
+        tx.execute("""
+            INSERT INTO inventory (owner, item, qty, metadata) VALUES (?,?,?,?)
+            ON CONFLICT(lower(owner), lower(item)) DO UPDATE
+                SET qty = COALESCE(qty, 0) + excluded.qty, updated_at = CURRENT_TIMESTAMP
+        """, (owner, item_name, qty, json.dumps(metadata or {})))
+
+        # sync carry (delta)
+        adjust_carry(guild_id, owner, unit_weight * qty)
+
+        # history
+        execute(guild_id, "INSERT INTO history (action, data) VALUES (?,?)",
+                ("loot_add", json.dumps({"owner": owner, "item": item_name, "qty": qty})))
+
+        # timeline log_event
+        log_event(
+            guild_id,
+            user_id,
+            code="INV_ADD",
+            title=f"{ICONS['add']} {owner} mendapatkan {qty}x {item_name}",
+            details=f"Item: {item_name}, Qty: {qty}",
+            etype="inventory_add",
+            actors=[owner],
+            tags=["inventory","add"]
+        )
+        return True
 
 def remove_item(guild_id: int, owner, item_name, qty=1, user_id="0"):
     """Kurangi item dari inventory."""
     owner = _norm_owner(owner)
     item_name = _norm_item(item_name)
 
-    row = fetchone(
-        guild_id,
-        "SELECT * FROM inventory WHERE lower(owner)=lower(?) AND lower(item)=lower(?)",
-        (owner, item_name)
-    )
-    if not row or (row["qty"] or 0) < qty:
-        return False
-
-    new_qty = (row["qty"] or 0) - qty
-    if new_qty > 0:
-        execute(guild_id, "UPDATE inventory SET qty=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-                (new_qty, row["id"]))
-    else:
-        execute(guild_id, "DELETE FROM inventory WHERE id=?", (row["id"],))
-
-    # sync carry
-    calc_carry(guild_id, owner)
-
-    execute(guild_id, "INSERT INTO history (action, data) VALUES (?,?)",
-            ("loot_remove", json.dumps({"owner": owner, "item": item_name, "qty": qty})))
+    with transaction(guild_id):
+        row = fetchone(
+            guild_id,
+            "SELECT * FROM inventory WHERE lower(owner)=lower(?) AND lower(item)=lower(?)",
+            (owner, item_name)
+        )
+        if not row or (row["qty"] or 0) < qty:
+            return False
+
+        new_qty = (row["qty"] or 0) - qty
+        if new_qty > 0:
+            execute(guild_id, "UPDATE inventory SET qty=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
+                    (new_qty, row["id"]))
+        else:
+            execute(guild_id, "DELETE FROM inventory WHERE id=?", (row["id"],))
+
+        # sync carry (delta)
+        adjust_carry(guild_id, owner, -_meta_weight(row["metadata"]) * qty)
+
+        execute(guild_id, "INSERT INTO history (action, data) VALUES (?,?)",
+                ("loot_remove", json.dumps({"owner": owner, "item": item_name, "qty": qty})))
+
+        log_event(
+            guild_id,
+            user_id,
+            code="INV_REMOVE",
+            title=f"{ICONS['remove']} {owner} kehilangan {qty}x {item_name}",
+            details=f"Item: {item_name}, Qty: {qty}",
+            etype="inventory_remove",
+            actors=[owner],
+            tags=["inventory","remove"]
+        )
+        return True
+
+def _catalog_metadata(guild_id: int, item_names) -> dict:
+    """Metadata default (weight/slot/rarity/effect) untuk banyak item sekaligus → {nama: meta}."""
+    names = sorted(set(item_names))
+    catalog = item_service.get_items(guild_id, names)
+    out = {}
+    for name in names:
+        item = catalog.get(name)
+        meta = {"weight": 0.1}
+        if item:
+            meta = {
+                "weight": item.get("weight", 0.1),
+                "slot": item.get("slot", None),
+                "rarity": item.get("rarity", "Common"),
+                "effect": item.get("effect", ""),
+            }
+        if _meta_weight(meta) <= 0:
+            meta["weight"] = 0.1
+        out[name] = meta
+    return out
+
+def distribute_loot(guild_id: int, loot: dict, user_id="0", reason: str = None):
+    """
+    Bagikan loot ke banyak owner sekaligus: {owner: {item: qty}}.
+    Satu fetch katalog, satu cek kapasitas per owner, satu transaksi, satu event timeline.
+    Owner yang bebannya tidak cukup untuk seluruh bagiannya dilewati (sama seperti add_item).
+    Return {"given": {owner: {item: qty}}, "rejected": {owner: {item: qty}}}.
+    """
+    # owner beda huruf besar/kecil = orang yang sama → satu bucket (nama pertama yang dipakai)
+    plan, names = {}, {}
+    for owner, items in (loot or {}).items():
+        owner = _norm_owner(owner)
+        if not owner:
+            continue
+        bucket = plan.setdefault(names.setdefault(owner.lower(), owner), {})
+        for item_name, qty in items.items():
+            qty = int(qty or 0)
+            if qty > 0:
+                key = _norm_item(item_name)
+                bucket[key] = bucket.get(key, 0) + qty
+    plan = {o: items for o, items in plan.items() if items}
+    given, rejected = {}, {}
+    if not plan:
+        return {"given": given, "rejected": rejected}
+
+    catalog = _catalog_metadata(guild_id, [i for items in plan.values() for i in items])
+    owners = list(plan)
+    marks = ",".join("?" * len(owners))
+
+    with transaction(guild_id) as tx:
+        chars = {
+            r["name"].lower(): r for r in tx.fetchall(
+                f"SELECT name, carry_capacity, carry_used FROM characters WHERE lower(name) IN ({marks})",
+                [o.lower() for o in owners]
+            )
+        }
+        # baris yang sudah ada mempertahankan metadata-nya → berat itulah yang masuk carry
+        stored = {
+            (r["o"], r["i"]): _meta_weight(r["metadata"]) for r in tx.fetchall(
+                f"SELECT lower(owner) AS o, lower(item) AS i, metadata FROM inventory WHERE lower(owner) IN ({marks})",
+                [o.lower() for o in owners]
+            )
+        }
+        for owner, items in plan.items():
+            weights = {
+                i: stored.get((owner.lower(), i.lower()), _meta_weight(catalog[i])) for i in items
+            }
+            delta = sum(weights[i] * q for i, q in items.items())
+            char = chars.get(owner.lower())
+            if char and (char.get("carry_capacity", 0) or 0) > 0:
+                if float(char.get("carry_used", 0) or 0) + delta > (char["carry_capacity"] or 0):
+                    rejected[owner] = items
+                    continue
 
-    log_event(
-        guild_id,
-        user_id,
-        code="INV_REMOVE",
-        title=f"{ICONS['remove']} {owner} kehilangan {qty}x {item_name}",
-        details=f"Item: {item_name}, Qty: {qty}",
-        etype="inventory_remove",
-        actors=[owner],
-        tags=["inventory","remove"]
-    )
-    return True
+            tx.executemany("""
+                INSERT INTO inventory (owner, item, qty, metadata) VALUES (?,?,?,?)
+                ON CONFLICT(lower(owner), lower(item)) DO UPDATE
+                    SET qty = COALESCE(qty, 0) + excluded.qty, updated_at = CURRENT_TIMESTAMP
+            """, [(owner, i, q, json.dumps(catalog[i])) for i, q in items.items()])
+            adjust_carry(guild_id, owner, delta)
+            given[owner] = items
+
+        if given:
+            tx.execute("INSERT INTO history (action, data) VALUES (?,?)",
+                       ("loot_distribute", json.dumps({"reason": reason, "loot": given})))
+            summary = "; ".join(
+                f"{owner}: " + ", ".join(f"{q}x {i}" for i, q in items.items()) for owner, items in given.items()
+            )
+            log_event(
+                guild_id,
+                user_id,
+                code="INV_LOOT",
+                title=f"{ICONS['add']} Loot dibagikan" + (f" ({reason})" if reason else ""),
+                details=summary,
+                etype="inventory_add",
+                actors=list(given),
+                tags=["inventory", "add", "loot"]
+            )
+    return {"given": given, "rejected": rejected}
 
 def get_inventory(guild_id: int, owner):
     """Ambil semua item milik karakter/party (case-insens owner)."""
@@ -195,39 +335,33 @@ def transfer_item(guild_id: int, from_owner, to_owner, item_name, qty=1, user_id
     to_owner   = _norm_owner(to_owner)
     item_name  = _norm_item(item_name)
 
-    row = fetchone(
-        guild_id,
-        "SELECT * FROM inventory WHERE lower(owner)=lower(?) AND lower(item)=lower(?)",
-        (from_owner, item_name)
-    )
-    if not row or (row["qty"] or 0) < qty:
-        return False
-
-    meta = json.loads(row["metadata"] or "{}")
-    removed = remove_item(guild_id, from_owner, item_name, qty, user_id=user_id)
-    if not removed:
-        return False
-    ok = add_item(guild_id, to_owner, item_name, qty, metadata=meta, user_id=user_id)
-
-    if not ok:
-        # rollback
-        add_item(guild_id, from_owner, item_name, qty, metadata=meta, user_id=user_id)
-        return False
-
-    # sync carry untuk kedua owner
-    calc_carry(guild_id, from_owner)
-    calc_carry(guild_id, to_owner)
-
-    log_event(
-        guild_id,
-        user_id,
-        code="INV_TRANSFER",
-        title=f"{ICONS['transfer']} {from_owner} → {to_owner}: {qty}x {item_name}",
-        details=f"Transfer {qty} {item_name} dari {from_owner} ke {to_owner}",
-        etype="inventory_transfer",
-        actors=[from_owner, to_owner],
-        tags=["inventory","transfer"]
-    )
+    with transaction(guild_id) as tx:
+        row = fetchone(
+            guild_id,
+            "SELECT * FROM inventory WHERE lower(owner)=lower(?) AND lower(item)=lower(?)",
+            (from_owner, item_name)
+        )
+        if not row or (row["qty"] or 0) < qty:
+            return False
+
+        meta = json.loads(row["metadata"] or "{}")
+        if not remove_item(guild_id, from_owner, item_name, qty, user_id=user_id):
+            return False
+        if not add_item(guild_id, to_owner, item_name, qty, metadata=meta, user_id=user_id):
+            # penerima overload → batalkan semuanya (termasuk remove di atas)
+            tx.rollback()
+            return False
+
+        log_event(
+            guild_id,
+            user_id,
+            code="INV_TRANSFER",
+            title=f"{ICONS['transfer']} {from_owner} → {to_owner}: {qty}x {item_name}",
+            details=f"Transfer {qty} {item_name} dari {from_owner} ke {to_owner}",
+            etype="inventory_transfer",
+            actors=[from_owner, to_owner],
+            tags=["inventory","transfer"]
+        )
     return True
 
 def update_metadata(guild_id: int, owner, item_name, metadata: dict, user_id="0"):
@@ -235,30 +369,32 @@ def update_metadata(guild_id: int, owner, item_name, metadata: dict, user_id="0"
     owner = _norm_owner(owner)
     item_name = _norm_item(item_name)
 
-    row = fetchone(
-        guild_id,
-        "SELECT * FROM inventory WHERE lower(owner)=lower(?) AND lower(item)=lower(?)",
-        (owner, item_name)
-    )
-    if not row:
-        return False
-
-    meta = json.loads(row["metadata"] or "{}")
-    meta.update(metadata)
-    execute(guild_id, "UPDATE inventory SET metadata=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-            (json.dumps(meta), row["id"]))
-
-    # sync carry
-    calc_carry(guild_id, owner)
-
-    log_event(
-        guild_id,
-        user_id,
-        code="INV_UPDATE",
-        title=f"{ICONS['update']} Metadata {owner}:{item_name} diperbarui",
-        details=json.dumps(metadata),
-        etype="inventory_update",
-        actors=[owner],
-        tags=["inventory","update"]
-    )
-    return True
+    with transaction(guild_id):
+        row = fetchone(
+            guild_id,
+            "SELECT * FROM inventory WHERE lower(owner)=lower(?) AND lower(item)=lower(?)",
+            (owner, item_name)
+        )
+        if not row:
+            return False
+
+        meta = json.loads(row["metadata"] or "{}")
+        old_weight = _meta_weight(meta)
+        meta.update(metadata)
+        execute(guild_id, "UPDATE inventory SET metadata=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
+                (json.dumps(meta), row["id"]))
+
+        # sync carry (delta kalau weight berubah)
+        adjust_carry(guild_id, owner, (_meta_weight(meta) - old_weight) * (row["qty"] or 0))
+
+        log_event(
+            guild_id,
+            user_id,
+            code="INV_UPDATE",
+            title=f"{ICONS['update']} Metadata {owner}:{item_name} diperbarui",
+            details=json.dumps(metadata),
+            etype="inventory_update",
+            actors=[owner],
+            tags=["inventory","update"]
+        )
+        return True
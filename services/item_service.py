@@ -1,6 +1,9 @@
 import json
 import re
-from utils.db import execute, fetchone, fetchall
+import threading
+from typing import Dict, List, Optional
+from utils.db import execute, fetchone, fetchall, ensure_once, on_invalidate
+from services import retrieval_service
 
 # ===============================
 # ITEM SERVICE (per-server) + ICONS
@@ -49,6 +52,9 @@ def ensure_table(guild_id: int):
     Table items sudah dibuat di init_db() (lebih lengkap, ada requirement).
     Fungsi ini dibiarkan untuk kompatibilitas lama, tapi sebaiknya tidak dipakai.
     """
+    ensure_once(guild_id, "items", _create_table)
+
+def _create_table(guild_id: int):
     execute(guild_id, """
         CREATE TABLE IF NOT EXISTS items (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -65,6 +71,96 @@ def ensure_table(guild_id: int):
         )
     """)
 
+# ===============================
+# Cache Katalog (per guild)
+# ===============================
+# Katalog dimuat sekali (satu query) per guild lalu dipegang di memori:
+#   by_name  : {nama ternormalisasi: row + icon}
+#   by_rarity: {rarity: [nama]},  by_type: {type lowercase: [nama]}
+# Setiap perubahan katalog menaikkan versi guild → cache lama dibuang. Versi juga
+# dipakai cache lain (mis. render shop) untuk tahu kapan data item berubah.
+class _Catalog:
+    __slots__ = ("version", "by_name", "by_rarity", "by_type")
+
+    def __init__(self, version: int, rows: List[Dict]):
+        self.version = version
+        self.by_name: Dict[str, Dict] = {}
+        self.by_rarity: Dict[str, List[str]] = {}
+        self.by_type: Dict[str, List[str]] = {}
+        for r in rows:
+            item = dict(r)
+            item["icon"] = ICONS.get((item.get("type") or "").lower(), ICONS["misc"])
+            self.by_name[item["name"]] = item
+            self.by_rarity.setdefault(item.get("rarity") or "Common", []).append(item["name"])
+            self.by_type.setdefault((item.get("type") or "misc").lower(), []).append(item["name"])
+
+_catalogs: Dict[int, _Catalog] = {}
+_versions: Dict[int, int] = {}
+_catalog_stats: Dict[int, Dict[str, int]] = {}
+_catalog_lock = threading.Lock()
+
+def catalog_version(guild_id: int) -> int:
+    return _versions.get(int(guild_id), 0)
+
+def _catalog(guild_id: int) -> _Catalog:
+    gid = int(guild_id)
+    cat = _catalogs.get(gid)
+    stats = _catalog_stats.setdefault(gid, {"hit": 0, "miss": 0})
+    if cat is not None:
+        stats["hit"] += 1
+        return cat
+    stats["miss"] += 1
+    version = catalog_version(gid)
+    cat = _Catalog(version, fetchall(gid, "SELECT * FROM items"))
+    with _catalog_lock:
+        # jangan simpan kalau katalog berubah selagi dimuat
+        if catalog_version(gid) == version:
+            _catalogs[gid] = cat
+    return cat
+
+@on_invalidate
+def invalidate_catalog(guild_id: Optional[int] = None) -> None:
+    """Buang cache katalog item (satu guild, atau semua kalau None) + naikkan versinya."""
+    with _catalog_lock:
+        gids = list(_catalogs) if guild_id is None else [int(guild_id)]
+        if guild_id is None:
+            _catalogs.clear()
+        for gid in gids:
+            _catalogs.pop(gid, None)
+            _versions[gid] = _versions.get(gid, 0) + 1
+
+def catalog_stats(guild_id: int) -> Dict[str, int]:
+    """Hit/miss cache katalog sejak bot start + ukuran katalog yang sedang di-cache."""
+    gid = int(guild_id)
+    stats = dict(_catalog_stats.get(gid, {"hit": 0, "miss": 0}))
+    cat = _catalogs.get(gid)
+    stats["items"] = len(cat.by_name) if cat else 0
+    stats["version"] = catalog_version(gid)
+    return stats
+
+def get_items(guild_id: int, names) -> Dict[str, Dict]:
+    """Banyak item sekaligus dari cache → {nama ternormalisasi: item} (yang tidak ada dilewati)."""
+    by_name = _catalog(guild_id).by_name
+    out = {}
+    for n in names:
+        norm = normalize_name(n or "")
+        if norm in by_name:
+            out[norm] = dict(by_name[norm])
+    return out
+
+def items_by(guild_id: int, rarity: str = None, type_name: str = None) -> List[Dict]:
+    """Filter katalog lewat index rarity/type (tanpa query)."""
+    cat = _catalog(guild_id)
+    if rarity and type_name:
+        names = set(cat.by_rarity.get(rarity, [])) & set(cat.by_type.get(type_name.lower(), []))
+    elif rarity:
+        names = cat.by_rarity.get(rarity, [])
+    elif type_name:
+        names = cat.by_type.get(type_name.lower(), [])
+    else:
+        names = cat.by_name
+    return [dict(cat.by_name[n]) for n in sorted(names)]
+
 # ===============================
 # CRUD Item
 # ===============================
@@ -116,6 +212,7 @@ def add_item(guild_id: int, data: dict):
         data.get("rules",""),
         data.get("requirement","")
     ))
+    invalidate_catalog(guild_id)
     return True
 
 
@@ -130,14 +227,9 @@ def update_item(guild_id: int, name: str, updates: dict):
 
 
 def get_item(guild_id: int, name: str):
-    """Ambil detail 1 item dengan ikon."""
-    norm = normalize_name(name)
-    row = fetchone(guild_id, "SELECT * FROM items WHERE name=?", (norm,))
-    if not row:
-        return None
-    item = dict(row)
-    item["icon"] = ICONS.get(item.get("type","").lower(), ICONS["misc"])
-    return item
+    """Ambil detail 1 item dengan ikon (dari cache katalog)."""
+    item = _catalog(guild_id).by_name.get(normalize_name(name or ""))
+    return dict(item) if item else None
 
 
 def list_items(guild_id: int, limit: int = 50):
@@ -145,7 +237,7 @@ def list_items(guild_id: int, limit: int = 50):
     Ambil semua item, urut per Type → Rarity → Nama (A–Z),
     dengan ikon rarity + type, dan efek + requirement di bawah nama.
     """
-    rows = fetchall(guild_id, "SELECT * FROM items", ())
+    rows = list(_catalog(guild_id).by_name.values())
     if not rows:
         return []
 
@@ -188,6 +280,7 @@ def remove_item(guild_id: int, name: str):
     """Hapus item dari katalog."""
     norm = normalize_name(name)
     execute(guild_id, "DELETE FROM items WHERE name=?", (norm,))
+    invalidate_catalog(guild_id)
     return True
 
 
@@ -196,16 +289,25 @@ def clear_items(guild_id: int) -> int:
     rows = fetchone(guild_id, "SELECT COUNT(*) as c FROM items")
     count = rows["c"] if rows else 0
     execute(guild_id, "DELETE FROM items")
+    invalidate_catalog(guild_id)
     return count
 
 
 def search_items(guild_id: int, keyword: str, limit: int = 20):
-    """Cari item by keyword (nama/tipe/efek) + ikon."""
-    rows = fetchall(
-        guild_id,
-        "SELECT * FROM items WHERE name LIKE ? OR type LIKE ? OR effect LIKE ? LIMIT ?",
-        (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", limit)
-    )
+    """Cari item by keyword (index FTS campaign_fts, fallback LIKE) + ikon."""
+    refs = retrieval_service.search.sync(guild_id, keyword, sources=("item",), limit=limit)
+    if refs is None:
+        rows = fetchall(
+            guild_id,
+            "SELECT * FROM items WHERE name LIKE ? OR type LIKE ? OR effect LIKE ? LIMIT ?",
+            (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", limit)
+        )
+    elif refs:
+        by_id = {r["id"]: r for r in fetchall(
+            guild_id, f"SELECT * FROM items WHERE id IN ({','.join('?' * len(refs))})", [r["ref"] for r in refs])}
+        rows = [by_id[r["ref"]] for r in refs if r["ref"] in by_id]
+    else:
+        rows = []
     out = []
     for r in rows:
         icon = ICONS.get(r.get("type","").lower(), ICONS["misc"])
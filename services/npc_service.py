@@ -1,5 +1,5 @@
 import json
-from utils.db import execute, fetchone, fetchall
+from utils.db import execute, fetchone, fetchall, offload
 from cogs.world.timeline import log_event   # ✅ konsisten pakai timeline
 
 # ===============================
@@ -17,7 +17,8 @@ def get_npc(guild_id: int, name: str):
     """Ambil 1 NPC berdasarkan nama."""
     return fetchone(guild_id, "SELECT * FROM npc WHERE name=?", (name,))
 
-async def add_npc(guild_id: int, user_id, name, role="", traits=None):
+@offload
+def add_npc(guild_id: int, user_id, name, role="", traits=None):
     """Tambah NPC baru ke world (per-server)."""
     exists = get_npc(guild_id, name)
     if exists:
@@ -46,7 +47,8 @@ async def add_npc(guild_id: int, user_id, name, role="", traits=None):
 
 # ===== TRAITS =====
 
-async def add_trait(guild_id: int, name: str, key: str, value: str, visible=False, user_id=None):
+@offload
+def add_trait(guild_id: int, name: str, key: str, value: str, visible=False, user_id=None):
     npc = get_npc(guild_id, name)
     if not npc:
         return "❌ NPC tidak ditemukan."
@@ -68,7 +70,8 @@ async def add_trait(guild_id: int, name: str, key: str, value: str, visible=Fals
     )
     return f"✅ Trait **{key}={value}** ditambahkan ke **{name}** (visible={visible})."
 
-async def remove_trait(guild_id: int, name: str, key: str, user_id=None):
+@offload
+def remove_trait(guild_id: int, name: str, key: str, user_id=None):
     npc = get_npc(guild_id, name)
     if not npc:
         return "❌ NPC tidak ditemukan."
@@ -93,7 +96,8 @@ async def remove_trait(guild_id: int, name: str, key: str, user_id=None):
     )
     return f"🗑️ Trait **{key}** dihapus dari **{name}**."
 
-async def reveal_trait(guild_id: int, name: str, key: str, user_id=None):
+@offload
+def reveal_trait(guild_id: int, name: str, key: str, user_id=None):
     npc = get_npc(guild_id, name)
     if not npc:
         return "❌ NPC tidak ditemukan."
@@ -121,7 +125,8 @@ async def reveal_trait(guild_id: int, name: str, key: str, user_id=None):
     )
     return msg
 
-async def all_reveal(guild_id: int, name: str, user_id=None):
+@offload
+def all_reveal(guild_id: int, name: str, user_id=None):
     npc = get_npc(guild_id, name)
     if not npc:
         return "❌ NPC tidak ditemukan."
@@ -157,7 +162,8 @@ async def all_reveal(guild_id: int, name: str, user_id=None):
 
 # ===== INFO =====
 
-async def set_info(guild_id: int, name: str, text: str, hidden=False, user_id=None):
+@offload
+def set_info(guild_id: int, name: str, text: str, hidden=False, user_id=None):
     npc = get_npc(guild_id, name)
     if not npc:
         return "❌ NPC tidak ditemukan."
@@ -180,7 +186,8 @@ async def set_info(guild_id: int, name: str, text: str, hidden=False, user_id=No
 
 # ===== LIST & SYNC =====
 
-async def list_npc(guild_id: int):
+@offload
+def list_npc(guild_id: int):
     rows = fetchall(guild_id, "SELECT * FROM npc ORDER BY name COLLATE NOCASE ASC")
     if not rows:
         return f"{ICONS['npc']} Tidak ada NPC."
@@ -189,7 +196,8 @@ async def list_npc(guild_id: int):
         out.append(f"{ICONS['npc']} **{r['name']}** ({r['role']})")
     return "\n".join(out)
 
-async def sync_from_wiki(guild_id: int, user_id=None):
+@offload
+def sync_from_wiki(guild_id: int, user_id=None):
     rows = fetchall(guild_id, "SELECT * FROM wiki WHERE category='npc'")
     added = []
     for r in rows:
@@ -229,7 +237,8 @@ async def sync_from_wiki(guild_id: int, user_id=None):
 
 # ===== REMOVE =====
 
-async def remove_npc(guild_id: int, user_id: int, name: str):
+@offload
+def remove_npc(guild_id: int, user_id: int, name: str):
     npc = get_npc(guild_id, name)
     if not npc:
         return f"❌ NPC **{name}** tidak ditemukan."
@@ -1,5 +1,7 @@
 import json
-from utils.db import execute, fetchone, fetchall
+import threading
+from typing import Dict
+from utils.db import execute, fetchone, fetchall, offload
 from services import inventory_service, status_service, favor_service
 from cogs.world.timeline import log_event
 
@@ -12,6 +14,18 @@ ICONS = {
     "xp": "⭐",
 }
 
+# ---------- Versi status (untuk cache lain, mis. syarat quest di shop) ----------
+_status_versions: Dict[int, int] = {}
+_status_lock = threading.Lock()
+
+def status_version(guild_id: int) -> int:
+    return _status_versions.get(int(guild_id), 0)
+
+def touch_status(guild_id: int) -> None:
+    """Tandai status quest guild berubah → cache yang bergantung pada status dibuang."""
+    with _status_lock:
+        _status_versions[int(guild_id)] = status_version(guild_id) + 1
+
 # ---------- CRUD ----------
 def add_quest(guild_id: int, title, detail="", rewards=None, hidden=False, user_id=0):
     """Tambah quest baru (per server)."""
@@ -74,6 +88,7 @@ def update_status(guild_id: int, title, new_status, archive=False):
     else:
         execute(guild_id, "UPDATE quests SET status=?, updated_at=CURRENT_TIMESTAMP WHERE name=?",
                 (new_status, title))
+    touch_status(guild_id)
     return True
 
 def set_rewards(guild_id: int, title, rewards: dict):
@@ -92,7 +107,8 @@ def assign_characters(guild_id: int, title, chars: list):
     return True
 
 # ---------- Penyelesaian Quest ----------
-async def complete_quest(guild_id: int, title, targets: list = None, user_id=0):
+@offload
+def complete_quest(guild_id: int, title, targets: list = None, user_id=0):
     quest = get_quest(guild_id, title)
     if not quest:
         return f"{ICONS['fail']} Quest tidak ditemukan."
@@ -116,7 +132,7 @@ async def complete_quest(guild_id: int, title, targets: list = None, user_id=0):
             old = fetchone(guild_id, "SELECT xp FROM characters WHERE name=?", (ch,))
             if old:
                 new_val = old["xp"] + rewards["xp"]
-                await status_service.set_status(guild_id, "char", ch, "xp", new_val)
+                status_service.set_status.sync(guild_id, "char", ch, "xp", new_val)
         msg_parts.append(f"{ICONS['xp']} {rewards['xp']} XP")
 
     # Gold
@@ -125,21 +141,25 @@ async def complete_quest(guild_id: int, title, targets: list = None, user_id=0):
             old = fetchone(guild_id, "SELECT gold FROM characters WHERE name=?", (ch,))
             if old:
                 new_val = old["gold"] + rewards["gold"]
-                await status_service.set_status(guild_id, "char", ch, "gold", new_val)
+                status_service.set_status.sync(guild_id, "char", ch, "gold", new_val)
         msg_parts.append(f"💰 {rewards['gold']} Gold")
 
-    # Loot (items)
-    if "loot" in rewards:
+    # Loot (items) → satu batch untuk semua target
+    if rewards.get("loot"):
+        res = inventory_service.distribute_loot(
+            guild_id, {ch: dict(rewards["loot"]) for ch in targets},
+            user_id=user_id, reason=f"Quest {quest['name']}"
+        )
         for item, qty in rewards["loot"].items():
-            for ch in targets:
-                await inventory_service.add_item(guild_id, ch, item, qty)
             msg_parts.append(f"{ICONS['loot']} {qty}x {item}")
+        if res["rejected"]:
+            msg_parts.append(f"⚖️ Kelebihan beban, loot tidak diterima: {', '.join(res['rejected'])}")
 
     # Favor
     if "favor" in rewards:
         fav_txt = []
         for fac, val in rewards["favor"].items():
-            await favor_service.add_favor(guild_id, targets, fac, val)
+            favor_service.add_favor.sync(guild_id, targets, fac, val)
             fav_txt.append(f"{fac}: {val:+d}")
         msg_parts.append(f"{ICONS['favor']} Favor → " + ", ".join(fav_txt))
 
@@ -0,0 +1,139 @@
+# services/retrieval_service.py
+import os
+import re
+import sqlite3
+import logging
+from typing import Dict, List, Optional
+
+from utils.db import ensure_schema, fetchall, offload
+
+logger = logging.getLogger("retrieval")
+
+# ===============================
+# Konfigurasi
+# ===============================
+ASK_CONTEXT_K = int(os.getenv("ASK_CONTEXT_K", "6"))               # snippet maksimal per pertanyaan
+ASK_CONTEXT_TOKENS = int(os.getenv("ASK_CONTEXT_TOKENS", "600"))   # budget token konteks (±4 char/token)
+
+SOURCE_LABELS = {
+    "npc": "NPC",
+    "wiki": "Wiki",
+    "quest": "Quest",
+    "item": "Item",
+    "memory": "Memori",
+    "skill": "Skill",
+}
+# Domain yang boleh dicari lewat !search (memori cuma untuk konteks !ask)
+SEARCH_SOURCES = ("item", "npc", "wiki", "quest", "skill")
+SEARCH_ICONS = {"item": "📦", "npc": "🧑", "wiki": "📚", "quest": "📜", "skill": "✨"}
+
+# Kata umum yang tidak membantu pencarian (ID + EN)
+_STOPWORDS = {
+    "apa", "siapa", "dimana", "mana", "kapan", "kenapa", "mengapa", "bagaimana", "gimana", "berapa",
+    "yang", "dan", "atau", "itu", "ini", "ada", "adalah", "dari", "dengan", "untuk", "pada", "ke", "di",
+    "kalau", "jika", "bisa", "boleh", "tidak", "nggak", "gak", "sudah", "belum", "akan", "juga", "saja",
+    "aku", "saya", "kamu", "dia", "kita", "kami", "mereka", "tentang", "tolong", "jelaskan", "sih", "dong",
+    "the", "and", "what", "who", "where", "when", "why", "how", "does", "about", "with", "for", "that", "this",
+}
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def build_query(prompt: str, max_terms: int = 12, op: str = "OR", keep_short: bool = False) -> Optional[str]:
+    """Teks bebas → query FTS5 (kata penting digabung `op`, prefix match). None kalau tidak ada kata kunci."""
+    terms = []
+    for w in _WORD.findall(prompt.lower()):
+        if (len(w) < 3 and not keep_short) or w in _STOPWORDS or w in terms:
+            continue
+        if w.isdigit() and not keep_short:
+            continue
+        terms.append(w)
+        if len(terms) >= max_terms:
+            break
+    if not terms:
+        return None
+    return f" {op} ".join(f'"{t}"*' for t in terms)
+
+# ===============================
+# Retrieval
+# ===============================
+@offload
+def retrieve(guild_id: int, prompt: str, k: int = None, budget: int = None) -> List[Dict]:
+    """
+    Ambil snippet paling relevan (BM25, judul diberi bobot lebih) dari index campaign_fts.
+    Berhenti di k snippet atau saat budget token habis.
+    """
+    k = k or ASK_CONTEXT_K
+    budget = budget or ASK_CONTEXT_TOKENS
+    query = build_query(prompt)
+    if not query:
+        return []
+    ensure_schema(guild_id)
+    try:
+        rows = fetchall(guild_id, """
+            SELECT src, title, snippet(campaign_fts, 2, '', '', '…', 40) AS snippet,
+                   bm25(campaign_fts, 0.0, 5.0, 1.0) AS score
+            FROM campaign_fts
+            WHERE campaign_fts MATCH ?
+            ORDER BY score
+            LIMIT ?
+        """, (query, k * 2))
+    except sqlite3.OperationalError as e:
+        # index belum ada (SQLite tanpa FTS5) → tanpa konteks
+        logger.debug(f"retrieve guild {guild_id} dilewati: {e}")
+        return []
+
+    picked, used = [], 0
+    for r in rows:
+        cost = estimate_tokens(r["title"] + r["snippet"]) + 4
+        if used + cost > budget:
+            continue
+        picked.append(r)
+        used += cost
+        if len(picked) >= k:
+            break
+    return picked
+
+def format_context(snippets: List[Dict]) -> str:
+    """Snippet → blok teks untuk diletakkan di depan prompt."""
+    return "\n".join(
+        f"- [{SOURCE_LABELS.get(s['src'], s['src'])}] {s['title']}: {s['snippet']}" for s in snippets
+    )
+
+# ===============================
+# !search
+# ===============================
+def _search_rows(guild_id: int, query: str, sources, limit: int) -> List[Dict]:
+    marks = ",".join("?" * len(sources))
+    return fetchall(guild_id, f"""
+        SELECT rowid / 8 AS ref, src,
+               highlight(campaign_fts, 1, '**', '**') AS title,
+               snippet(campaign_fts, 2, '**', '**', '…', 16) AS snippet,
+               bm25(campaign_fts, 0.0, 5.0, 1.0) AS score
+        FROM campaign_fts
+        WHERE campaign_fts MATCH ? AND src IN ({marks})
+        ORDER BY score
+        LIMIT ?
+    """, (query, *sources, limit))
+
+@offload
+def search(guild_id: int, text: str, sources=None, limit: int = 10) -> Optional[List[Dict]]:
+    """
+    Cari di item/NPC/wiki/quest/skill (BM25, prefix match, kata kunci ditebalkan).
+    Semua kata harus ada; kalau kosong, longgarkan ke salah satu kata.
+    None kalau index tidak tersedia (SQLite tanpa FTS5).
+    """
+    sources = tuple(sources or SEARCH_SOURCES)
+    strict = build_query(text, op="AND", keep_short=True)
+    if not strict:
+        return []
+    ensure_schema(guild_id)
+    try:
+        rows = _search_rows(guild_id, strict, sources, limit)
+        if not rows and " AND " in strict:
+            rows = _search_rows(guild_id, build_query(text, op="OR", keep_short=True), sources, limit)
+    except sqlite3.OperationalError as e:
+        logger.debug(f"search guild {guild_id} gagal: {e}")
+        return None
+    return rows
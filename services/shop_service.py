@@ -1,5 +1,8 @@
 import json
-from utils.db import fetchone, fetchall, execute
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from utils.db import fetchone, fetchall, execute, ensure_once, on_invalidate
 from services import item_service, inventory_service, favor_service, quest_service
 
 ICON_DEFAULT = "📦"
@@ -7,7 +10,7 @@ ICON_DEFAULT = "📦"
 # ===============================
 # TABLE ENSURE
 # ===============================
-def ensure_table(guild_id: int):
+def _create_table(guild_id: int):
     execute(guild_id, """
         CREATE TABLE IF NOT EXISTS npc_shop (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -22,6 +25,9 @@ def ensure_table(guild_id: int):
         )
     """)
 
+def ensure_table(guild_id: int):
+    ensure_once(guild_id, "npc_shop", _create_table)
+
 # ===============================
 # CRUD SHOP
 # ===============================
@@ -45,6 +51,7 @@ def add_item(guild_id: int, npc_name: str, item: str, price: int, stock: int = -
          json.dumps(favor_req or {}),
          json.dumps(quest_req or []))
     )
+    touch_shop(guild_id)
     return True
 
 def remove_item(guild_id: int, npc_name: str, item: str):
@@ -52,40 +59,78 @@ def remove_item(guild_id: int, npc_name: str, item: str):
     ensure_table(guild_id)
     execute(guild_id, "DELETE FROM npc_shop WHERE npc_name=? AND item=?",
             (npc_name, item))
+    touch_shop(guild_id)
     return True
 
 def clear_shop(guild_id: int, npc_name: str):
     """Hapus semua dagangan NPC."""
     ensure_table(guild_id)
     execute(guild_id, "DELETE FROM npc_shop WHERE npc_name=?", (npc_name,))
+    touch_shop(guild_id)
     return True
 
+# ===============================
+# CACHE RENDER
+# ===============================
+# Hasil list_items disimpan per (guild, npc, char, gm_view) bersama versi data yang
+# dipakai saat render: dagangan shop, favor, status quest & katalog item. Selama
+# keempat versi sama, listing diambil dari memori tanpa query sama sekali.
+_RENDER_MAX = 256
+_renders: "OrderedDict[tuple, Tuple[tuple, List[str]]]" = OrderedDict()
+_shop_versions: Dict[int, int] = {}
+_render_lock = threading.Lock()
+
+def touch_shop(guild_id: int) -> None:
+    """Tandai dagangan guild berubah (harga/stok/syarat) → render lama tidak dipakai lagi."""
+    with _render_lock:
+        _shop_versions[int(guild_id)] = _shop_versions.get(int(guild_id), 0) + 1
+
+def _data_version(guild_id: int) -> tuple:
+    return (
+        _shop_versions.get(int(guild_id), 0),
+        favor_service.favors_version(guild_id),
+        quest_service.status_version(guild_id),
+        item_service.catalog_version(guild_id),
+    )
+
+@on_invalidate
+def invalidate_renders(guild_id: Optional[int] = None) -> None:
+    """Buang cache render shop (satu guild, atau semua kalau None)."""
+    with _render_lock:
+        if guild_id is None:
+            _renders.clear()
+            return
+        for key in [k for k in _renders if k[0] == int(guild_id)]:
+            del _renders[key]
+
 # ===============================
 # HELPERS
 # ===============================
-def _check_requirements(guild_id: int, row, char_name: str):
-    """Cek apakah character memenuhi syarat favor & quest."""
+def _req_context(guild_id: int, char_name: str) -> Tuple[Dict[str, int], Set[str]]:
+    """Favor map {faction: favor} milik character + nama quest yang sudah completed (2 query)."""
+    favors = {
+        r["faction"]: r["favor"] or 0
+        for r in fetchall(guild_id, "SELECT faction, favor FROM favors WHERE char_name=?", (char_name,))
+    }
+    done = {
+        r["name"]
+        for r in fetchall(guild_id, "SELECT name FROM quests WHERE status='completed'")
+    }
+    return favors, done
+
+def _meets(row, favors: Dict[str, int], done: Set[str]) -> bool:
+    """Evaluasi syarat favor & quest satu baris shop di memori."""
     favor_req = json.loads(row.get("favor_req") or "{}")
     quest_req = json.loads(row.get("quest_req") or "[]")
+    if any(favors.get(fac, 0) < need for fac, need in favor_req.items()):
+        return False
+    return all(q in done for q in quest_req)
 
-    # Favor check
-    if favor_req:
-        for fac, need in favor_req.items():
-            f = fetchone(guild_id,
-                         "SELECT favor FROM favors WHERE char_name=? AND faction=?",
-                         (char_name, fac))
-            have = f["favor"] if f else 0
-            if have < need:
-                return False
-
-    # Quest check
-    if quest_req:
-        for qname in quest_req:
-            q = quest_service.get_quest(guild_id, qname)
-            if not q or q["status"] != "completed":
-                return False
-
-    return True
+def _check_requirements(guild_id: int, row, char_name: str):
+    """Cek apakah character memenuhi syarat favor & quest."""
+    if row.get("favor_req") in (None, "", "{}") and row.get("quest_req") in (None, "", "[]"):
+        return True
+    return _meets(row, *_req_context(guild_id, char_name))
 
 # ===============================
 # LIST
@@ -93,10 +138,30 @@ def _check_requirements(guild_id: int, row, char_name: str):
 def list_items(guild_id: int, npc_name: str, char_name: str | None = None, gm_view: bool = False):
     """List semua dagangan NPC. Urut: Rarity -> Nama A–Z. Tampilkan ikon rarity + ikon tipe."""
     ensure_table(guild_id)
+    check = bool(char_name) and not gm_view
+    key = (int(guild_id), npc_name, char_name if check else None, gm_view)
+    version = _data_version(guild_id)
+    with _render_lock:
+        cached = _renders.get(key)
+        if cached and cached[0] == version:
+            _renders.move_to_end(key)
+            return list(cached[1])
+
+    out = _render_items(guild_id, npc_name, char_name if check else None)
+    with _render_lock:
+        _renders[key] = (version, out)
+        _renders.move_to_end(key)
+        while len(_renders) > _RENDER_MAX:
+            _renders.popitem(last=False)
+    return list(out)
+
+def _render_items(guild_id: int, npc_name: str, char_name: str | None) -> List[str]:
+    # satu query: dagangan + data katalog (nama yang tidak persis sama dicari lewat cache katalog)
     rows = fetchall(
         guild_id,
         """
-        SELECT s.*
+        SELECT s.*, i.name AS item_name, i.type AS item_type, i.effect AS item_effect,
+               i.rarity AS item_rarity, i.requirement AS item_requirement
         FROM npc_shop s
         LEFT JOIN items i ON s.item = i.name
         WHERE s.npc_name=?
@@ -107,13 +172,24 @@ def list_items(guild_id: int, npc_name: str, char_name: str | None = None, gm_vi
     if not rows:
         return [f"ℹ️ {npc_name} tidak menjual apa-apa."]
 
-    out = []
+    missing = [r["item"] for r in rows if r["item_name"] is None]
+    catalog = item_service.get_items(guild_id, missing) if missing else {}
+    favors, done = _req_context(guild_id, char_name) if char_name else ({}, set())
+
     items_sorted = []
     for r in rows:
-        item_data = item_service.get_item(guild_id, r["item"])
+        if r["item_name"] is not None:
+            item_data = {
+                "type": r["item_type"],
+                "effect": r["item_effect"],
+                "rarity": r["item_rarity"] or "Common",
+                "requirement": r["item_requirement"],
+                "icon": item_service.ICONS.get((r["item_type"] or "").lower(), ICON_DEFAULT),
+            }
+        else:
+            item_data = catalog.get(item_service.normalize_name(r["item"] or ""))
         rarity = item_data.get("rarity", "Common") if item_data else "Common"
-        name = r["item"]
-        items_sorted.append((rarity, name.lower(), r, item_data))
+        items_sorted.append((rarity, r["item"].lower(), r, item_data))
 
     # urutkan pakai RARITY_ORDER lalu nama
     items_sorted.sort(key=lambda e: (
@@ -121,6 +197,7 @@ def list_items(guild_id: int, npc_name: str, char_name: str | None = None, gm_vi
         e[1]                                      # nama
     ))
 
+    out = []
     for rarity, _, r, item_data in items_sorted:
         effect = item_data.get("effect", "-") if item_data else "-"
         requirement = item_data.get("requirement", "") if item_data else ""
@@ -132,9 +209,7 @@ def list_items(guild_id: int, npc_name: str, char_name: str | None = None, gm_vi
         stock = r["stock"]
         stock_text = "∞" if stock < 0 else str(stock)
 
-        locked = False
-        if not gm_view and char_name:
-            locked = not _check_requirements(guild_id, r, char_name)
+        locked = bool(char_name) and not _meets(r, favors, done)
 
         if locked:
             out.append(
@@ -191,16 +266,16 @@ def buy_item(guild_id: int, npc_name: str, char_name: str, item: str, qty: int =
     if new_carry > (char.get("carry_capacity", 0) or 0):
         return False, f"⚖️ {char_name} kelebihan beban! Tidak bisa membeli {item}."
 
-    # kurangi gold
+    # kurangi gold (carry_used ditambah add_item di bawah)
     new_gold = gold - price
-    execute(guild_id, "UPDATE characters SET gold=?, carry_used=? WHERE name=?",
-            (new_gold, new_carry, char_name))
+    execute(guild_id, "UPDATE characters SET gold=? WHERE name=?", (new_gold, char_name))
 
     # kurangi stock (kecuali unlimited)
     if stock >= 0:
         new_stock = stock - qty
         execute(guild_id, "UPDATE npc_shop SET stock=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
                 (new_stock, r["id"]))
+        touch_shop(guild_id)
 
     # tambahkan item ke inventory
     inventory_service.add_item(guild_id, char_name, item, qty, user_id="system")
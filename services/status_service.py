@@ -1,6 +1,7 @@
 import json
-from utils.db import execute, fetchone, fetchall
+from utils.db import execute, fetchone, fetchall, transaction, offload
 from services import effect_service  # 🔹 Integrasi penuh dengan sistem efek baru
+from services import encounter_service
 
 # ===============================
 # STATUS SERVICE (per-server)
@@ -68,66 +69,243 @@ def xp_required(level: int) -> int:
 # ===============================
 # HP / VITALS
 # ===============================
-async def damage(guild_id: int, target_type, name, amount: int):
-    table = _table(target_type)
-    row = _ensure_exists(guild_id, table, name)
-
+# Tiap mutasi vital = "plan" murni: row → (hasil, perubahan kolom, history, timeline).
+# Plan yang sama dipakai jalur encounter (memori + journal) dan jalur DB biasa.
+def _plan_damage(row: dict, target_type, name, amount: int):
     hp_max = int(row.get("hp_max") or 0)
     cur_hp = int(row.get("hp") or 0)
     new_hp = max(0, cur_hp - int(amount))
+    history = ["dmg", json.dumps({"target": name, "type": target_type,
+                                  "old": cur_hp, "new": new_hp, "amount": int(amount)})]
+    return new_hp, {"hp": new_hp}, history, f"{name} menerima {int(amount)} damage → {new_hp}/{hp_max} HP"
 
-    execute(guild_id, f"UPDATE {table} SET hp=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-            (new_hp, row["id"]))
-
-    execute(guild_id, "INSERT INTO history (action, data) VALUES (?,?)",
-            ("dmg", json.dumps({"target": name, "type": target_type,
-                                "old": cur_hp, "new": new_hp, "amount": int(amount)})))
-    execute(guild_id, "INSERT INTO timeline (event) VALUES (?)",
-            (f"{name} menerima {int(amount)} damage → {new_hp}/{hp_max} HP",))
-    return new_hp
-
-async def heal(guild_id: int, target_type, name, amount: int):
-    table = _table(target_type)
-    row = _ensure_exists(guild_id, table, name)
-
+def _plan_heal(row: dict, target_type, name, amount: int):
+    changes = {}
     hp_max = int(row.get("hp_max") or 0)
     cur_hp = int(row.get("hp") or 0)
     if hp_max <= 0:
         hp_max = cur_hp + int(amount)
-        execute(guild_id, f"UPDATE {table} SET hp_max=? WHERE id=?", (hp_max, row["id"]))
-
+        changes["hp_max"] = hp_max
     new_hp = min(hp_max, cur_hp + int(amount))
-    execute(guild_id, f"UPDATE {table} SET hp=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-            (new_hp, row["id"]))
-
-    execute(guild_id, "INSERT INTO history (action, data) VALUES (?,?)",
-            ("heal", json.dumps({"target": name, "type": target_type,
-                                 "old": cur_hp, "new": new_hp, "amount": int(amount)})))
-    execute(guild_id, "INSERT INTO timeline (event) VALUES (?)",
-            (f"{name} disembuhkan {int(amount)} HP → {new_hp}/{hp_max} HP",))
-    return new_hp
-
-async def use_resource(guild_id: int, target_type, name, field: str, amount: int, regen=False):
-    """Kurangi / regen resource (energy/stamina)."""
-    table = _table(target_type)
-    row = _ensure_exists(guild_id, table, name)
+    changes["hp"] = new_hp
+    history = ["heal", json.dumps({"target": name, "type": target_type,
+                                   "old": cur_hp, "new": new_hp, "amount": int(amount)})]
+    return new_hp, changes, history, f"{name} disembuhkan {int(amount)} HP → {new_hp}/{hp_max} HP"
 
+def _plan_resource(row: dict, target_type, name, field: str, amount: int, regen=False):
+    changes = {}
     cur = int(row.get(field) or 0)
     mx = int(row.get(f"{field}_max") or 0)
-
     if regen and mx <= 0:
         mx = cur + int(amount)
-        execute(guild_id, f"UPDATE {table} SET {field}_max=? WHERE id=?", (mx, row["id"]))
-
+        changes[f"{field}_max"] = mx
     new_val = min(mx, cur + int(amount)) if regen else max(0, cur - int(amount))
-    execute(guild_id, f"UPDATE {table} SET {field}=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-            (new_val, row["id"]))
-
+    changes[field] = new_val
     action = "regen" if regen else "use"
-    execute(guild_id, "INSERT INTO history (action, data) VALUES (?,?)",
-            (f"{field}_{action}", json.dumps({"target": name, "type": target_type,
-                                              "old": cur, "new": new_val, "amount": int(amount)})))
-    return new_val
+    history = [f"{field}_{action}", json.dumps({"target": name, "type": target_type,
+                                                "old": cur, "new": new_val, "amount": int(amount)})]
+    return new_val, changes, history, None
+
+def _plan_set(row: dict, target_type, name, field: str, value):
+    history = ["set_status", json.dumps({"target": name, "type": target_type,
+                                         "field": field, "old": row.get(field), "new": value})]
+    return value, {field: value}, history, None
+
+def _write_plan(guild_id: int, target_type, name, plan, *args):
+    """Jalur DB: row → plan → satu UPDATE + log, dalam satu transaksi."""
+    table = _table(target_type)
+    with transaction(guild_id) as tx:
+        row = _ensure_exists(guild_id, table, name)
+        result, changes, history, timeline = plan(row, target_type, name, *args)
+        assign = ", ".join(f"{k}=?" for k in changes)
+        tx.execute(f"UPDATE {table} SET {assign}, updated_at=CURRENT_TIMESTAMP WHERE id=?",
+                   (*changes.values(), row["id"]))
+        if history:
+            tx.execute("INSERT INTO history (action, data) VALUES (?,?)", tuple(history))
+        if timeline:
+            tx.execute("INSERT INTO timeline (event) VALUES (?)", (timeline,))
+    return result
+
+_write_plan_async = offload(_write_plan)
+
+async def _mutate(guild_id: int, target_type, name, plan, *args):
+    """Encounter aktif → langsung di memori; selain itu lewat DB di thread worker."""
+    hit, result = encounter_service.mutate(guild_id, _table(target_type), name, plan, target_type, name, *args)
+    if hit:
+        return result
+    return await _write_plan_async(guild_id, target_type, name, plan, *args)
+
+async def damage(guild_id: int, target_type, name, amount: int):
+    return await _mutate(guild_id, target_type, name, _plan_damage, amount)
+
+async def heal(guild_id: int, target_type, name, amount: int):
+    return await _mutate(guild_id, target_type, name, _plan_heal, amount)
+
+async def use_resource(guild_id: int, target_type, name, field: str, amount: int, regen=False):
+    """Kurangi / regen resource (energy/stamina)."""
+    return await _mutate(guild_id, target_type, name, _plan_resource, field, amount, regen)
+
+# ===============================
+# BULK / AoE (selector → banyak target, satu transaksi)
+# ===============================
+# Selector (boleh digabung pakai koma):
+#   enemies:*  allies:*  chars:*   → semua entity di tabel itu (pola glob: enemies:gob*)
+#   party                          → semua characters + allies
+#   all                            → characters + enemies + allies
+#   tag:undead                     → entity yang punya tag tsb (lihat !tag)
+#   Goblin1                        → nama biasa (tabel default dulu, lalu tabel lain)
+_SELECTOR_TABLES = {
+    "char": "characters", "chars": "characters", "characters": "characters",
+    "enemy": "enemies", "enemies": "enemies",
+    "ally": "allies", "allies": "allies",
+}
+_TYPE_OF = {"characters": "char", "enemies": "enemy", "allies": "ally"}
+_ENTITY_TABLES = ("characters", "enemies", "allies")
+
+_TAGGED_SQL = """
+    SELECT name FROM {table}
+    WHERE EXISTS (
+        SELECT 1 FROM json_each(CASE WHEN json_valid(tags) THEN tags ELSE '[]' END)
+        WHERE lower(value) = lower(?)
+    )
+    ORDER BY id
+"""
+
+def is_selector(text: str) -> bool:
+    low = (text or "").lower()
+    return "," in low or ":" in low or low in ("party", "all")
+
+def _names_in(guild_id: int, table: str, pattern: str = "*"):
+    rows = fetchall(guild_id, f"SELECT name FROM {table} WHERE lower(name) GLOB lower(?) ORDER BY id", (pattern,))
+    return [(table, r["name"]) for r in rows]
+
+def _lookup_name(guild_id: int, name: str, default_table: str):
+    for table in (default_table,) + tuple(t for t in _ENTITY_TABLES if t != default_table):
+        row = fetchone(guild_id, f"SELECT name FROM {table} WHERE name=?", (name,))
+        if row:
+            return [(table, row["name"])]
+    return []
+
+def resolve_targets(guild_id: int, selector: str, default_type: str = "enemy"):
+    """Selector → ([(tabel, nama)] tanpa duplikat, [bagian selector yang tidak ketemu])."""
+    targets, missing = [], []
+    for part in (p.strip() for p in (selector or "").split(",")):
+        if not part:
+            continue
+        low = part.lower()
+        head, _, rest = part.partition(":")
+        if low == "party":
+            found = _names_in(guild_id, "characters") + _names_in(guild_id, "allies")
+        elif low == "all":
+            found = [t for table in _ENTITY_TABLES for t in _names_in(guild_id, table)]
+        elif low.startswith("tag:"):
+            found = [(table, r["name"]) for table in _ENTITY_TABLES
+                     for r in fetchall(guild_id, _TAGGED_SQL.format(table=table), (rest,))]
+        elif rest and head.lower() in _SELECTOR_TABLES:
+            found = _names_in(guild_id, _SELECTOR_TABLES[head.lower()], rest)
+        else:
+            found = _lookup_name(guild_id, part, _table(default_type))
+        if not found:
+            missing.append(part)
+        targets.extend(found)
+    return list(dict.fromkeys(targets)), missing
+
+_BULK_OPS = {
+    "dmg": ("💥", "Damage"),
+    "heal": ("✨", "Heal"),
+    "use": ("➖", "Pakai"),
+    "regen": ("➕", "Regen"),
+}
+
+def _bulk_plan(op: str, amount: int, field: str):
+    if op == "dmg":
+        return _plan_damage, (amount,)
+    if op == "heal":
+        return _plan_heal, (amount,)
+    return _plan_resource, (field, amount, op == "regen")
+
+@offload
+def apply_bulk(guild_id: int, selector: str, op: str, amount: int, field: str = "hp", default_type: str = "enemy"):
+    """
+    Terapkan dmg/heal/use/regen ke semua target selector dalam satu transaksi.
+    Return {"op", "field", "amount", "results": [{table, name, value, max}], "missing": [...]}.
+    """
+    if op not in _BULK_OPS:
+        raise ValueError(f"op tidak dikenal: {op}")
+    field = "hp" if op in ("dmg", "heal") else field
+    plan, args = _bulk_plan(op, int(amount), field)
+    targets, missing = resolve_targets(guild_id, selector, default_type)
+
+    results = []
+    with transaction(guild_id):
+        for table, name in targets:
+            target_type = _TYPE_OF[table]
+            hit, value = encounter_service.mutate(guild_id, table, name, plan, target_type, name, *args)
+            if not hit:
+                value = _write_plan(guild_id, target_type, name, plan, *args)
+            results.append({"table": table, "name": name, "value": value})
+
+    # Nilai max untuk bar: satu query per tabel (+ overlay encounter)
+    by_table = {}
+    for r in results:
+        by_table.setdefault(r["table"], []).append(r["name"])
+    maxes = {}
+    for table, names in by_table.items():
+        ph = ",".join("?" * len(names))
+        rows = fetchall(guild_id, f"SELECT id, name, {field}, {field}_max FROM {table} WHERE name IN ({ph})", names)
+        for row in encounter_service.overlay(guild_id, table, rows):
+            maxes[(table, row["name"])] = int(row.get(f"{field}_max") or 0)
+    for r in results:
+        r["max"] = maxes.get((r["table"], r["name"]), 0)
+
+    return {"op": op, "field": field, "amount": int(amount), "results": results, "missing": missing}
+
+def build_bulk_embed(discord, data: dict):
+    """Satu embed ringkasan untuk hasil apply_bulk."""
+    icon, label = _BULK_OPS[data["op"]]
+    field = data["field"].upper() if data["field"] != "hp" else "HP"
+    embed = discord.Embed(
+        title=f"{icon} AoE {label} {data['amount']} {field}",
+        description=f"{len(data['results'])} target",
+        color=discord.Color.red() if data["op"] in ("dmg", "use") else discord.Color.green(),
+    )
+    sections = {"characters": ("🧍", "Characters"), "enemies": ("👹", "Enemies"), "allies": ("🤝", "Allies")}
+    for table, (t_icon, t_label) in sections.items():
+        lines = []
+        for r in data["results"]:
+            if r["table"] != table:
+                continue
+            dead = " 💀" if data["field"] == "hp" and int(r["value"] or 0) <= 0 else ""
+            lines.append(f"**{r['name']}** → {r['value']}/{r['max']}{dead}")
+        if lines:
+            embed.add_field(name=f"{t_icon} {t_label}", value="\n".join(lines)[:1024], inline=False)
+    if data["missing"]:
+        embed.add_field(name="⚠️ Tidak ditemukan", value=", ".join(data["missing"])[:1024], inline=False)
+    return embed
+
+# ===============================
+# TAGS (untuk selector tag:xxx)
+# ===============================
+@offload
+def set_tags(guild_id: int, name: str, tags: list, remove: bool = False):
+    """Tambah / hapus tag pada entity (character/enemy/ally). Return list tag baru, None kalau tidak ketemu."""
+    found = _lookup_name(guild_id, name, "characters")
+    if not found:
+        return None
+    table, real_name = found[0]
+    row = fetchone(guild_id, f"SELECT id, tags FROM {table} WHERE name=?", (real_name,))
+    try:
+        cur = json.loads(row.get("tags") or "[]")
+    except Exception:
+        cur = []
+    wanted = [t.strip().lower() for t in tags if t.strip()]
+    if remove:
+        cur = [t for t in cur if t not in wanted]
+    else:
+        cur += [t for t in wanted if t not in cur]
+    execute(guild_id, f"UPDATE {table} SET tags=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
+            (json.dumps(cur), row["id"]))
+    return cur
 
 # ===============================
 # EFFECTS (Delegasi ke effect_service)
@@ -154,7 +332,8 @@ async def tick_all_effects(guild_id: int):
 # ===============================
 # EQUIPMENT (char only)
 # ===============================
-async def set_equipment(guild_id: int, name, slot: str, item: str):
+@offload
+def set_equipment(guild_id: int, name, slot: str, item: str):
     row = _ensure_exists(guild_id, "characters", name)
     eq = json.loads(row.get("equipment") or "{}")
     eq[slot] = item
@@ -165,7 +344,8 @@ async def set_equipment(guild_id: int, name, slot: str, item: str):
 # ===============================
 # COMPANIONS (char only)
 # ===============================
-async def add_companion(guild_id: int, name, comp: dict):
+@offload
+def add_companion(guild_id: int, name, comp: dict):
     row = _ensure_exists(guild_id, "characters", name)
     comps = json.loads(row.get("companions") or "[]")
     comps.append(comp)
@@ -173,7 +353,8 @@ async def add_companion(guild_id: int, name, comp: dict):
             (json.dumps(comps), row["id"]))
     return comps
 
-async def remove_companion(guild_id: int, name, comp_name: str):
+@offload
+def remove_companion(guild_id: int, name, comp_name: str):
     row = _ensure_exists(guild_id, "characters", name)
     comps = json.loads(row.get("companions") or "[]")
     comps = [c for c in comps if c.get("name","").lower() != comp_name.lower()]
@@ -184,21 +365,20 @@ async def remove_companion(guild_id: int, name, comp_name: str):
 # ===============================
 # GENERIC FIELD UPDATE
 # ===============================
-async def set_status(guild_id: int, target_type, name, field: str, value):
-    table = _table(target_type)
-    row = _ensure_exists(guild_id, table, name)
-    old_value = row.get(field)
-    execute(guild_id, f"UPDATE {table} SET {field}=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-            (value, row["id"]))
-    execute(guild_id, "INSERT INTO history (action, data) VALUES (?,?)",
-            ("set_status", json.dumps({"target": name, "type": target_type,
-                                       "field": field, "old": old_value, "new": value})))
-    return value
+@offload
+def set_status(guild_id: int, target_type, name, field: str, value):
+    if field in encounter_service.VITALS:
+        hit, result = encounter_service.mutate(guild_id, _table(target_type), name,
+                                               _plan_set, target_type, name, field, value)
+        if hit:
+            return result
+    return _write_plan(guild_id, target_type, name, _plan_set, field, value)
 
 # ===============================
 # GOLD & XP HELPERS (char only)
 # ===============================
-async def add_gold(guild_id: int, name, amount: int):
+@offload
+def add_gold(guild_id: int, name, amount: int):
     row = _ensure_exists(guild_id, "characters", name)
     cur = int(row.get("gold") or 0)
     new_val = max(0, cur + int(amount))
@@ -206,7 +386,8 @@ async def add_gold(guild_id: int, name, amount: int):
             (new_val, row["id"]))
     return new_val
 
-async def add_xp(guild_id: int, name, amount: int):
+@offload
+def add_xp(guild_id: int, name, amount: int):
     row = _ensure_exists(guild_id, "characters", name)
     cur_xp = int(row.get("xp") or 0)
     cur_level = int(row.get("level") or 1)
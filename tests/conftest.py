@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@pytest.fixture
+def guild_db(tmp_path, monkeypatch):
+    """DB guild sementara (bukan /data) → guild_id; koneksi pool ditutup setelah test."""
+    from utils import db
+
+    monkeypatch.setattr(db, "get_db_path", lambda guild_id: str(tmp_path / f"narator_{guild_id}.db"))
+    guild_id = 4242
+    yield guild_id
+    db.close_conn(guild_id)
@@ -0,0 +1,16 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("openai")
+
+from services import ask_service
+
+
+def test_answer_in_dm_is_refused_without_calling_gpt(monkeypatch):
+    def _no_client():
+        raise AssertionError("GPT tidak boleh dipanggil dari DM")
+
+    monkeypatch.setattr(ask_service, "_get_client", _no_client)
+    with pytest.raises(ask_service.BudgetExceeded):
+        asyncio.run(ask_service.answer(None, "siapa raja naga?", user_id=1))
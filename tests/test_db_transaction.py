@@ -0,0 +1,41 @@
+import pytest
+
+from utils import db
+
+
+def _values(guild_id):
+    return [r["x"] for r in db.fetchall(guild_id, "SELECT x FROM t ORDER BY x")]
+
+
+def test_write_after_rollback_is_committed_with_the_block(guild_db):
+    db.execute(guild_db, "CREATE TABLE t (x INTEGER)")
+    with db.transaction(guild_db) as tx:
+        tx.execute("INSERT INTO t VALUES (1)")
+        tx.rollback()
+        tx.execute("INSERT INTO t VALUES (2)")
+        db.execute(guild_db, "INSERT INTO t VALUES (3)")   # helper biasa ikut transaksi yang sama
+        assert db.get_conn(guild_db).in_transaction
+    assert _values(guild_db) == [2, 3]
+
+
+def test_write_after_rollback_is_undone_when_block_raises(guild_db):
+    db.execute(guild_db, "CREATE TABLE t (x INTEGER)")
+    with pytest.raises(RuntimeError):
+        with db.transaction(guild_db) as tx:
+            tx.execute("INSERT INTO t VALUES (1)")
+            tx.rollback()
+            tx.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError("gagal")
+    assert _values(guild_db) == []
+    assert not db.get_conn(guild_db).in_transaction
+
+
+def test_nested_rollback_only_undoes_inner_level(guild_db):
+    db.execute(guild_db, "CREATE TABLE t (x INTEGER)")
+    with db.transaction(guild_db) as outer:
+        outer.execute("INSERT INTO t VALUES (1)")
+        with db.transaction(guild_db) as inner:
+            inner.execute("INSERT INTO t VALUES (2)")
+            inner.rollback()
+            inner.execute("INSERT INTO t VALUES (3)")
+    assert _values(guild_db) == [1, 3]
@@ -1,7 +1,34 @@
 import os
+import time
 import sqlite3
 import json
-from typing import Any, Iterable, Iterable as Iter, List, Optional, Dict
+import asyncio
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterable as Iter, List, Optional, Dict
+
+# ===== Konfigurasi pool koneksi =====
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "32"))             # maksimal koneksi hangat (LRU)
+DB_POOL_IDLE = float(os.getenv("DB_POOL_IDLE", "600"))        # detik idle sebelum koneksi ditutup
+_PRUNE_EVERY = 60.0
+
+# ===== Profil PRAGMA (bisa dioverride via ENV) =====
+PRAGMA_PROFILE = {
+    "journal_mode": os.getenv("DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("DB_BUSY_TIMEOUT", "5000")),        # ms
+    "cache_size": int(os.getenv("DB_CACHE_SIZE", "-8000")),           # negatif = KiB (≈8 MB)
+    "mmap_size": int(os.getenv("DB_MMAP_SIZE", str(64 * 1024 * 1024))),
+    "temp_store": os.getenv("DB_TEMP_STORE", "MEMORY"),
+    "foreign_keys": os.getenv("DB_FOREIGN_KEYS", "OFF"),
+}
+DB_CHECKPOINT_INTERVAL = float(os.getenv("DB_CHECKPOINT_INTERVAL", "300"))  # detik
+DB_WORKERS = int(os.getenv("DB_WORKERS", "8"))  # thread I/O SQLite (di luar event loop discord)
+
+_data_dir_ready = False
 
 # ===== Path DB per server =====
 def get_db_path(guild_id: int) -> str:
@@ -9,50 +36,349 @@ def get_db_path(guild_id: int) -> str:
     Simpan semua database di folder /data (lokasi permanen di container/hosting).
     Path ini aman di Railway, Render, Docker, dsb.
     """
-    os.makedirs("/data", exist_ok=True)
+    global _data_dir_ready
+    if not _data_dir_ready:
+        os.makedirs("/data", exist_ok=True)
+        _data_dir_ready = True
     return f"/data/narator_{guild_id}.db"
 
-# ===== Low-level helpers =====
-def get_conn(guild_id: int) -> sqlite3.Connection:
-    path = get_db_path(guild_id)
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    conn = sqlite3.connect(path)
+# ===== Connection pool (1 koneksi hangat per guild) =====
+class _PooledConn:
+    __slots__ = ("conn", "lock", "last_used", "closed", "tx_depth")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.lock = threading.RLock()
+        self.last_used = time.monotonic()
+        self.closed = False
+        self.tx_depth = 0  # level transaction() yang sedang aktif (owner = thread pemegang lock)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+
+_pool: "OrderedDict[int, _PooledConn]" = OrderedDict()
+_pool_lock = threading.Lock()
+_last_prune = time.monotonic()
+
+def _open_conn(guild_id: int) -> sqlite3.Connection:
+    # isolation_level=None → autocommit; transaksi eksplisit pakai BEGIN/COMMIT
+    conn = sqlite3.connect(get_db_path(guild_id), check_same_thread=False, isolation_level=None)
     conn.row_factory = sqlite3.Row
+    _apply_pragmas(conn)
     return conn
 
+def _apply_pragmas(conn: sqlite3.Connection) -> None:
+    # busy_timeout duluan supaya ganti journal_mode tidak langsung gagal kalau DB sedang sibuk
+    order = ["busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "foreign_keys"]
+    for key in order:
+        val = PRAGMA_PROFILE.get(key)
+        if val is None or val == "":
+            continue
+        try:
+            conn.execute(f"PRAGMA {key}={val}")
+        except sqlite3.Error as e:
+            print(f"[DB] ⚠️ PRAGMA {key}={val} gagal: {e}")
+
+def _evict_locked(keep: int) -> None:
+    """Tutup koneksi LRU yang sedang tidak dipakai sampai ukuran pool <= DB_POOL_MAX."""
+    for gid in list(_pool.keys()):
+        if len(_pool) <= DB_POOL_MAX:
+            break
+        if gid == keep:
+            continue
+        entry = _pool[gid]
+        if entry.lock.acquire(blocking=False):
+            try:
+                del _pool[gid]
+                entry.close()
+            finally:
+                entry.lock.release()
+
+def prune_idle(max_idle: Optional[float] = None) -> int:
+    """Tutup koneksi yang idle lebih lama dari max_idle detik. Return jumlah yang ditutup."""
+    global _last_prune
+    max_idle = DB_POOL_IDLE if max_idle is None else max_idle
+    now = time.monotonic()
+    closed = 0
+    with _pool_lock:
+        _last_prune = now
+        for gid in list(_pool.keys()):
+            entry = _pool[gid]
+            if now - entry.last_used < max_idle:
+                continue
+            if entry.lock.acquire(blocking=False):
+                try:
+                    del _pool[gid]
+                    entry.close()
+                    closed += 1
+                finally:
+                    entry.lock.release()
+    return closed
+
+def _checkout(guild_id: int) -> _PooledConn:
+    if time.monotonic() - _last_prune > _PRUNE_EVERY:
+        prune_idle()
+    with _pool_lock:
+        entry = _pool.get(guild_id)
+        if entry is None or entry.closed:
+            entry = _PooledConn(_open_conn(guild_id))
+            _pool[guild_id] = entry
+            _evict_locked(keep=guild_id)
+        else:
+            _pool.move_to_end(guild_id)
+        return entry
+
+@contextmanager
+def _borrow(guild_id: int):
+    """Pinjam entry pool milik guild (thread-safe, eksklusif selama blok with)."""
+    while True:
+        entry = _checkout(guild_id)
+        with entry.lock:
+            if entry.closed:
+                continue  # keburu di-evict thread lain → ambil ulang
+            try:
+                yield entry
+            finally:
+                entry.last_used = time.monotonic()
+            return
+
+@contextmanager
+def _connection(guild_id: int):
+    with _borrow(guild_id) as entry:
+        yield entry.conn
+
+def close_conn(guild_id: int) -> None:
+    """Tutup koneksi guild (dipakai sebelum file DB diganti / dihapus)."""
+    with _pool_lock:
+        entry = _pool.pop(guild_id, None)
+    invalidate_guild(guild_id)
+    if entry:
+        with entry.lock:
+            entry.close()
+
+def close_all() -> None:
+    """Tutup semua koneksi pool (dipanggil saat bot shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    with _pool_lock:
+        entries = list(_pool.values())
+        _pool.clear()
+    invalidate_guild(None)
+    for entry in entries:
+        with entry.lock:
+            entry.close()
+
+def checkpoint(guild_id: int, mode: str = "PASSIVE") -> Dict[str, int]:
+    """Jalankan wal_checkpoint. mode: PASSIVE | FULL | RESTART | TRUNCATE."""
+    mode = mode.upper()
+    if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        mode = "PASSIVE"
+    with _connection(guild_id) as conn:
+        busy, log, done = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    return {"busy": busy, "log": log, "checkpointed": done}
+
+async def checkpoint_all(mode: str = "PASSIVE") -> Dict[int, Dict[str, int]]:
+    """Checkpoint semua guild yang koneksinya sedang hangat di pool (lewat antrian run() per guild)."""
+    with _pool_lock:
+        guild_ids = list(_pool.keys())
+    out = {}
+    for gid in guild_ids:
+        try:
+            out[gid] = await run(gid, checkpoint, gid, mode)
+        except sqlite3.Error as e:
+            print(f"[DB] ⚠️ Checkpoint guild {gid} gagal: {e}")
+    return out
+
+def journal_info(path: str) -> Dict[str, Any]:
+    """Ukuran file DB + file pendamping (-wal, -shm, -journal) dalam byte."""
+    def _size(p):
+        return os.path.getsize(p) if os.path.exists(p) else 0
+    return {
+        "db": _size(path),
+        "wal": _size(path + "-wal"),
+        "shm": _size(path + "-shm"),
+        "journal": _size(path + "-journal"),
+    }
+
+def pool_stats() -> Dict[str, Any]:
+    with _pool_lock:
+        now = time.monotonic()
+        return {
+            "open": len(_pool),
+            "max": DB_POOL_MAX,
+            "idle_timeout": DB_POOL_IDLE,
+            "guilds": {gid: round(now - e.last_used, 1) for gid, e in _pool.items()},
+        }
+
+# ===== Low-level helpers =====
+def get_conn(guild_id: int) -> sqlite3.Connection:
+    """
+    Ambil koneksi hangat dari pool. JANGAN di-close manual.
+    Untuk akses dari banyak thread, pakai helper execute/fetch* (sudah pakai lock).
+    """
+    return _checkout(guild_id).conn
+
 def execute(guild_id: int, sql: str, params: Iterable[Any] = ()) -> int:
     """Jalankan 1 statement (INSERT/UPDATE/DELETE). Return lastrowid (kalau ada)."""
-    with get_conn(guild_id) as conn:
+    with _connection(guild_id) as conn:
         cur = conn.execute(sql, tuple(params))
-        conn.commit()
         return cur.lastrowid
 
 def executemany(guild_id: int, sql: str, seq_of_params: Iter[Iter[Any]]) -> None:
-    """Jalankan banyak statement sekaligus."""
-    with get_conn(guild_id) as conn:
-        conn.executemany(sql, seq_of_params)
-        conn.commit()
+    """Jalankan banyak statement sekaligus (1 commit, atau ikut transaction() yang aktif)."""
+    with transaction(guild_id) as tx:
+        tx.executemany(sql, seq_of_params)
 
 def fetchone(guild_id: int, sql: str, params: Iterable[Any] = ()) -> Optional[Dict[str, Any]]:
     """Ambil satu row (dict) atau None."""
-    with get_conn(guild_id) as conn:
+    with _connection(guild_id) as conn:
         cur = conn.execute(sql, tuple(params))
         row = cur.fetchone()
         return dict(row) if row else None
 
 def fetchall(guild_id: int, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
     """Ambil list row (list of dict)."""
-    with get_conn(guild_id) as conn:
+    with _connection(guild_id) as conn:
         cur = conn.execute(sql, tuple(params))
         return [dict(r) for r in cur.fetchall()]
 
+# ===== Async facade (I/O SQLite di thread terpisah) =====
+_executor: Optional[ThreadPoolExecutor] = None
+_guild_gates: Dict[int, asyncio.Lock] = {}
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="narator-db")
+    return _executor
+
+async def run(guild_id: int, fn, *args, **kwargs):
+    """
+    Jalankan fungsi sync yang menyentuh DB guild di thread pool, lalu await hasilnya.
+    Pekerjaan per guild diantrikan satu per satu (urutan terjaga), jadi satu guild
+    yang disk-nya lambat tidak menghabiskan worker milik guild lain.
+    """
+    key = int(guild_id)
+    gate = _guild_gates.get(key)
+    if gate is None:
+        gate = _guild_gates.setdefault(key, asyncio.Lock())
+    loop = asyncio.get_running_loop()
+    async with gate:
+        return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+def offload(fn):
+    """
+    Dekorator untuk fungsi service sync `fn(guild_id, ...)`: versi yang diekspor
+    menjadi coroutine yang dijalankan lewat run(). Badan sync tetap tersedia
+    sebagai `.sync` untuk dipanggil dari kode yang sudah berada di thread DB.
+    """
+    @functools.wraps(fn)
+    async def wrapper(guild_id: int, *args, **kwargs):
+        return await run(guild_id, fn, guild_id, *args, **kwargs)
+    wrapper.sync = fn
+    return wrapper
+
+async def aexecute(guild_id: int, sql: str, params: Iterable[Any] = ()) -> int:
+    return await run(guild_id, execute, guild_id, sql, params)
+
+async def aexecutemany(guild_id: int, sql: str, seq_of_params: Iter[Iter[Any]]) -> None:
+    return await run(guild_id, executemany, guild_id, sql, list(seq_of_params))
+
+async def afetchone(guild_id: int, sql: str, params: Iterable[Any] = ()) -> Optional[Dict[str, Any]]:
+    return await run(guild_id, fetchone, guild_id, sql, params)
+
+async def afetchall(guild_id: int, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+    return await run(guild_id, fetchall, guild_id, sql, params)
+
+# ===== Unit of work (transaction) =====
+class Transaction:
+    """
+    Handle transaksi aktif. Semua helper execute/fetch* di thread yang sama
+    (untuk guild yang sama) otomatis ikut transaksi ini sampai blok with selesai.
+    """
+
+    def __init__(self, guild_id: int, conn: sqlite3.Connection, savepoint: Optional[str]):
+        self.guild_id = guild_id
+        self.conn = conn
+        self._savepoint = savepoint
+        self.rolled_back = False
+
+    def execute(self, sql: str, params: Iterable[Any] = ()) -> int:
+        return self.conn.execute(sql, tuple(params)).lastrowid
+
+    def executemany(self, sql: str, seq_of_params: Iter[Iter[Any]]) -> int:
+        return self.conn.executemany(sql, seq_of_params).rowcount
+
+    def fetchone(self, sql: str, params: Iterable[Any] = ()) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(sql, tuple(params)).fetchone()
+        return dict(row) if row else None
+
+    def fetchall(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        return [dict(r) for r in self.conn.execute(sql, tuple(params)).fetchall()]
+
+    def rollback(self) -> None:
+        """
+        Batalkan semua perubahan di level transaksi ini sejauh ini. Blok with tetap satu
+        unit kerja: tulisan sesudah rollback() masih di dalam transaksi dan ikut di-commit
+        saat blok selesai (atau dibatalkan kalau blok raise).
+        """
+        if self._savepoint:
+            self.conn.execute(f"ROLLBACK TO {self._savepoint}")
+        else:
+            # ROLLBACK biasa mengakhiri transaksi → buka lagi supaya sisa blok tidak autocommit
+            self.conn.execute("ROLLBACK")
+            self.conn.execute("BEGIN IMMEDIATE")
+        self.rolled_back = True
+
+@contextmanager
+def transaction(guild_id: int):
+    """
+    Satu unit kerja = satu commit.
+
+        with db.transaction(guild_id) as tx:
+            tx.execute(...)
+            inventory_service.add_item(...)   # helper lama ikut transaksi yang sama
+
+    Exception di dalam blok → ROLLBACK. Transaksi bersarang memakai SAVEPOINT,
+    jadi tx.rollback() di level dalam hanya membatalkan level itu saja.
+    """
+    with _borrow(guild_id) as entry:
+        conn = entry.conn
+        depth = entry.tx_depth
+        savepoint = f"sp_{depth}" if depth else None
+        conn.execute(f"SAVEPOINT {savepoint}" if savepoint else "BEGIN IMMEDIATE")
+        entry.tx_depth += 1
+        tx = Transaction(guild_id, conn, savepoint)
+        try:
+            yield tx
+        except BaseException:
+            entry.tx_depth -= 1
+            try:
+                if savepoint:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass  # SQLite sudah rollback sendiri (mis. disk penuh)
+            raise
+        entry.tx_depth -= 1
+        conn.execute(f"RELEASE {savepoint}" if savepoint else "COMMIT")
+
 def check_schema(guild_id: int) -> dict:
     """
     Kembalikan dict {tabel: [list kolom]} untuk semua tabel di DB guild ini.
     Bisa dipakai buat debug schema lama.
     """
     result = {}
-    with get_conn(guild_id) as conn:
+    with _connection(guild_id) as conn:
         cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
         tables = [r[0] for r in cur.fetchall()]
         for t in tables:
@@ -118,9 +444,8 @@ def template_for(mtype: str) -> dict:
 
 # ===== Schema bootstrap & auto-migration =====
 def _exec_script(guild_id: int, sql: str) -> None:
-    with get_conn(guild_id) as conn:
+    with _connection(guild_id) as conn:
         conn.executescript(sql)
-        conn.commit()
 
 def _ensure_table(guild_id: int, create_sql: str) -> None:
     execute(guild_id, create_sql)
@@ -133,10 +458,12 @@ def _ensure_columns(guild_id: int, table: str, columns: Dict[str, str]) -> None:
         if col not in existing:
             execute(guild_id, f"ALTER TABLE {table} ADD COLUMN {col} {decl}")
 
-def init_db(guild_id: int) -> None:
-    """
-    Buat DB untuk server tertentu jika belum ada, lalu pastikan tabel dan kolom lengkap.
-    """
+# ===== Migrasi skema (versi di PRAGMA user_version) =====
+# Setiap migrasi harus idempotent: DB lama (user_version=0) yang tabelnya sudah
+# sebagian ada tetap aman melewati v1 lagi.
+
+def _migrate_v1_bootstrap(guild_id: int) -> None:
+    """Skema dasar: schema.sql + semua tabel inti, kolom tambahan, dan index."""
     # 1) Load schema.sql (opsional)
     schema_file = os.path.join(os.path.dirname(__file__), "..", "data", "schema.sql")
     if os.path.exists(schema_file):
@@ -625,3 +952,409 @@ def init_db(guild_id: int) -> None:
     execute(guild_id, "CREATE INDEX IF NOT EXISTS idx_inv_owner ON inventory(owner);")
     execute(guild_id, "CREATE UNIQUE INDEX IF NOT EXISTS idx_effects_name ON effects(name);")
     execute(guild_id, "CREATE INDEX IF NOT EXISTS idx_shop_npc ON npc_shop(npc_name);")
+
+def _migrate_v2_service_tables(guild_id: int) -> None:
+    """Kolom & index yang dulu dibuat ulang tiap call oleh hollow/favor/faction service."""
+    _ensure_columns(guild_id, "hollow_nodes", {
+        "tags": "TEXT DEFAULT '[]'",
+        "cooldown_until": "TIMESTAMP DEFAULT NULL"
+    })
+    _ensure_columns(guild_id, "hollow_visitors", {
+        "origin": "TEXT DEFAULT ''",
+        "hook": "TEXT DEFAULT ''"
+    })
+    _ensure_columns(guild_id, "hollow_events", {
+        "effect_formula": "TEXT DEFAULT ''"
+    })
+
+    # Tabel favor lama (singular) sudah diganti favors
+    execute(guild_id, "DROP TABLE IF EXISTS favor")
+    execute(guild_id, "CREATE INDEX IF NOT EXISTS idx_favor_char ON favors(char_name);")
+    execute(guild_id, "CREATE INDEX IF NOT EXISTS idx_favor_faction ON favors(faction);")
+    execute(guild_id, "CREATE INDEX IF NOT EXISTS idx_faction_type ON factions(type);")
+
+# Baris (nama companion, owner) dari characters.companions (JSON) untuk trigger
+_COMPANION_JSON_ROWS = """
+    SELECT lower(json_extract(j.value, '$.name')), {owner}
+    FROM json_each(CASE WHEN json_valid({src}) THEN {src} ELSE '[]' END) AS j
+    WHERE j.type = 'object' AND json_extract(j.value, '$.name') IS NOT NULL
+"""
+
+def _migrate_v3_companion_names(guild_id: int) -> None:
+    """Index nama companion-in-JSON → karakter pemilik, dijaga trigger di tabel characters."""
+    rows_new = _COMPANION_JSON_ROWS.format(owner="NEW.id", src="NEW.companions").strip()
+    _exec_script(guild_id, f"""
+    CREATE TABLE IF NOT EXISTS companion_names (
+        name_key TEXT NOT NULL,
+        owner_id INTEGER NOT NULL,
+        PRIMARY KEY (name_key, owner_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_companion_names_owner ON companion_names(owner_id);
+
+    DROP TRIGGER IF EXISTS trg_companion_names_ins;
+    CREATE TRIGGER trg_companion_names_ins AFTER INSERT ON characters BEGIN
+        INSERT OR IGNORE INTO companion_names (name_key, owner_id) {rows_new};
+    END;
+
+    DROP TRIGGER IF EXISTS trg_companion_names_upd;
+    CREATE TRIGGER trg_companion_names_upd AFTER UPDATE OF companions ON characters BEGIN
+        DELETE FROM companion_names WHERE owner_id = OLD.id;
+        INSERT OR IGNORE INTO companion_names (name_key, owner_id) {rows_new};
+    END;
+
+    DROP TRIGGER IF EXISTS trg_companion_names_del;
+    CREATE TRIGGER trg_companion_names_del AFTER DELETE ON characters BEGIN
+        DELETE FROM companion_names WHERE owner_id = OLD.id;
+    END;
+    """)
+    # Backfill dari data lama (dibangun ulang penuh supaya aman dijalankan ulang)
+    execute(guild_id, "DELETE FROM companion_names")
+    execute(guild_id, """
+        INSERT OR IGNORE INTO companion_names (name_key, owner_id)
+        SELECT lower(json_extract(j.value, '$.name')), c.id
+        FROM characters AS c,
+             json_each(CASE WHEN json_valid(c.companions) THEN c.companions ELSE '[]' END) AS j
+        WHERE j.type = 'object' AND json_extract(j.value, '$.name') IS NOT NULL
+    """)
+
+_EFFECT_ENTITY_TABLES = ("characters", "enemies", "allies", "companions")
+
+def _migrate_v4_active_effects(guild_id: int) -> None:
+    """Pindahkan efek aktif dari kolom JSON `effects` (dan companion JSON) ke tabel active_effects."""
+    entity_triggers = "\n".join(f"""
+    DROP TRIGGER IF EXISTS trg_active_effects_del_{t};
+    CREATE TRIGGER trg_active_effects_del_{t} AFTER DELETE ON {t} BEGIN
+        DELETE FROM active_effects WHERE entity_type = '{t}' AND entity_id = OLD.id;
+    END;""" for t in _EFFECT_ENTITY_TABLES)
+    _exec_script(guild_id, f"""
+    CREATE TABLE IF NOT EXISTS active_effects (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity_type TEXT NOT NULL,      -- characters/enemies/allies/companions/companion_json
+        entity_id INTEGER NOT NULL,     -- companion_json: id karakter pemilik
+        comp_name TEXT DEFAULT '',      -- nama companion (khusus companion_json)
+        effect_id TEXT NOT NULL,        -- nama efek di library
+        text TEXT,
+        type TEXT,
+        stack INTEGER DEFAULT 1,
+        mode TEXT,
+        duration INTEGER DEFAULT -1,    -- -1 = permanen
+        formula TEXT,
+        target_stat TEXT,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_active_effects_entity ON active_effects(entity_type, entity_id);
+    CREATE INDEX IF NOT EXISTS idx_active_effects_duration ON active_effects(duration);
+    {entity_triggers}
+
+    DROP TRIGGER IF EXISTS trg_active_effects_del_companion_json;
+    CREATE TRIGGER trg_active_effects_del_companion_json AFTER DELETE ON characters BEGIN
+        DELETE FROM active_effects WHERE entity_type = 'companion_json' AND entity_id = OLD.id;
+    END;
+
+    DROP TRIGGER IF EXISTS trg_active_effects_upd_companion_json;
+    CREATE TRIGGER trg_active_effects_upd_companion_json AFTER UPDATE OF companions ON characters BEGIN
+        DELETE FROM active_effects
+        WHERE entity_type = 'companion_json' AND entity_id = NEW.id
+          AND lower(comp_name) NOT IN (
+              SELECT lower(json_extract(j.value, '$.name'))
+              FROM json_each(CASE WHEN json_valid(NEW.companions) THEN NEW.companions ELSE '[]' END) AS j
+              WHERE j.type = 'object' AND json_extract(j.value, '$.name') IS NOT NULL
+          );
+    END;
+    """)
+
+    def _effect_row(etype, eid, comp, e):
+        return (etype, eid, comp, str(e.get("id") or e.get("name") or e.get("text") or "?"),
+                e.get("text", ""), e.get("type", ""), int(e.get("stack", 1) or 1), e.get("mode", ""),
+                int(e.get("duration", -1)), e.get("formula", ""), e.get("target_stat", ""),
+                e.get("description", ""))
+
+    rows = []
+    cleared = {t: [] for t in _EFFECT_ENTITY_TABLES}
+    comp_updates = []
+    for t in _EFFECT_ENTITY_TABLES:
+        for r in fetchall(guild_id, f"SELECT id, effects FROM {t} WHERE effects IS NOT NULL AND effects NOT IN ('', '[]')"):
+            try:
+                effs = json.loads(r["effects"] or "[]")
+            except Exception:
+                effs = []
+            rows.extend(_effect_row(t, r["id"], "", e) for e in effs if isinstance(e, dict))
+            cleared[t].append((r["id"],))
+
+    for ch in fetchall(guild_id, "SELECT id, companions FROM characters WHERE companions LIKE '%effects%'"):
+        try:
+            comps = json.loads(ch["companions"] or "[]")
+        except Exception:
+            continue
+        touched = False
+        for comp in comps:
+            if isinstance(comp, dict) and comp.get("effects"):
+                effs = comp.pop("effects")
+                if isinstance(effs, str):
+                    try:
+                        effs = json.loads(effs)
+                    except Exception:
+                        effs = []
+                rows.extend(_effect_row("companion_json", ch["id"], comp.get("name", ""), e)
+                            for e in effs if isinstance(e, dict))
+                touched = True
+        if touched:
+            comp_updates.append((json.dumps(comps), ch["id"]))
+
+    with transaction(guild_id) as tx:
+        tx.executemany("""
+            INSERT INTO active_effects (entity_type, entity_id, comp_name, effect_id, text, type,
+                                        stack, mode, duration, formula, target_stat, description)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+        """, rows)
+        for t, ids in cleared.items():
+            if ids:
+                tx.executemany(f"UPDATE {t} SET effects='[]' WHERE id=?", ids)
+        if comp_updates:
+            tx.executemany("UPDATE characters SET companions=? WHERE id=?", comp_updates)
+
+def _migrate_v5_vital_columns(guild_id: int) -> None:
+    """schema.sql lama membuat enemies tanpa energy/stamina; encounter butuh semua kolom vital."""
+    vitals = {col: "INTEGER DEFAULT 0" for col in
+              ("hp", "hp_max", "energy", "energy_max", "stamina", "stamina_max")}
+    for table in ("characters", "enemies", "allies"):
+        _ensure_columns(guild_id, table, vitals)
+
+def _migrate_v6_entity_tags(guild_id: int) -> None:
+    """Tag bebas per entity (JSON list) untuk selector AoE `tag:undead`."""
+    for table in ("characters", "enemies", "allies"):
+        _ensure_columns(guild_id, table, {"tags": "TEXT DEFAULT '[]'"})
+
+def _migrate_v7_ask_cache(guild_id: int) -> None:
+    """Cache jawaban !ask (key = hash model + prompt ternormalisasi), LRU via last_hit."""
+    _exec_script(guild_id, """
+        CREATE TABLE IF NOT EXISTS ask_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            prompt TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            hits INTEGER DEFAULT 0,
+            created_at REAL NOT NULL,
+            last_hit REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_ask_cache_last_hit ON ask_cache(last_hit);
+    """)
+
+# Sumber index FTS konteks kampanye: src → (slot rowid, tabel, judul, isi, syarat).
+# rowid FTS = id * 8 + slot, jadi trigger update/delete cukup lewat rowid.
+# Yang masih rahasia GM (trait/info NPC tersembunyi, quest hidden) tidak ikut di-index.
+# Slot 6 dulu timeline (dilepas di v12). Event log_event tersimpan di memories type='timeline'
+# → juga tidak di-index (v13): audit tiap aksi bukan konteks !ask & bikin cache key terus berubah.
+_NPC_INFO = ("CASE WHEN NOT json_valid({r}.info) THEN coalesce({r}.info,'') "
+             "WHEN json_extract({r}.info,'$.visible') THEN coalesce(json_extract({r}.info,'$.value'),'') ELSE '' END")
+_NPC_TRAITS = ("coalesce((SELECT group_concat(j.key || ': ' || json_extract(j.value,'$.value'), '; ') "
+               "FROM json_each(CASE WHEN json_valid({r}.traits) THEN {r}.traits ELSE '{{}}' END) AS j "
+               "WHERE j.type = 'object' AND json_extract(j.value,'$.visible')), '')")
+CAMPAIGN_FTS_SOURCES = {
+    "npc": (1, "npc", "{r}.name",
+            "coalesce({r}.role,'') || ' ' || coalesce({r}.affiliation,'') || ' ' || coalesce({r}.status,'') || ' ' || "
+            + _NPC_INFO + " || ' ' || " + _NPC_TRAITS, "1"),
+    "wiki": (2, "wiki", "{r}.name", "coalesce({r}.category,'') || ' ' || coalesce({r}.content,'')", "1"),
+    "quest": (3, "quests", "{r}.name", "coalesce({r}.status,'') || ' ' || coalesce({r}.\"desc\",'')",
+              "coalesce({r}.status,'') <> 'hidden'"),
+    "item": (4, "items", "{r}.name",
+             "coalesce({r}.type,'') || ' ' || coalesce({r}.rarity,'') || ' ' || coalesce({r}.effect,'') || ' ' || "
+             "coalesce({r}.notes,'') || ' ' || coalesce({r}.rules,'') || ' ' || coalesce({r}.requirement,'')", "1"),
+    "memory": (5, "memories", "coalesce({r}.type,'')", "coalesce({r}.value,'')",
+               "coalesce({r}.type,'') <> 'timeline'"),
+    "skill": (7, "skill_library", "{r}.name",
+              "coalesce({r}.category,'') || ' ' || coalesce({r}.effect,'') || ' ' || "
+              "coalesce({r}.drawback,'') || ' ' || coalesce({r}.cost,'')", "1"),
+}
+
+def _campaign_fts_source_sql(src: str) -> str:
+    """Trigger sinkron + isi ulang index untuk satu sumber CAMPAIGN_FTS_SOURCES."""
+    slot, table, title, body, cond = CAMPAIGN_FTS_SOURCES[src]
+    ins = lambda r: (f"INSERT INTO campaign_fts (rowid, src, title, body) "
+                     f"SELECT {r}.id * 8 + {slot}, '{src}', {title.format(r=r)}, {body.format(r=r)} "
+                     f"WHERE {cond.format(r=r)};")
+    return f"""
+    DROP TRIGGER IF EXISTS trg_fts_ins_{table};
+    CREATE TRIGGER trg_fts_ins_{table} AFTER INSERT ON {table} BEGIN
+        {ins("NEW")}
+    END;
+    DROP TRIGGER IF EXISTS trg_fts_upd_{table};
+    CREATE TRIGGER trg_fts_upd_{table} AFTER UPDATE ON {table} BEGIN
+        DELETE FROM campaign_fts WHERE rowid = OLD.id * 8 + {slot};
+        {ins("NEW")}
+    END;
+    DROP TRIGGER IF EXISTS trg_fts_del_{table};
+    CREATE TRIGGER trg_fts_del_{table} AFTER DELETE ON {table} BEGIN
+        DELETE FROM campaign_fts WHERE rowid = OLD.id * 8 + {slot};
+    END;
+    DELETE FROM campaign_fts WHERE rowid % 8 = {slot};
+    INSERT INTO campaign_fts (rowid, src, title, body)
+        SELECT t.id * 8 + {slot}, '{src}', {title.format(r="t")}, {body.format(r="t")}
+        FROM {table} AS t WHERE {cond.format(r="t")};
+    """
+
+def _index_campaign_sources(guild_id: int, sources) -> None:
+    parts = ["""
+    CREATE VIRTUAL TABLE IF NOT EXISTS campaign_fts USING fts5(
+        src UNINDEXED, title, body, tokenize = 'unicode61 remove_diacritics 2'
+    );
+    """] + [_campaign_fts_source_sql(src) for src in sources]
+    try:
+        _exec_script(guild_id, "\n".join(parts))
+    except sqlite3.OperationalError as e:
+        # SQLite tanpa FTS5 → !ask & !search tetap jalan, hanya tanpa index
+        print(f"[MIGRATE] ⚠️ campaign_fts dilewati (guild {guild_id}): {e}")
+
+def _migrate_v8_campaign_fts(guild_id: int) -> None:
+    """Index FTS5 (BM25) untuk konteks !ask; dijaga sinkron oleh trigger tiap tabel sumber."""
+    _index_campaign_sources(guild_id, [s for s in CAMPAIGN_FTS_SOURCES if s != "skill"])
+
+def _migrate_v9_gpt_usage(guild_id: int) -> None:
+    """Catatan token & latency tiap panggilan GPT (metering + budget per guild/user)."""
+    _exec_script(guild_id, """
+        CREATE TABLE IF NOT EXISTS gpt_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            model TEXT NOT NULL,
+            prompt_tokens INTEGER DEFAULT 0,
+            completion_tokens INTEGER DEFAULT 0,
+            latency_ms INTEGER DEFAULT 0,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_gpt_usage_created ON gpt_usage(created_at);
+        CREATE INDEX IF NOT EXISTS idx_gpt_usage_user ON gpt_usage(user_id, created_at);
+    """)
+
+def _migrate_v10_skill_fts(guild_id: int) -> None:
+    """skill_library ikut index campaign_fts (untuk !search)."""
+    _index_campaign_sources(guild_id, ["skill"])
+
+def _migrate_v11_inventory_nocase(guild_id: int) -> None:
+    """
+    Unique index (lower(owner), lower(item)) → lookup inventory case-insensitive tidak scan
+    tabel lagi, dan add_item bisa satu UPSERT. Baris duplikat beda kapital digabung dulu.
+    """
+    with transaction(guild_id) as tx:
+        tx.execute("""
+            UPDATE inventory SET qty = (
+                SELECT SUM(COALESCE(d.qty, 0)) FROM inventory AS d
+                WHERE lower(d.owner) = lower(inventory.owner) AND lower(d.item) = lower(inventory.item)
+            )
+            WHERE id IN (SELECT MIN(id) FROM inventory GROUP BY lower(owner), lower(item) HAVING COUNT(*) > 1)
+        """)
+        tx.execute("""
+            DELETE FROM inventory
+            WHERE id NOT IN (SELECT MIN(id) FROM inventory GROUP BY lower(owner), lower(item))
+        """)
+        tx.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_inv_owner_item_nocase
+            ON inventory(lower(owner), lower(item))
+        """)
+
+def _migrate_v12_drop_timeline_fts(guild_id: int) -> None:
+    """Timeline keluar dari index FTS: hapus trigger sinkronnya + baris yang sudah ter-index."""
+    _exec_script(guild_id, """
+        DROP TRIGGER IF EXISTS trg_fts_ins_timeline;
+        DROP TRIGGER IF EXISTS trg_fts_upd_timeline;
+        DROP TRIGGER IF EXISTS trg_fts_del_timeline;
+    """)
+    try:
+        execute(guild_id, "DELETE FROM campaign_fts WHERE rowid % 8 = 6")
+    except sqlite3.OperationalError:
+        pass  # index tidak pernah dibuat (SQLite tanpa FTS5)
+
+def _migrate_v13_memory_fts_no_timeline(guild_id: int) -> None:
+    """memories type='timeline' (isi log_event) keluar dari index: trigger & baris memory dibangun ulang."""
+    _index_campaign_sources(guild_id, ["memory"])
+
+MIGRATIONS = [
+    (1, "bootstrap skema dasar", _migrate_v1_bootstrap),
+    (2, "kolom & index hollow/favor/faction", _migrate_v2_service_tables),
+    (3, "index nama companion JSON", _migrate_v3_companion_names),
+    (4, "tabel active_effects (ganti JSON effects)", _migrate_v4_active_effects),
+    (5, "kolom vital enemies/allies", _migrate_v5_vital_columns),
+    (6, "kolom tags characters/enemies/allies", _migrate_v6_entity_tags),
+    (7, "tabel ask_cache", _migrate_v7_ask_cache),
+    (8, "index FTS5 konteks kampanye", _migrate_v8_campaign_fts),
+    (9, "tabel gpt_usage", _migrate_v9_gpt_usage),
+    (10, "skill_library ke index FTS", _migrate_v10_skill_fts),
+    (11, "unique index inventory (lower(owner), lower(item))", _migrate_v11_inventory_nocase),
+    (12, "timeline keluar dari index FTS", _migrate_v12_drop_timeline_fts),
+    (13, "memori timeline keluar dari index FTS", _migrate_v13_memory_fts_no_timeline),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_schema_ready: set = set()   # guild yang sudah dicek versi terbaru di proses ini
+
+def schema_version(guild_id: int) -> int:
+    row = fetchone(guild_id, "PRAGMA user_version")
+    return int(row["user_version"]) if row else 0
+
+def init_db(guild_id: int) -> int:
+    """
+    Buat DB untuk server tertentu jika belum ada, lalu jalankan migrasi yang belum diterapkan.
+    DB yang sudah versi terbaru cukup satu kali baca user_version per proses.
+    """
+    if guild_id in _schema_ready:
+        return SCHEMA_VERSION
+
+    # Pegang lock koneksi guild supaya dua thread tidak migrasi bersamaan
+    with _borrow(guild_id):
+        current = schema_version(guild_id)
+        for version, desc, fn in MIGRATIONS:
+            if version <= current:
+                continue
+            fn(guild_id)
+            execute(guild_id, f"PRAGMA user_version = {int(version)}")
+            print(f"[MIGRATE] ✅ v{version} {desc} (guild {guild_id})")
+            current = version
+
+    _schema_ready.add(guild_id)
+    return current
+
+def ensure_schema(guild_id: int) -> None:
+    """Dipakai service sebelum akses tabel; no-op kalau skema guild sudah terbaru."""
+    if guild_id not in _schema_ready:
+        init_db(guild_id)
+
+def reset_schema(guild_id: int) -> None:
+    """Paksa migrasi ulang dari awal (mis. setelah tabel di-drop manual)."""
+    execute(guild_id, "PRAGMA user_version = 0")
+    invalidate_guild(guild_id)
+
+# ===== Registry "sudah di-ensure" per (guild, key) =====
+_ensured: set = set()
+_invalidate_hooks: List[Callable[[Optional[int]], None]] = []
+
+def ensure_once(guild_id: int, key: str, fn: Callable[[int], Any]) -> None:
+    """
+    Jalankan fn(guild_id) (biasanya CREATE TABLE IF NOT EXISTS) sekali per (guild, key)
+    per proses. Call berikutnya langsung skip sampai guild di-invalidate.
+    """
+    k = (int(guild_id), key)
+    if k in _ensured:
+        return
+    fn(guild_id)
+    _ensured.add(k)
+
+def on_invalidate(hook: Callable[[Optional[int]], None]) -> Callable[[Optional[int]], None]:
+    """Daftarkan callback cache lain; dipanggil dengan guild_id (None = semua guild)."""
+    _invalidate_hooks.append(hook)
+    return hook
+
+def invalidate_guild(guild_id: Optional[int] = None) -> None:
+    """
+    Lupakan status skema & cache guild ini (None = semua), dipakai saat file DB diganti
+    (swapdb/usebackup) atau tabel di-drop (resettable).
+    """
+    if guild_id is None:
+        _schema_ready.clear()
+        _ensured.clear()
+    else:
+        gid = int(guild_id)
+        _schema_ready.discard(gid)
+        for k in [k for k in _ensured if k[0] == gid]:
+            _ensured.discard(k)
+    for hook in list(_invalidate_hooks):
+        hook(guild_id)
@@ -1,5 +1,6 @@
 import io
 import discord
+from utils import outbox
 
 DISCORD_LIMIT = 2000
 FALLBACK_FILE_LIMIT = 10000
@@ -12,9 +13,11 @@ async def send_long(ctx, content: str):
         await ctx.send(f"```{content}```")
         return
     if len(content) <= FALLBACK_FILE_LIMIT:
-        parts = split_message(content, DISCORD_LIMIT)
+        # Lewat outbox: bagian-bagian dikirim berurutan tanpa menabrak rate limit channel
+        parts = split_message(content, DISCORD_LIMIT - 32)
         for idx, part in enumerate(parts, start=1):
-            await ctx.send(f"**Bagian {idx}/{len(parts)}**\n```{part}```")
+            last = outbox.send_nowait(ctx, f"**Bagian {idx}/{len(parts)}**\n```{part}```")
+        await last
         return
     data = io.StringIO(content)
     await ctx.send(
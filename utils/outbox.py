@@ -0,0 +1,163 @@
+# utils/outbox.py
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("outbox")
+
+# ===============================
+# Konfigurasi
+# ===============================
+# Discord: ±5 pesan / 5 detik per channel. Bucket dijaga di sisi bot supaya tidak kena 429.
+OUTBOX_RATE = int(os.getenv("OUTBOX_RATE", "5"))                    # pesan per jendela
+OUTBOX_PER = float(os.getenv("OUTBOX_PER", "5"))                    # panjang jendela (detik)
+OUTBOX_LINGER = float(os.getenv("OUTBOX_LINGER_MS", "150")) / 1000  # tunggu item berikutnya sebelum kirim
+
+MAX_TEXT = 2000
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+MAX_FILES = 10
+
+# ===============================
+# Token bucket per channel
+# ===============================
+class _TokenBucket:
+    def __init__(self, rate: int, per: float):
+        self.capacity = max(1, rate)
+        self.tokens = float(self.capacity)
+        self.fill_rate = self.capacity / max(per, 0.001)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+
+# ===============================
+# Antrian keluar per channel
+# ===============================
+class _Item:
+    __slots__ = ("content", "embeds", "files", "extra", "future")
+
+    def __init__(self, content, embeds, files, extra):
+        self.content = str(content) if content is not None else None
+        self.embeds = embeds
+        self.files = files
+        self.extra = extra            # view/reference/dll → dikirim sendiri, tidak digabung
+        self.future = asyncio.get_running_loop().create_future()
+
+def _embed_chars(embeds) -> int:
+    return sum(len(e) for e in embeds)
+
+class Outbox:
+    """
+    Semua output ke satu channel lewat sini:
+    - teks berurutan digabung (maks 2000 char),
+    - embed berurutan digabung (maks 10 / 6000 char per pesan),
+    - file berurutan digabung (maks 10 per pesan),
+    - pengiriman ditahan token bucket sebelum kena rate limit.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.queue: deque = deque()
+        self.bucket = _TokenBucket(OUTBOX_RATE, OUTBOX_PER)
+        self.task: Optional[asyncio.Task] = None
+
+    def send_nowait(self, content=None, *, embed=None, embeds=None, file=None, files=None, **extra) -> asyncio.Future:
+        """Masukkan ke antrian; Future berisi Message tempat item ini akhirnya terkirim."""
+        item = _Item(content,
+                     ([embed] if embed else []) + list(embeds or []),
+                     ([file] if file else []) + list(files or []),
+                     extra)
+        self.queue.append(item)
+        item.future.add_done_callback(_log_failure)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._worker())
+        return item.future
+
+    async def send(self, content=None, **kwargs):
+        return await self.send_nowait(content, **kwargs)
+
+    def _take_batch(self) -> List[_Item]:
+        first = self.queue.popleft()
+        batch = [first]
+        if first.extra or len(first.embeds) > MAX_EMBEDS or len(first.files) > MAX_FILES:
+            return batch
+        text = first.content or ""
+        n_embeds, n_files = len(first.embeds), len(first.files)
+        chars = _embed_chars(first.embeds)
+        while self.queue:
+            nxt = self.queue[0]
+            if nxt.extra:
+                break
+            if nxt.content:
+                # teks selalu tampil di atas embed/file → hanya boleh gabung sebelum ada lampiran
+                if n_embeds or n_files or len(text) + 1 + len(nxt.content) > MAX_TEXT:
+                    break
+            if n_embeds + len(nxt.embeds) > MAX_EMBEDS or chars + _embed_chars(nxt.embeds) > MAX_EMBED_CHARS:
+                break
+            if n_files + len(nxt.files) > MAX_FILES:
+                break
+            self.queue.popleft()
+            batch.append(nxt)
+            if nxt.content:
+                text = f"{text}\n{nxt.content}" if text else nxt.content
+            n_embeds += len(nxt.embeds)
+            n_files += len(nxt.files)
+            chars += _embed_chars(nxt.embeds)
+        return batch
+
+    async def _worker(self) -> None:
+        while self.queue:
+            await asyncio.sleep(OUTBOX_LINGER)
+            batch = self._take_batch()
+            texts = [i.content for i in batch if i.content]
+            payload = dict(batch[0].extra)
+            if texts:
+                payload["content"] = "\n".join(texts)
+            embeds = [e for i in batch for e in i.embeds]
+            files = [f for i in batch for f in i.files]
+            if embeds:
+                payload["embeds"] = embeds
+            if files:
+                payload["files"] = files
+            await self.bucket.acquire()
+            try:
+                msg = await self.channel.send(**payload)
+            except Exception as e:
+                for i in batch:
+                    if not i.future.done():
+                        i.future.set_exception(e)
+                continue
+            for i in batch:
+                if not i.future.done():
+                    i.future.set_result(msg)
+
+def _log_failure(fut: asyncio.Future) -> None:
+    if not fut.cancelled() and fut.exception():
+        logger.warning(f"⚠️ Gagal kirim pesan: {fut.exception()}")
+
+_outboxes: Dict[int, Outbox] = {}
+
+def outbox_for(target) -> Outbox:
+    """ctx / channel → Outbox channel tsb (dibuat sekali per channel)."""
+    channel = getattr(target, "channel", None) or target
+    box = _outboxes.get(channel.id)
+    if box is None:
+        box = _outboxes[channel.id] = Outbox(channel)
+    return box
+
+async def send(target, content=None, **kwargs):
+    return await outbox_for(target).send(content, **kwargs)
+
+def send_nowait(target, content=None, **kwargs) -> asyncio.Future:
+    return outbox_for(target).send_nowait(content, **kwargs)